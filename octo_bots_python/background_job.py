@@ -1,13 +1,16 @@
 import datetime
 import traceback
 from threading import Lock, Thread
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import dateparser
 
+from octo_bots_python.background_job_schedule import BackgroundJobSchedule
 from octo_bots_python.bots_client import BotsBaseClient
 from octo_bots_python.bots_config import BackgroundJobDescription
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import PRIORITY_BACKGROUND, ToolRunner
+from octo_bots_python.operations.async_operation import AsyncOperation
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
 
@@ -17,19 +20,40 @@ NAME_KEY = "name"
 OPERATIONS_KEY = "operations"
 EVERY_KEY = "every"
 PARALLEL_KEY = "parallel"
+JITTER_KEY = "jitter"
+CATCH_UP_KEY = "catch-up"
 MANDATORY_KEYS = [NAME_KEY, OPERATIONS_KEY, EVERY_KEY]
+
+CATCH_UP_RUN_ONCE = "run-once"
+CATCH_UP_SKIP = "skip"
+CATCH_UP_POLICIES = [CATCH_UP_RUN_ONCE, CATCH_UP_SKIP]
 logger = Logger("background_job")
 
 
 class BackgroundJob:
-    def __init__(self, name: str, repeat: str, operations: List[Operation], parallel: bool):
+    def __init__(self, name: str, repeat: str, operations: List[Operation], parallel: bool,
+                 jitter: Optional[str] = None, catch_up: str = CATCH_UP_RUN_ONCE):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise Exception(f"Invalid catch up policy given for background job [{catch_up}]")
         self.__name = name
         self.__operations = operations
         self.__repeat = repeat
+        self.__schedule = BackgroundJobSchedule.create_schedule(repeat)
+        self.__jitter = datetime.timedelta()
+        if jitter:
+            now = datetime.datetime.now()
+            jitter_from_now = dateparser.parse(jitter, settings={'PREFER_DATES_FROM': 'future', 'RELATIVE_BASE': now})
+            if not jitter_from_now or jitter_from_now < now:
+                raise Exception(f"Invalid jitter given for background job [{jitter}]")
+            self.__jitter = jitter_from_now - now
+        self.__catch_up = catch_up
         self.__parallel = parallel
+        self.__created_stamp = datetime.datetime.now()
         self.__last_run_stamp: datetime.datetime = None
         self.__job_lock = Lock()
+        self.__state_lock = Lock()
         self.__is_running = False
+        self.__is_pending = False
 
     @property
     def job_name(self) -> str:
@@ -39,45 +63,101 @@ class BackgroundJob:
     def repeats_every(self) -> str:
         return self.__repeat
 
+    @property
+    def schedule(self) -> BackgroundJobSchedule:
+        return self.__schedule
+
+    @property
+    def jitter(self) -> datetime.timedelta:
+        return self.__jitter
+
+    @property
+    def catch_up(self) -> str:
+        return self.__catch_up
+
     @property
     def is_running(self) -> bool:
         return self.__is_running
 
+    @property
+    def is_pending(self) -> bool:
+        return self.__is_pending
+
+    def mark_pending(self) -> bool:
+        # Marks a job dispatched to the jobs pool, a job waiting for a free worker or running is not dispatched again
+        with self.__state_lock:
+            if self.__is_pending or self.__is_running:
+                return False
+            self.__is_pending = True
+            return True
+
+    def clear_pending(self):
+        with self.__state_lock:
+            self.__is_pending = False
+
+    @property
+    def last_run_stamp(self) -> Optional[datetime.datetime]:
+        return self.__last_run_stamp
+
+    def restore_last_run(self, last_run_stamp: datetime.datetime):
+        if not self.__last_run_stamp or last_run_stamp > self.__last_run_stamp:
+            self.__last_run_stamp = last_run_stamp
+
+    def next_run_time(self) -> datetime.datetime:
+        if self.__last_run_stamp:
+            return self.__schedule.next_run_time(self.__last_run_stamp)
+        if self.__schedule.runs_on_start:
+            return self.__created_stamp
+        return self.__schedule.next_run_time(self.__created_stamp)
+
     def ready_to_run(self) -> bool:
-        now = datetime.datetime.now()
-        time_from_now = dateparser.parse(self.__repeat, settings={'PREFER_DATES_FROM': 'future'})
-        delta = time_from_now - now
-        return not self.__is_running and ((not self.__last_run_stamp) or \
-             now - self.__last_run_stamp > delta)
+        return not self.__is_running and self.next_run_time() <= datetime.datetime.now()
 
     def __execute_operation(self, operation: Operation, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         try:
             logger.debug(f"Executing operation {operation.operation_type} for background job {self.job_name}")
-            operation.execute_operation(clients, headers, event)
+            # Tools ran by background jobs yield to the ones ran by bots
+            with ToolRunner.priority(PRIORITY_BACKGROUND):
+                if isinstance(operation, AsyncOperation):
+                    AsyncOperation.execute_async_operations([operation], clients, headers, event)
+                else:
+                    operation.execute_operation(clients, headers, event)
         except:
             logger.warn(traceback.format_exc())
 
-    def execute_job(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+    def execute_job(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict,
+                    scheduled_time: Optional[datetime.datetime] = None):
         self.__job_lock.acquire()
         try:
-            if not self.ready_to_run():
+            # A job dispatched by the scheduler was already found due, the stamp is kept on the schedule
+            if scheduled_time is None and not self.ready_to_run():
                 return
             logger.info(f"Executing job {self.job_name}")
-            self.__last_run_stamp = datetime.datetime.now()
-            self.__is_running = True
+            self.__last_run_stamp = scheduled_time or datetime.datetime.now()
+            with self.__state_lock:
+                self.__is_running = True
+                self.__is_pending = False
             if self.__parallel:
                 threads = []
                 for op in self.__operations:
+                    if isinstance(op, AsyncOperation):
+                        continue
                     t = Thread(target=self.__execute_operation, args=(op, clients, headers, event,))
                     threads.append(t)
                     t.start()
+                # Async operations run concurrently on the shared event loop
+                async_operations = [op for op in self.__operations if isinstance(op, AsyncOperation)]
+                if len(async_operations) > 0:
+                    AsyncOperation.execute_async_operations(async_operations, clients, headers, event)
                 for t in threads:
                     t.join()
             else:
                 for operation in self.__operations:
                     self.__execute_operation(operation, clients, headers, event)
         finally:
-            self.__is_running = False
+            with self.__state_lock:
+                self.__is_running = False
+                self.__is_pending = False
             self.__job_lock.release()
 
     @staticmethod
@@ -99,7 +179,8 @@ class BackgroundJob:
                 else:
                     for k in op.keys():
                         operations.append(OperationsLoader.load_operation(k, op[k]))
-            jobs.append(BackgroundJob(job_config[NAME_KEY], job_config[EVERY_KEY], operations, parallel))
+            jobs.append(BackgroundJob(job_config[NAME_KEY], job_config[EVERY_KEY], operations, parallel,
+                                      job_config.get(JITTER_KEY), job_config.get(CATCH_UP_KEY, CATCH_UP_RUN_ONCE)))
         return jobs
 
     @staticmethod
@@ -111,4 +192,4 @@ class BackgroundJob:
             else:
                 for k in op.keys():
                     operations.append(OperationsLoader.load_operation(k, op[k]))
-        return BackgroundJob(config.name, config.every, operations, config.parallel)
+        return BackgroundJob(config.name, config.every, operations, config.parallel, config.jitter, config.catch_up)
@@ -0,0 +1,64 @@
+import datetime
+import re
+from abc import abstractmethod
+
+import dateparser
+from croniter import croniter
+
+CRON_EXPRESSION_PATTERN = re.compile(r'^(@\w+|(\S+\s+){4}\S+(\s+\S+)?)$')
+
+
+class BackgroundJobSchedule:
+    def __init__(self, expression: str):
+        self.__expression = expression
+
+    @property
+    def expression(self) -> str:
+        return self.__expression
+
+    @property
+    @abstractmethod
+    def runs_on_start(self) -> bool:
+        pass
+
+    @abstractmethod
+    def next_run_time(self, after: datetime.datetime) -> datetime.datetime:
+        pass
+
+    @staticmethod
+    def create_schedule(expression: str) -> "BackgroundJobSchedule":
+        # Cron expressions are either 5/6 fields or a macro such as @hourly, anything else is a natural language interval
+        if CRON_EXPRESSION_PATTERN.match(expression.strip()) and croniter.is_valid(expression.strip()):
+            return CronJobSchedule(expression.strip())
+        return IntervalJobSchedule(expression)
+
+
+class IntervalJobSchedule(BackgroundJobSchedule):
+    def __init__(self, expression: str):
+        super().__init__(expression)
+        # Parse the interval once, dateparser is too slow to be called on every tick
+        now = datetime.datetime.now()
+        time_from_now = dateparser.parse(expression, settings={'PREFER_DATES_FROM': 'future', 'RELATIVE_BASE': now})
+        if not time_from_now or time_from_now <= now:
+            raise Exception(f"Invalid interval given for background job schedule [{expression}]")
+        self.__interval = time_from_now - now
+
+    @property
+    def interval(self) -> datetime.timedelta:
+        return self.__interval
+
+    @property
+    def runs_on_start(self) -> bool:
+        return True
+
+    def next_run_time(self, after: datetime.datetime) -> datetime.datetime:
+        return after + self.__interval
+
+
+class CronJobSchedule(BackgroundJobSchedule):
+    @property
+    def runs_on_start(self) -> bool:
+        return False
+
+    def next_run_time(self, after: datetime.datetime) -> datetime.datetime:
+        return croniter(self.expression, after).get_next(datetime.datetime)
@@ -0,0 +1,182 @@
+import datetime
+import heapq
+import itertools
+import os
+import platform
+import random
+import time
+import uuid
+from threading import Condition, Thread
+from typing import Callable, List, Optional, Tuple
+
+from octo_bots_python.background_job import CATCH_UP_SKIP, BackgroundJob
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.leases.lease_backend import LeaseBackend
+from octo_bots_python.stores.background_jobs_state_store import \
+    BackgroundJobsStateStore
+
+DEFAULT_CATCH_UP_SPREAD_SECONDS = 60
+DEFAULT_LEASE_TTL_SECONDS = 30
+JOBS_LEASE_NAME = 'background-jobs-leader'
+
+logger = Logger("background_jobs_scheduler")
+
+
+class BackgroundJobsScheduler:
+    def __init__(self, jobs: List[BackgroundJob], dispatch_job: Callable[[BackgroundJob, datetime.datetime], None],
+                 state_store: Optional[BackgroundJobsStateStore] = None,
+                 catch_up_spread_seconds: int = DEFAULT_CATCH_UP_SPREAD_SECONDS,
+                 lease_backend: Optional[LeaseBackend] = None,
+                 lease_ttl_seconds: int = DEFAULT_LEASE_TTL_SECONDS):
+        self.__jobs = list(jobs)
+        self.__dispatch_job = dispatch_job
+        self.__state_store = state_store
+        self.__catch_up_spread_seconds = catch_up_spread_seconds
+        # Without a lease backend this replica is always the leader
+        self.__lease_backend = lease_backend
+        self.__lease_ttl_seconds = lease_ttl_seconds
+        self.__lease_owner = f"{platform.node()}-{os.getpid()}-{uuid.uuid4()}"
+        self.__is_leader = lease_backend is None
+        self.__lease_renew_stamp = 0.0
+        # Entries are (fire time, sequence, job, scheduled time), the fire time includes the job jitter
+        self.__deadlines: List[Tuple[datetime.datetime, int, BackgroundJob, datetime.datetime]] = []
+        self.__sequence = itertools.count()
+        self.__condition = Condition()
+        self.__scheduler_thread = None
+        self.__is_running = False
+
+    @property
+    def jobs(self) -> List[BackgroundJob]:
+        return list(self.__jobs)
+
+    @property
+    def is_leader(self) -> bool:
+        return self.__is_leader
+
+    def __renew_lease(self) -> float:
+        # Returns the seconds until the lease should be renewed again
+        if not self.__lease_backend:
+            return float('inf')
+        renew_interval = self.__lease_ttl_seconds / 3
+        now = time.time()
+        if now < self.__lease_renew_stamp:
+            return self.__lease_renew_stamp - now
+        try:
+            is_leader = self.__lease_backend.acquire_lease(JOBS_LEASE_NAME, self.__lease_owner, self.__lease_ttl_seconds)
+        except Exception as e:
+            logger.warn(f"Failed to renew background jobs lease [{str(e)}]")
+            is_leader = False
+        if is_leader and not self.__is_leader:
+            logger.info(f"Acquired background jobs lease as [{self.__lease_owner}]")
+            # The previous leader may have ran jobs meanwhile, reload their state
+            self.__is_leader = True
+            self.__rebuild_deadlines()
+        elif not is_leader and self.__is_leader:
+            logger.info("Lost background jobs lease, jobs will run on another replica")
+        self.__is_leader = is_leader
+        self.__lease_renew_stamp = now + renew_interval
+        return renew_interval
+
+    def __push_job(self, job: BackgroundJob, scheduled_time: datetime.datetime, fire_time: Optional[datetime.datetime] = None):
+        if fire_time is None:
+            fire_time = scheduled_time + datetime.timedelta(seconds=random.uniform(0, job.jitter.total_seconds()))
+        # The sequence breaks ties so jobs themselves are never compared
+        heapq.heappush(self.__deadlines, (fire_time, next(self.__sequence), job, scheduled_time))
+
+    def __rebuild_deadlines(self):
+        self.__deadlines = []
+        now = datetime.datetime.now()
+        missed_jobs = []
+        for job in self.__jobs:
+            last_run = self.__state_store.load_last_run(job.job_name) if self.__state_store else None
+            if last_run:
+                job.restore_last_run(last_run)
+            scheduled_time = job.next_run_time()
+            if scheduled_time > now:
+                self.__push_job(job, scheduled_time)
+            elif last_run and job.catch_up == CATCH_UP_SKIP:
+                logger.info(f"Skipping missed run of job [{job.job_name}] from {scheduled_time}")
+                self.__push_job(job, job.schedule.next_run_time(now))
+            else:
+                missed_jobs.append((scheduled_time, job))
+        # Stagger the jobs that are due right away, so a restart does not fire all of them at once
+        missed_jobs.sort(key=lambda missed: missed[0])
+        for index, (_, job) in enumerate(missed_jobs):
+            offset = self.__catch_up_spread_seconds * index / len(missed_jobs)
+            offset += random.uniform(0, job.jitter.total_seconds())
+            fire_time = now + datetime.timedelta(seconds=offset)
+            logger.info(f"Job [{job.job_name}] is due, catching up at {fire_time}")
+            self.__push_job(job, fire_time, fire_time)
+
+    def __next_scheduled_time(self, job: BackgroundJob, scheduled_time: datetime.datetime) -> datetime.datetime:
+        now = datetime.datetime.now()
+        next_scheduled_time = job.schedule.next_run_time(scheduled_time)
+        # Do not replay every missed occurrence if we fell behind (suspend, long stall)
+        if next_scheduled_time <= now:
+            next_scheduled_time = job.schedule.next_run_time(now)
+        return next_scheduled_time
+
+    def __dispatch(self, job: BackgroundJob, scheduled_time: datetime.datetime):
+        logger.info(f"Adding job [{job.job_name}]")
+        try:
+            self.__dispatch_job(job, scheduled_time)
+        except Exception as e:
+            # The job never ran, it is dispatched again on its next run
+            job.clear_pending()
+            logger.warn(f"Failed to dispatch job [{job.job_name}] [{str(e)}]")
+            return
+        if self.__state_store:
+            try:
+                self.__state_store.save_last_run(job.job_name, scheduled_time)
+            except Exception as e:
+                logger.warn(f"Failed to persist state of job [{job.job_name}] [{str(e)}]")
+
+    def __run_scheduler(self):
+        with self.__condition:
+            while self.__is_running:
+                renew_timeout = self.__renew_lease()
+                if len(self.__deadlines) == 0:
+                    self.__condition.wait(None if renew_timeout == float('inf') else renew_timeout)
+                    continue
+                fire_time, _, job, scheduled_time = self.__deadlines[0]
+                timeout = (fire_time - datetime.datetime.now()).total_seconds()
+                if timeout > 0:
+                    # Sleep until the earliest deadline (or lease renewal), stopping the scheduler wakes us up early
+                    self.__condition.wait(min(timeout, renew_timeout))
+                    continue
+                heapq.heappop(self.__deadlines)
+                next_scheduled_time = self.__next_scheduled_time(job, scheduled_time)
+                if not self.__is_leader:
+                    # Assume the leader ran it, so a takeover does not rerun every job
+                    logger.debug(f"Not the background jobs leader, skipping job [{job.job_name}]")
+                    job.restore_last_run(scheduled_time)
+                elif not job.mark_pending():
+                    logger.info(f"Job [{job.job_name}] is still pending or running, skipping its run at {scheduled_time}")
+                else:
+                    self.__dispatch(job, scheduled_time)
+                self.__push_job(job, next_scheduled_time)
+
+    def start_scheduler(self):
+        with self.__condition:
+            if self.__is_running:
+                return
+            self.__is_running = True
+            self.__rebuild_deadlines()
+        self.__scheduler_thread = Thread(target=self.__run_scheduler, name="background-jobs-scheduler")
+        self.__scheduler_thread.start()
+
+    def stop_scheduler(self):
+        with self.__condition:
+            if not self.__is_running:
+                return
+            self.__is_running = False
+            self.__condition.notify_all()
+        self.__scheduler_thread.join()
+        self.__scheduler_thread = None
+        if self.__lease_backend and self.__is_leader:
+            # Release right away so another replica can take over without waiting for the lease to expire
+            try:
+                self.__lease_backend.release_lease(JOBS_LEASE_NAME, self.__lease_owner)
+            except Exception as e:
+                logger.warn(f"Failed to release background jobs lease [{str(e)}]")
+            self.__is_leader = False
@@ -1,12 +1,17 @@
 import traceback
 from threading import Lock, Thread
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from github.CheckRun import CheckRun
+from github.PullRequest import PullRequest
 
 from octo_bots_python.bots_client import BotsBaseClient
 from octo_bots_python.bots_config import BotDescription
+from octo_bots_python.clients.github_client import GithubAppClient
 from octo_bots_python.common.logger import Logger
 from octo_bots_python.filters.filter import Filter
 from octo_bots_python.filters.filters_loader import FiltersLoader
+from octo_bots_python.operations.async_operation import AsyncOperation
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
 
@@ -35,24 +40,63 @@ class Bot:
     def filter_event(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict) -> bool:
         return any(f.filter_event(clients, headers, event) for f in self.__filters)
 
+    def accept_event(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict) -> Optional[List[CheckRun]]:
+        # Returns None when the bot does not run for the event, otherwise the check runs queued for its operations,
+        # so the PR shows its pending checks while the event waits for the bot
+        if self.filter_event(clients, headers, event):
+            return None
+        queued_check_runs = []
+        names = [name for op in self.__operations for name in op.check_run_names(event)]
+        if len(names) > 0 and GithubAppClient.client_type() in clients.keys():
+            git_client: GithubAppClient = clients[GithubAppClient.client_type()]
+            pr = PullRequest(git_client.rest_impl, headers, event['pull_request'], True)
+            for name in names:
+                try:
+                    check_run = git_client.queue_check_run(name, pr)
+                    if check_run:
+                        queued_check_runs.append(check_run)
+                except:
+                    logger.warn(traceback.format_exc())
+        return queued_check_runs
+
+    def __skip_queued_check_runs(self, clients: Dict[str, BotsBaseClient], queued_check_runs: List[CheckRun]):
+        try:
+            if len(queued_check_runs) > 0:
+                git_client: GithubAppClient = clients[GithubAppClient.client_type()]
+                git_client.skip_queued_check_runs(queued_check_runs)
+        except:
+            logger.warn(traceback.format_exc())
+
     def __execute_operation(self, operation: Operation, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         try:
             logger.info(f"Executing operation {operation.operation_type()} for bot {self.name}")
-            operation.execute_operation(clients, headers, event)
+            if isinstance(operation, AsyncOperation):
+                AsyncOperation.execute_async_operations([operation], clients, headers, event)
+            else:
+                operation.execute_operation(clients, headers, event)
         except:
             logger.warn(traceback.format_exc())
 
-    def execute_operations(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+    def execute_operations(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict,
+                           queued_check_runs: Optional[List[CheckRun]] = None):
+        # An event accepted beforehand (with its queued check runs) is not filtered again
         self.__bot_lock.acquire()
         try:
-            if not self.filter_event(clients, headers, event):
+            if queued_check_runs is not None or not self.filter_event(clients, headers, event):
                 logger.info(f"Running bot {self.name} for event")
                 if self.__parallel:
                     threads = []
                     for op in self.__operations:
+                        if isinstance(op, AsyncOperation):
+                            continue
                         t = Thread(target=self.__execute_operation, args=(op, clients, headers, event,))
                         threads.append(t)
                         t.start()
+                    # Async operations run concurrently on the shared event loop
+                    async_operations = [op for op in self.__operations if isinstance(op, AsyncOperation)]
+                    if len(async_operations) > 0:
+                        logger.info(f"Executing {len(async_operations)} async operations for bot {self.name}")
+                        AsyncOperation.execute_async_operations(async_operations, clients, headers, event)
                     for t in threads:
                         t.join()
                 else:
@@ -62,6 +106,8 @@ class Bot:
                 logger.info(f"Not running bot {self.name} for this event")
         finally:
             self.__bot_lock.release()
+            # Whatever was not started by the operations is left queued otherwise
+            self.__skip_queued_check_runs(clients, queued_check_runs or [])
 
     @staticmethod
     def create_bots_from_file(config: dict) -> "List[Bot]":
@@ -9,6 +9,10 @@ class BotsSettings(BaseModel):
     bots_endpoint: str = Field(default="/events", alias="bots-endpoint")
     client_validity_time_minutes: int = Field(default=10, alias="client-validity-time-minutes")
     parallel_bots: bool = Field(default=True, alias="parallel-bots")
+    tool_runner_cpu_slots: Optional[int] = Field(default=None, alias="tool-runner-cpu-slots")
+    tool_runner_memory_limit_mb: Optional[int] = Field(default=None, alias="tool-runner-memory-limit-mb")
+    tool_runner_cpu_time_limit_seconds: Optional[int] = Field(default=None, alias="tool-runner-cpu-time-limit-seconds")
+    tool_runner_background_nice: int = Field(default=10, alias="tool-runner-background-nice")
 
 
 class BotsGithubCredentialsConfig(BaseModel):
@@ -55,6 +59,8 @@ class BackgroundJobDescription(BaseModel):
     name: str
     every: str
     parallel: bool = Field(default=True)
+    jitter: Optional[str] = Field(default=None)
+    catch_up: str = Field(default="run-once", alias="catch-up")
     operations: List[Dict[str, Dict[str, Any]]] = Field(default=[])
     filters: List[Dict[str, Dict[str, Any]]] = Field(default=[])
 
@@ -1,21 +1,27 @@
+import datetime
 import json
 import os
-import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock, Thread
-from typing import Callable, Dict, List, Union
+from typing import Callable, Dict, List, Tuple, Union
 
 import yaml
 from flask import Flask, abort, request
+from github.CheckRun import CheckRun
 
 from octo_bots_python.background_job import BackgroundJob
+from octo_bots_python.background_jobs_scheduler import BackgroundJobsScheduler
 from octo_bots_python.bot import Bot
 from octo_bots_python.bots_client import BotsBaseClient, BotsBaseCredentials
 from octo_bots_python.bots_settings import BotsSettings
 from octo_bots_python.clients.checkmarx_client import CheckmarxCredentials
 from octo_bots_python.clients.github_client import GithubAppCredentials
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import ToolRunner
+from octo_bots_python.leases.leases_loader import LeasesLoader
+from octo_bots_python.stores.background_jobs_state_store import \
+    BackgroundJobsStateStore
 
 SETTINGS_KEY = 'settings'
 CREDENTIALS_KEY = 'credentials'
@@ -37,7 +43,7 @@ class BotsFlaskManager:
         self.__clients = {}
         self.__clients_lock = Lock()
         self.__running_background_jobs_pool = None
-        self.__jobs_thread = None
+        self.__jobs_scheduler = None
         self.__is_running = False
 
         logger.info("bots manager created with " + str(len(self.__jobs)) + " jobs and " +
@@ -94,21 +100,17 @@ class BotsFlaskManager:
                 except Exception as e:
                     raise Exception("Could not load configuration [" + str(e) + ']')
 
-    def __running_job_thread(self, job: BackgroundJob, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+    def __running_job_thread(self, job: BackgroundJob, clients: Dict[str, BotsBaseClient], headers: dict, event: dict,
+                             scheduled_time: datetime.datetime):
         try:
             self.__recreate_clients()
-            job.execute_job(clients, headers, event)
+            job.execute_job(clients, headers, event, scheduled_time)
         except:
             logger.warn(traceback.format_exc())
 
-    def __jobs_control_thread(self):
-        while self.__is_running:
-            for job in self.__jobs:
-                if job.ready_to_run():
-                    # TODO - Change the headers and event to not be empty but input from somewhere
-                    logger.info(f"Adding job [{job.job_name}]")
-                    self.__running_background_jobs_pool.submit(self.__running_job_thread, job, self.__clients, {}, {})
-            time.sleep(self.__settings.background_jobs_control_thread_tick_seconds)
+    def __dispatch_job(self, job: BackgroundJob, scheduled_time: datetime.datetime):
+        # TODO - Change the headers and event to not be empty but input from somewhere
+        self.__running_background_jobs_pool.submit(self.__running_job_thread, job, self.__clients, {}, {}, scheduled_time)
 
     def __recreate_clients(self):
         try:
@@ -120,8 +122,23 @@ class BotsFlaskManager:
         finally:
             self.__clients_lock.release()
 
-    def __execute_bot(self, bot: Bot, headers: dict, event: dict):
-        bot.execute_operations(self.__clients, headers, event)
+    def __execute_bot(self, bot: Bot, headers: dict, event: dict, queued_check_runs: List[CheckRun]):
+        bot.execute_operations(self.__clients, headers, event, queued_check_runs)
+
+    def __accept_event(self, headers: dict, event: dict) -> List[Tuple[Bot, List[CheckRun]]]:
+        # Every bot accepts the event (queueing its check runs) before any of them runs
+        accepted_bots = []
+        for bot in self.__bots:
+            try:
+                queued_check_runs = bot.accept_event(self.__clients, headers, event)
+            except:
+                logger.warn(traceback.format_exc())
+                continue
+            if queued_check_runs is not None:
+                accepted_bots.append((bot, queued_check_runs))
+            else:
+                logger.info(f"Not running bot {bot.name} for this event")
+        return accepted_bots
 
     def __endpoint(self):
         if not self.__is_running:
@@ -139,17 +156,18 @@ class BotsFlaskManager:
                 else request.get_json()
             )
             logger.info("Running bots for event")
+            accepted_bots = self.__accept_event(request.headers, data)
             if self.__settings.parallel_bots:
                 threads = []
-                for bot in self.__bots:
-                    t = Thread(target=self.__execute_bot, args=(bot, request.headers, data,))
+                for bot, queued_check_runs in accepted_bots:
+                    t = Thread(target=self.__execute_bot, args=(bot, request.headers, data, queued_check_runs,))
                     threads.append(t)
                     t.start()
                 for t in threads:
                     t.join()
             else:
-                for bot in self.__bots:
-                    self.__execute_bot(bot, request.headers, data)
+                for bot, queued_check_runs in accepted_bots:
+                    self.__execute_bot(bot, request.headers, data, queued_check_runs)
             logger.info("Finished running bots")
         except Exception as e:
             logger.warn("Error occured: [" + traceback.format_exc() + "]")
@@ -166,14 +184,26 @@ class BotsFlaskManager:
         # Create the client
         self.__recreate_clients()
 
+        # All of the operations share a single budget for the tools they run
+        ToolRunner.configure(self.__settings.tool_runner_cpu_slots, self.__settings.tool_runner_memory_limit_mb,
+                             self.__settings.tool_runner_cpu_time_limit_seconds, self.__settings.tool_runner_background_nice)
+
         # Start the bots endpoint
         self.__app.add_url_rule(self.__settings.bots_endpoint, self.__settings.bots_endpoint, self.__endpoint, methods=["POST"])
 
-        # Create the jobs thread if at least one job was registered
-        if len(self.__jobs) > 0:
-            self.__running_background_jobs_pool = ThreadPoolExecutor(max_workers=self.__settings.parallel_background_jobs)
-            self.__jobs_thread = Thread(target=self.__jobs_control_thread)
-            self.__jobs_thread.start()
+        # Create the jobs scheduler
+        self.__running_background_jobs_pool = ThreadPoolExecutor(max_workers=self.__settings.parallel_background_jobs)
+        state_store = None
+        if self.__settings.background_jobs_state_path:
+            state_store = BackgroundJobsStateStore(self.__settings.background_jobs_state_path)
+        lease_backend = None
+        if self.__settings.background_jobs_lease:
+            for k in self.__settings.background_jobs_lease.keys():
+                lease_backend = LeasesLoader.load_lease_backend(k, self.__settings.background_jobs_lease[k])
+        self.__jobs_scheduler = BackgroundJobsScheduler(self.__jobs, self.__dispatch_job, state_store,
+                                                        self.__settings.background_jobs_catch_up_spread_seconds,
+                                                        lease_backend, self.__settings.background_jobs_lease_ttl_seconds)
+        self.__jobs_scheduler.start_scheduler()
 
     def stop_bots_manager(self):
         if not self.__is_running:
@@ -182,7 +212,8 @@ class BotsFlaskManager:
         logger.info("Stopping bots manager")
 
         self.__is_running = False
-        if self.__jobs_thread:
-            self.__running_background_jobs_pool = None
-            self.__jobs_thread.join()
-            self.__jobs_thread = None
\ No newline at end of file
+        if self.__jobs_scheduler:
+            self.__jobs_scheduler.stop_scheduler()
+            self.__jobs_scheduler = None
+            self.__running_background_jobs_pool.shutdown(wait=False)
+            self.__running_background_jobs_pool = None
\ No newline at end of file
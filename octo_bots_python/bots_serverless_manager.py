@@ -3,9 +3,10 @@ import os
 import time
 import traceback
 from threading import Thread
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, Dict, List, Tuple, Union
 
 import yaml
+from github.CheckRun import CheckRun
 
 from octo_bots_python.background_job import BackgroundJob
 from octo_bots_python.bot import Bot
@@ -15,6 +16,7 @@ from octo_bots_python.bots_settings import BotsSettings
 from octo_bots_python.clients.checkmarx_client import CheckmarxCredentials
 from octo_bots_python.clients.github_client import GithubAppCredentials
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import ToolRunner
 
 logger = Logger("bots_manager")
 
@@ -27,6 +29,11 @@ class BotsServerlessManager:
         self.__credentials: Dict[str, BotsBaseCredentials] = self.__load_credentials()
         self.__clients = {}
 
+        # All of the operations share a single budget for the tools they run
+        settings = self.__config.settings
+        ToolRunner.configure(settings.tool_runner_cpu_slots, settings.tool_runner_memory_limit_mb,
+                             settings.tool_runner_cpu_time_limit_seconds, settings.tool_runner_background_nice)
+
         logger.info("bots manager created with " + str(len(self.__background_jobs)) + " jobs and " +
                     str(len(self.__bots)) + " bots")
 
@@ -82,8 +89,23 @@ class BotsServerlessManager:
                 CheckmarxCredentials.create_checkmarx_credentials_from_config(self.__config.credentials[BotsCredsType.Checkmarx])
         return creds
 
-    def __execute_bot(self, bot: Bot, headers: dict, event: dict):
-        bot.execute_operations(self.__clients, headers, event)
+    def __execute_bot(self, bot: Bot, headers: dict, event: dict, queued_check_runs: List[CheckRun]):
+        bot.execute_operations(self.__clients, headers, event, queued_check_runs)
+
+    def __accept_event(self, headers: dict, event: dict) -> List[Tuple[Bot, List[CheckRun]]]:
+        # Every bot accepts the event (queueing its check runs) before any of them runs
+        accepted_bots = []
+        for bot in self.__bots:
+            try:
+                queued_check_runs = bot.accept_event(self.__clients, headers, event)
+            except:
+                logger.warn(traceback.format_exc())
+                continue
+            if queued_check_runs is not None:
+                accepted_bots.append((bot, queued_check_runs))
+            else:
+                logger.info(f"Not running bot {bot.name} for this event")
+        return accepted_bots
 
     def process_bots_request(self, request: Dict[str, Any]) -> bool:
         try:
@@ -94,17 +116,18 @@ class BotsServerlessManager:
                     return False
             logger.info(f"Running valid request")
             data = json.loads(request["body"])
+            accepted_bots = self.__accept_event(request["headers"], data)
             if self.__config.settings.parallel_bots:
                 threads = []
-                for bot in self.__bots:
-                    t = Thread(target=self.__execute_bot, args=(bot, request["headers"], data,))
+                for bot, queued_check_runs in accepted_bots:
+                    t = Thread(target=self.__execute_bot, args=(bot, request["headers"], data, queued_check_runs,))
                     threads.append(t)
                     t.start()
                 for t in threads:
                     t.join()
             else:
-                for bot in self.__bots:
-                    self.__execute_bot(bot, request["headers"], data)
+                for bot, queued_check_runs in accepted_bots:
+                    self.__execute_bot(bot, request["headers"], data, queued_check_runs)
         except Exception as e:
             logger.warn("Error occured: [" + traceback.format_exc() + "]")
             return False
@@ -1,22 +1,49 @@
+from octo_bots_python.common.logger import Logger
+
 PARALLEL_BACKGROUND_JOBS_KEY = 'parallel-background-jobs'
 BOTS_ENDPOINT_KEY = 'bots-endpoint'
 CLIENT_VALIDITY_TIME_MINUTES_KEY = 'client-validity-time-minutes'
-BACKGROUND_JOBS_CONTROL_THREAD_TICK_SECONDS_KEY = 'background-jobs-control-thread-tick-seconds'
+# No longer used, jobs are scheduled on their next run time instead of a polling tick
+DEPRECATED_BACKGROUND_JOBS_CONTROL_THREAD_TICK_SECONDS_KEY = 'background-jobs-control-thread-tick-seconds'
 PARALLEL_BOTS_KEY = 'parallel-bots'
+BACKGROUND_JOBS_STATE_PATH_KEY = 'background-jobs-state-path'
+BACKGROUND_JOBS_CATCH_UP_SPREAD_SECONDS_KEY = 'background-jobs-catch-up-spread-seconds'
+BACKGROUND_JOBS_LEASE_KEY = 'background-jobs-lease'
+BACKGROUND_JOBS_LEASE_TTL_SECONDS_KEY = 'background-jobs-lease-ttl-seconds'
+TOOL_RUNNER_CPU_SLOTS_KEY = 'tool-runner-cpu-slots'
+TOOL_RUNNER_MEMORY_LIMIT_MB_KEY = 'tool-runner-memory-limit-mb'
+TOOL_RUNNER_CPU_TIME_LIMIT_SECONDS_KEY = 'tool-runner-cpu-time-limit-seconds'
+TOOL_RUNNER_BACKGROUND_NICE_KEY = 'tool-runner-background-nice'
 MANDATORY_KEYS = [PARALLEL_BACKGROUND_JOBS_KEY, BOTS_ENDPOINT_KEY, CLIENT_VALIDITY_TIME_MINUTES_KEY,
                   PARALLEL_BOTS_KEY]
 
+logger = Logger("bots_settings")
+
 
 class BotsSettings:
     def __init__(self, parallel_background_jobs: int, bots_endpoint: str,
                  client_validity_time_minutes: int,
                  parallel_bots: bool,
-                 background_jobs_control_thread_tick_seconds: int = 5):
+                 background_jobs_state_path: str = None,
+                 background_jobs_catch_up_spread_seconds: int = 60,
+                 background_jobs_lease: dict = None,
+                 background_jobs_lease_ttl_seconds: int = 30,
+                 tool_runner_cpu_slots: int = None,
+                 tool_runner_memory_limit_mb: int = None,
+                 tool_runner_cpu_time_limit_seconds: int = None,
+                 tool_runner_background_nice: int = 10):
         self.__parallel_background_jobs = parallel_background_jobs
         self.__bots_endpoint = bots_endpoint
         self.__client_validity_time_minutes = client_validity_time_minutes
-        self.__background_jobs_control_thread_tick_seconds = background_jobs_control_thread_tick_seconds
         self.__parallel_bots = parallel_bots
+        self.__background_jobs_state_path = background_jobs_state_path
+        self.__background_jobs_catch_up_spread_seconds = background_jobs_catch_up_spread_seconds
+        self.__background_jobs_lease = background_jobs_lease
+        self.__background_jobs_lease_ttl_seconds = background_jobs_lease_ttl_seconds
+        self.__tool_runner_cpu_slots = tool_runner_cpu_slots
+        self.__tool_runner_memory_limit_mb = tool_runner_memory_limit_mb
+        self.__tool_runner_cpu_time_limit_seconds = tool_runner_cpu_time_limit_seconds
+        self.__tool_runner_background_nice = tool_runner_background_nice
 
     @property
     def parallel_background_jobs(self) -> int:
@@ -30,18 +57,55 @@ class BotsSettings:
     def client_validity_time_minutes(self):
         return self.__client_validity_time_minutes
 
-    @property
-    def background_jobs_control_thread_tick_seconds(self):
-        return self.__background_jobs_control_thread_tick_seconds
-
     @property
     def parallel_bots(self):
         return self.__parallel_bots
 
+    @property
+    def background_jobs_state_path(self):
+        return self.__background_jobs_state_path
+
+    @property
+    def background_jobs_catch_up_spread_seconds(self):
+        return self.__background_jobs_catch_up_spread_seconds
+
+    @property
+    def background_jobs_lease(self):
+        return self.__background_jobs_lease
+
+    @property
+    def background_jobs_lease_ttl_seconds(self):
+        return self.__background_jobs_lease_ttl_seconds
+
+    @property
+    def tool_runner_cpu_slots(self):
+        return self.__tool_runner_cpu_slots
+
+    @property
+    def tool_runner_memory_limit_mb(self):
+        return self.__tool_runner_memory_limit_mb
+
+    @property
+    def tool_runner_cpu_time_limit_seconds(self):
+        return self.__tool_runner_cpu_time_limit_seconds
+
+    @property
+    def tool_runner_background_nice(self):
+        return self.__tool_runner_background_nice
+
     @staticmethod
     def create_bots_settings(config: dict) -> "BotsSettings":
         if any(key not in config.keys() for key in MANDATORY_KEYS):
             raise Exception("Missing mandatory keys for bots settings")
+        if DEPRECATED_BACKGROUND_JOBS_CONTROL_THREAD_TICK_SECONDS_KEY in config.keys():
+            logger.warn(f"Ignoring deprecated bots setting [{DEPRECATED_BACKGROUND_JOBS_CONTROL_THREAD_TICK_SECONDS_KEY}]")
         return BotsSettings(config[PARALLEL_BACKGROUND_JOBS_KEY], config[BOTS_ENDPOINT_KEY],
                             config[CLIENT_VALIDITY_TIME_MINUTES_KEY], config[PARALLEL_BOTS_KEY],
-                            config.get(BACKGROUND_JOBS_CONTROL_THREAD_TICK_SECONDS_KEY, 5))
+                            config.get(BACKGROUND_JOBS_STATE_PATH_KEY),
+                            config.get(BACKGROUND_JOBS_CATCH_UP_SPREAD_SECONDS_KEY, 60),
+                            config.get(BACKGROUND_JOBS_LEASE_KEY),
+                            config.get(BACKGROUND_JOBS_LEASE_TTL_SECONDS_KEY, 30),
+                            config.get(TOOL_RUNNER_CPU_SLOTS_KEY),
+                            config.get(TOOL_RUNNER_MEMORY_LIMIT_MB_KEY),
+                            config.get(TOOL_RUNNER_CPU_TIME_LIMIT_SECONDS_KEY),
+                            config.get(TOOL_RUNNER_BACKGROUND_NICE_KEY, 10))
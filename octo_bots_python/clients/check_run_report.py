@@ -0,0 +1,81 @@
+from typing import List, Optional
+
+from github.CheckRun import CheckRun
+
+from octo_bots_python.clients.github_client import GithubAppClient
+
+# Github rejects check run texts above 65535 characters and more than 50 annotations per request
+DEFAULT_MAX_TEXT_SIZE = 65000
+ANNOTATIONS_BATCH_SIZE = 50
+MAX_ANNOTATION_MESSAGE_SIZE = 4096
+TRUNCATION_NOTE_RESERVE = 200
+
+ANNOTATION_NOTICE = 'notice'
+ANNOTATION_WARNING = 'warning'
+ANNOTATION_FAILURE = 'failure'
+
+
+class CheckRunReport:
+    def __init__(self, git_client: GithubAppClient, check_run: CheckRun, title: str, text_prefix: str = '', text_suffix: str = '',
+                 max_text_size: int = DEFAULT_MAX_TEXT_SIZE):
+        self.__git_client = git_client
+        self.__check_run = check_run
+        self.__title = title
+        self.__text_prefix = text_prefix
+        self.__text_suffix = text_suffix
+        # Room is kept for the truncation note, so the final text never passes the limit
+        self.__text_budget = max_text_size - TRUNCATION_NOTE_RESERVE - len(text_prefix) - len(text_suffix)
+        self.__text_parts: List[str] = []
+        self.__text_size = 0
+        self.__omitted_parts = 0
+        self.__annotations: List[dict] = []
+        self.__annotations_count = 0
+
+    @property
+    def annotations_count(self) -> int:
+        return self.__annotations_count
+
+    @property
+    def is_empty(self) -> bool:
+        return self.__text_size == 0 and self.__omitted_parts == 0 and self.__annotations_count == 0
+
+    def add_text(self, text: str) -> bool:
+        # Parts are kept only while they fit the budget, once one does not fit the rest are only counted
+        if self.__omitted_parts == 0 and self.__text_size + len(text) <= self.__text_budget:
+            self.__text_parts.append(text)
+            self.__text_size += len(text)
+            return True
+        self.__omitted_parts += 1
+        return False
+
+    def add_annotation(self, path: str, start_line: int, end_line: int, level: str, message: str, title: Optional[str] = None):
+        annotation = {'path': path, 'start_line': start_line, 'end_line': end_line,
+                      'annotation_level': level, 'message': message[:MAX_ANNOTATION_MESSAGE_SIZE]}
+        if title:
+            annotation['title'] = title
+        self.__annotations.append(annotation)
+        self.__annotations_count += 1
+        # Full batches are sent right away, so at most a single batch is kept in memory
+        if len(self.__annotations) == ANNOTATIONS_BATCH_SIZE:
+            self.__git_client.update_check_run(self.__check_run,
+                {'title': self.__title,
+                'summary': f"Found {self.__annotations_count} issues so far",
+                'annotations': self.__annotations})
+            self.__annotations = []
+
+    def report_progress(self, summary: str) -> bool:
+        # Only the summary is sent, the text and the pending annotations are kept for the completion
+        return self.__git_client.update_check_run(self.__check_run, {'title': self.__title, 'summary': summary})
+
+    def __text(self) -> str:
+        text = self.__text_prefix + ''.join(self.__text_parts) + self.__text_suffix if self.__text_size > 0 else ''
+        if self.__omitted_parts > 0:
+            text += f"\n{self.__omitted_parts} more entries were omitted, the report is limited to {self.__text_budget} characters"
+        return text
+
+    def complete(self, conclusion: str, summary: str):
+        output = {'title': self.__title, 'summary': summary, 'text': self.__text()}
+        if len(self.__annotations) > 0:
+            output['annotations'] = self.__annotations
+        self.__git_client.complete_check_run(self.__check_run, conclusion, output)
+        self.__annotations = []
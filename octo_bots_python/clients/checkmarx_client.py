@@ -1,12 +1,17 @@
 import datetime
 import os
-from typing import Any, Dict, List, Optional
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
 
+import requests
 import yaml
 
 from octo_bots_python.bots_client import (INFINITE_CLIENT_VALIDITY_TIME,
                                           BotsBaseClient, BotsBaseCredentials)
 from octo_bots_python.bots_config import BotsCheckmarxCredentialsConfig
+from octo_bots_python.common.circuit_breaker import (CircuitBreaker,
+                                                     CircuitBreakerProxy)
 from octo_bots_python.common.logger import Logger
 
 CREDS_NAME = 'checkmarx-credentials'
@@ -27,6 +32,8 @@ MANDATORY_CREDS_KEYS = [CREDS_USERNAME, CREDS_PASSWORD,
                         CREDS_GRANT_TYPE, CREDS_SCOPE, CREDS_CLIENT_ID_KEY,
                         CREDS_CLIENT_SECRET_KEY, CREDS_TEAM_FULL_NAME_KEY]
 
+DEFAULT_PROJECTS_INDEX_TTL_SECONDS = 600
+
 ENV_VAR_CREDS_URL = "cxsast_base_url"
 ENV_VAR_CREDS_USERNAME = "cxsast_username"
 ENV_VAR_CREDS_PASSWORD = "cxsast_password"
@@ -109,18 +116,35 @@ class CheckmarxCredentials(BotsBaseCredentials):
 
 
 class CheckmarxClient(BotsBaseClient):
-    def __init__(self, api_url: str, team_full_name: str, validity_time_minutes: int):
+    # Project name to project index per team, kept on the class as clients are recreated once their validity passes
+    __projects_indexes: Dict[str, Tuple[float, Dict[str, "CxProject"]]] = {}
+    __projects_indexes_lock = Lock()
+
+    def __init__(self, api_url: str, team_full_name: str, validity_time_minutes: int,
+                 projects_index_ttl_seconds: int = DEFAULT_PROJECTS_INDEX_TTL_SECONDS):
         # Checkmarx as an internal config which we cannot import until here
         from CheckmarxPythonSDK.CxRestAPISDK import (ProjectsAPI, ScansAPI,
                                                      TeamAPI)
         self.__api_url = api_url
         self.__team_full_name = team_full_name
         self.__validity_time_minutes = validity_time_minutes
-        self.__projects_api = ProjectsAPI()
-        self.__teams_api = TeamAPI()
-        self.__scans_api = ScansAPI()
+        # A single breaker for the checkmarx api, so a dead instance fails fast instead of waiting on every sdk timeout
+        self.__circuit_breaker = CircuitBreaker.get_breaker(f"checkmarx {api_url}", CheckmarxClient.__is_service_failure)
+        self.__projects_api = CircuitBreakerProxy(ProjectsAPI(), self.__circuit_breaker)
+        self.__teams_api = CircuitBreakerProxy(TeamAPI(), self.__circuit_breaker)
+        self.__scans_api = CircuitBreakerProxy(ScansAPI(), self.__circuit_breaker)
         self.__team_id = self.__teams_api.get_team_id_by_team_full_name(self.__team_full_name)
         self.__client_creation_time = datetime.datetime.now()
+        self.__projects_index_ttl_seconds = projects_index_ttl_seconds
+
+    @staticmethod
+    def __is_service_failure(error: BaseException) -> bool:
+        # Only server errors and unreachable servers count, client errors (not found, bad request) are answers of a working service
+        # and any other error is a bug of the bots rather than of checkmarx
+        from CheckmarxPythonSDK.CxRestAPISDK.exceptions.CxError import CxError
+        if isinstance(error, CxError):
+            return isinstance(error.code, int) and error.code >= 500
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
 
     def __update_validaty_time(self):
         # Checkmarx resets token validity on usage
@@ -130,6 +154,10 @@ class CheckmarxClient(BotsBaseClient):
     def api_url(self) -> str:
         return self.__api_url
 
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        return self.__circuit_breaker
+
     @property
     def projects_client(self) -> "ProjectsAPI":
         self.__update_validaty_time()
@@ -153,6 +181,49 @@ class CheckmarxClient(BotsBaseClient):
     def team_id(self) -> str:
         return str(self.__team_id)
 
+    def __projects_index(self) -> Dict[str, "CxProject"]:
+        # Listed again only once the ttl passes, in between the index is kept up to date by the bots own changes
+        with CheckmarxClient.__projects_indexes_lock:
+            listed_at, projects = CheckmarxClient.__projects_indexes.get(self.team_id, (0, {}))
+            if time.time() - listed_at < self.__projects_index_ttl_seconds:
+                return projects
+        projects = {project.name: project for project in self.projects_client.get_all_project_details(team_id=self.team_id)}
+        logger.debug(f"Listed {len(projects)} checkmarx projects of team {self.__team_full_name}")
+        with CheckmarxClient.__projects_indexes_lock:
+            CheckmarxClient.__projects_indexes[self.team_id] = (time.time(), projects)
+        return projects
+
+    def get_project_by_name(self, name: str) -> Optional["CxProject"]:
+        return self.__projects_index().get(name)
+
+    def list_projects(self) -> List["CxProject"]:
+        projects = self.__projects_index()
+        with CheckmarxClient.__projects_indexes_lock:
+            return list(projects.values())
+
+    def add_project(self, project: "CxProject"):
+        # Called once the bot creates a project, so the index does not have to be listed again
+        with CheckmarxClient.__projects_indexes_lock:
+            if self.team_id in CheckmarxClient.__projects_indexes:
+                CheckmarxClient.__projects_indexes[self.team_id][1][project.name] = project
+
+    def remove_project(self, name: str):
+        with CheckmarxClient.__projects_indexes_lock:
+            if self.team_id in CheckmarxClient.__projects_indexes:
+                CheckmarxClient.__projects_indexes[self.team_id][1].pop(name, None)
+
+    def invalidate_projects_index(self):
+        # Projects may also be changed outside of the bots, in which case the next lookup lists them again
+        with CheckmarxClient.__projects_indexes_lock:
+            CheckmarxClient.__projects_indexes.pop(self.team_id, None)
+
+    def cancel_scan(self, scan_id: int):
+        # Newer sdks have a dedicated call, older ones only cancel through the scans queue (which always sets Canceled)
+        if hasattr(self.scans_client, 'cancel_scan'):
+            self.scans_client.cancel_scan(scan_id)
+        else:
+            self.scans_client.update_queued_scan_status_by_scan_id(scan_id)
+
     def is_valid_client(self) -> bool:
         # Refresh it one minute before it ends
         return ((datetime.datetime.now() - self.__client_creation_time).total_seconds() / 60) < max(0, self.__validity_time_minutes - 1)
@@ -0,0 +1,69 @@
+from typing import Dict, Optional
+
+from github.CheckRun import CheckRun
+
+from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.logger import Logger
+
+RISK_SCHEME_MIN_HIGH_KEY = 'min-high-vuls'
+RISK_SCHEME_MIN_MEDIUM_KEY = 'min-medium-vuls'
+RISK_SCHEME_MIN_LOW_KEY = 'min-low-vuls'
+RISK_SCHEME_MIN_INFO_KEY = 'min-info-vuls'
+MANDATORY_RISK_SCHEME_KEYS = [RISK_SCHEME_MIN_HIGH_KEY, RISK_SCHEME_MIN_MEDIUM_KEY, RISK_SCHEME_MIN_LOW_KEY, RISK_SCHEME_MIN_INFO_KEY]
+
+SCAN_DONE_STATES = ["Finished", "Canceled", "Failed"]
+SCAN_FAILED_STATES = ["Canceled", "Failed"]
+SCAN_CANCELED_STATE = "Canceled"
+SCAN_FINISHED_STATE = "Finished"
+
+logger = Logger("checkmarx_scan_result")
+
+
+def complete_scan_check_run(checkmarx_client: CheckmarxClient, git_client: GithubAppClient, check_run: CheckRun,
+                            scan_details: Optional["CxScanDetail"], project_id: int, risk_scheme: Dict[str, int]):
+    # Shared by the operation waiting on its scan and by the scans tracker, a missing scan detail means a timeout
+    if scan_details is None:
+        git_client.complete_check_run(check_run,
+            "failure",
+            {'title': "Checkmarx Scan",
+            'summary': "Timeout on Scan",
+            'text': ""})
+        return
+    if scan_details.status.name == SCAN_CANCELED_STATE:
+        # Canceled scans are mostly of commits superseded by a newer push, which does not make the check run fail
+        git_client.complete_check_run(check_run,
+            "cancelled",
+            {'title': "Checkmarx Scan",
+            'summary': "Scan Canceled",
+            'text': f"Scan {scan_details.id} was canceled, most likely superseded by a newer commit"})
+        return
+    if scan_details.status.name in SCAN_FAILED_STATES:
+        git_client.complete_check_run(check_run,
+            "failure",
+            {'title': "Checkmarx Scan",
+            'summary': "Scan Failed",
+            'text': scan_details.partial_scan_reasons})
+        return
+    scan_stats = checkmarx_client.scans_client.get_statistics_results_by_scan_id(scan_details.id)
+    scan_url = f"{checkmarx_client.api_url}/CxWebClient/ViewerMain.aspx?scanId={scan_details.id}&ProjectID={project_id}"
+    logger.info(f"Scan results: {str(scan_stats)} for scan {scan_details.id}")
+    text = f'```Scan Summary:\n' + \
+           f'High Severity: {scan_stats.high_severity}\n' + \
+           f'Medium Severity: {scan_stats.medium_severity}\n' + \
+           f'Low Severity: {scan_stats.low_severity}\n' + \
+           f'Info Severity: {scan_stats.info_severity}\n```\nPlease refer to the following url for more info:\n{scan_url}'
+    if scan_stats.high_severity >= risk_scheme[RISK_SCHEME_MIN_HIGH_KEY] or scan_stats.medium_severity >= risk_scheme[RISK_SCHEME_MIN_MEDIUM_KEY] or \
+        scan_stats.low_severity >= risk_scheme[RISK_SCHEME_MIN_LOW_KEY] or scan_stats.info_severity >= risk_scheme[RISK_SCHEME_MIN_INFO_KEY]:
+        # Threshold passed
+        git_client.complete_check_run(check_run,
+            "failure",
+            {'title': "Checkmarx Scan",
+            'summary': f"Scan Finished, but threshold scan was passed",
+            'text': text})
+    else:
+        git_client.complete_check_run(check_run,
+            "success",
+            {'title': "Checkmarx Scan",
+            'summary': f"Scan Finished and threshold scan was not passed",
+            'text': text})
@@ -0,0 +1,171 @@
+import asyncio
+import datetime
+import ssl
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+from github import GithubException
+
+from octo_bots_python.clients.github_paginator import (DEFAULT_PER_PAGE,
+                                                       LINK_PATTERN)
+from octo_bots_python.common.logger import Logger
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 100
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 60
+
+CHECK_RUNS_ACCEPT_HEADER = "application/vnd.github.antiope-preview+json"
+
+logger = Logger("github_async_client")
+
+
+class GithubAsyncClient:
+    # A single session is shared between all clients (clients are recreated with every token refresh)
+    __session: Optional[aiohttp.ClientSession] = None
+    __semaphore: Optional[asyncio.Semaphore] = None
+
+    def __init__(self, api_url: str, access_token: str, certificate_path: Optional[str] = None):
+        self.__api_url = api_url.rstrip('/')
+        self.__access_token = access_token
+        self.__ssl_context = ssl.create_default_context(cafile=certificate_path) if certificate_path else None
+
+    @property
+    def api_url(self) -> str:
+        return self.__api_url
+
+    @staticmethod
+    def __get_session() -> aiohttp.ClientSession:
+        # The session and semaphore are bound to the running loop, so they are created lazily from within it
+        if GithubAsyncClient.__session is None or GithubAsyncClient.__session.closed:
+            GithubAsyncClient.__session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT_SECONDS))
+            GithubAsyncClient.__semaphore = asyncio.Semaphore(DEFAULT_MAX_CONCURRENT_REQUESTS)
+        return GithubAsyncClient.__session
+
+    def __full_url(self, url: str) -> str:
+        if url.startswith("http://") or url.startswith("https://"):
+            return url
+        return f"{self.__api_url}{url}"
+
+    @staticmethod
+    async def close():
+        if GithubAsyncClient.__session is not None and not GithubAsyncClient.__session.closed:
+            await GithubAsyncClient.__session.close()
+        GithubAsyncClient.__session = None
+
+    async def request(self, verb: str, url: str, parameters: Optional[Dict[str, Any]] = None,
+                      input: Optional[Any] = None, headers: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, str], Any]:
+        session = self.__get_session()
+        request_headers = {
+            "Authorization": f"token {self.__access_token}",
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "PyGithub/Python",
+        }
+        if headers:
+            request_headers.update(headers)
+        async with GithubAsyncClient.__semaphore:
+            async with session.request(verb, self.__full_url(url), params=parameters, json=input,
+                                       headers=request_headers, ssl=self.__ssl_context) as response:
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+                data = None
+                if response.status != 204:
+                    data = await response.json(content_type=None)
+                if response.status >= 400:
+                    raise GithubException(response.status, data, response_headers)
+                return response_headers, data
+
+    async def paginate(self, url: str, parameters: Optional[Dict[str, Any]] = None,
+                       list_item: Optional[str] = None) -> AsyncIterator[dict]:
+        parameters = dict(parameters or {})
+        parameters.setdefault("per_page", DEFAULT_PER_PAGE)
+        next_url: Optional[str] = url
+        while next_url:
+            headers, data = await self.request("GET", next_url, parameters)
+            # The next link already carries the query parameters
+            parameters = None
+            if list_item and isinstance(data, dict):
+                data = data.get(list_item, [])
+            for element in data or []:
+                yield element
+            next_url = None
+            for link_url, rel in LINK_PATTERN.findall(headers.get("link", "")):
+                if rel == "next":
+                    next_url = link_url
+
+    async def get_repository(self, repo_url: str) -> dict:
+        _, data = await self.request("GET", repo_url)
+        return data
+
+    async def get_pull_request(self, pr_url: str) -> dict:
+        _, data = await self.request("GET", pr_url)
+        return data
+
+    async def get_pull_request_files(self, pr_url: str) -> List[dict]:
+        return [f async for f in self.paginate(f"{pr_url}/files")]
+
+    async def edit_issue(self, issue_url: str, **fields: Any) -> dict:
+        _, data = await self.request("PATCH", issue_url, input=fields)
+        return data
+
+    async def create_issue_comment(self, issue_url: str, body: str) -> dict:
+        _, data = await self.request("POST", f"{issue_url}/comments", input={'body': body})
+        return data
+
+    async def get_issue_labels(self, issue_url: str) -> List[dict]:
+        return [label async for label in self.paginate(f"{issue_url}/labels")]
+
+    async def set_issue_labels(self, issue_url: str, labels: List[str]) -> List[dict]:
+        _, data = await self.request("PUT", f"{issue_url}/labels", input={'labels': labels})
+        return data
+
+    async def edit_label(self, repo_url: str, name: str, color: str) -> dict:
+        _, data = await self.request("PATCH", f"{repo_url}/labels/{quote(name, safe='')}",
+                                     input={'new_name': name, 'color': color})
+        return data
+
+    async def get_branches(self, repo_url: str) -> List[dict]:
+        return [branch async for branch in self.paginate(f"{repo_url}/branches")]
+
+    async def get_contributors(self, repo_url: str, top: Optional[int] = None) -> List[dict]:
+        if top:
+            _, data = await self.request("GET", f"{repo_url}/contributors", {'per_page': top})
+            return (data or [])[:top]
+        return [contributor async for contributor in self.paginate(f"{repo_url}/contributors")]
+
+    async def get_ref(self, repo_url: str, ref: str) -> Optional[dict]:
+        try:
+            _, data = await self.request("GET", f"{repo_url}/git/ref/{ref}")
+            return data
+        except GithubException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    async def create_ref(self, repo_url: str, ref: str, sha: str) -> dict:
+        _, data = await self.request("POST", f"{repo_url}/git/refs", input={'ref': f"refs/{ref}", 'sha': sha})
+        return data
+
+    async def delete_ref(self, repo_url: str, ref: str):
+        await self.request("DELETE", f"{repo_url}/git/refs/{ref}")
+
+    async def create_check_run(self, repo_url: str, name: str, head_sha: str) -> dict:
+        _, data = await self.request("POST", f"{repo_url}/check-runs",
+                                     input={
+                                         'name': name,
+                                         'head_sha': head_sha,
+                                         'started_at': datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                                         'status': "in_progress"
+                                     },
+                                     headers={"Accept": CHECK_RUNS_ACCEPT_HEADER})
+        return data
+
+    async def complete_check_run(self, check_run_url: str, conclusion: str, output: dict) -> dict:
+        _, data = await self.request("PATCH", check_run_url,
+                                     input={
+                                         'status': 'completed',
+                                         'conclusion': conclusion,
+                                         'completed_at': datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                                         'output': output
+                                     },
+                                     headers={"Accept": CHECK_RUNS_ACCEPT_HEADER})
+        return data
@@ -4,12 +4,14 @@ import hmac
 import json
 import os
 import time
-from typing import Any, Dict, Optional
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import jwt
 import requests
 import yaml
-from github import Consts, Github, GithubIntegration, Requester
+from github import (Consts, Github, GithubException, GithubIntegration,
+                    Requester)
 from github.CheckRun import CheckRun
 from github.Installation import Installation
 from github.PullRequest import PullRequest
@@ -17,6 +19,10 @@ from github.PullRequest import PullRequest
 from octo_bots_python.bots_client import (INFINITE_CLIENT_VALIDITY_TIME,
                                           BotsBaseClient, BotsBaseCredentials)
 from octo_bots_python.bots_config import BotsGithubCredentialsConfig
+from octo_bots_python.clients.github_paginator import (DEFAULT_MAX_WORKERS,
+                                                       DEFAULT_PREFETCH_PAGES,
+                                                       GithubPaginator)
+from octo_bots_python.common.circuit_breaker import CircuitBreaker
 from octo_bots_python.common.logger import Logger
 
 CREDS_NAME = 'github-app-credentials'
@@ -36,6 +42,9 @@ APP_CREDS_WEBHOOK_SECRET_KEY = 'webhook-secret'
 MANDATORY_APP_CREDS_KEYS = [APP_CREDS_APP_ID_KEY, APP_CREDS_CLIENT_ID_KEY,
                             APP_CREDS_CLIENT_SECRET_KEY, APP_CREDS_PRIVATE_KEY_PATH, APP_CREDS_WEBHOOK_SECRET_KEY]
 
+DEFAULT_RATE_LIMIT_RESERVE = 100
+DEFAULT_CHECK_RUN_UPDATE_INTERVAL_SECONDS = 10
+
 X_HUB_SIG_HEADER_KEY = "X-Hub-Signature"
 X_GITHUB_EVENT_KEY = "X-GitHub-Event"
 
@@ -208,7 +217,7 @@ class GithubAppCredentials(BotsBaseCredentials):
                                 verify=self.certificate_path)
             installation_client = self.__get_installation_client(self.__github_config.api_url, git_client, jwt, inst_id)
             return GithubAppClient(git_client, installation_client, self.__github_config.webhook_secret.get_secret_value(),
-                                   validity_time_minutes)
+                                   validity_time_minutes, self.__github_config.api_url, access_token, self.certificate_path)
         else:
             if not os.path.exists(self.app_creds_path):
                 raise Exception("App creds path invalid for git client")
@@ -225,7 +234,8 @@ class GithubAppCredentials(BotsBaseCredentials):
                     base_url=self.api_url,
                     verify=self.certificate_path)
                 installation_client = self.__get_installation_client(self.__api_url, git_client, jwt, inst_id)
-                return GithubAppClient(git_client, installation_client, app_creds[APP_CREDS_WEBHOOK_SECRET_KEY], validity_time_minutes)
+                return GithubAppClient(git_client, installation_client, app_creds[APP_CREDS_WEBHOOK_SECRET_KEY], validity_time_minutes,
+                                       self.__api_url, access_token, self.certificate_path)
 
     @staticmethod
     def creds_type() -> str:
@@ -237,12 +247,37 @@ class GithubAppCredentials(BotsBaseCredentials):
 
 
 class GithubAppClient(BotsBaseClient):
-    def __init__(self, authenticated_github_client: Github, installation_client: Installation, webhook_secret: str, validity_time_minutes=INFINITE_CLIENT_VALIDITY_TIME):
+    # Check runs queued when an event is accepted (by repo, head sha and name), taken over by create_check_run once the
+    # operation starts, shared by every client as clients are recreated while events wait
+    __queued_check_runs: Dict[Tuple[str, str, str], Union[CheckRun, object]] = {}
+    __queued_check_runs_lock = Lock()
+
+    def __init__(self, authenticated_github_client: Github, installation_client: Installation, webhook_secret: str, validity_time_minutes=INFINITE_CLIENT_VALIDITY_TIME,
+                 api_url: Optional[str] = None, access_token: Optional[str] = None, certificate_path: Optional[str] = None):
         self.__github_client = authenticated_github_client
         self.__installation_client = installation_client
         self.__webhook_secret = webhook_secret
         self.__validity_time_minutes = validity_time_minutes
         self.__client_creation_time = datetime.datetime.now()
+        self.__api_url = api_url
+        self.__access_token = access_token
+        self.__certificate_path = certificate_path
+        self.__async_client = None
+        self.__async_client_lock = Lock()
+        self.__check_run_updates: Dict[str, float] = {}
+        self.__check_run_updates_lock = Lock()
+        # Every rest call (PyGithub objects, paginators) goes through the requester, so it is guarded by a single breaker
+        self.__circuit_breaker = CircuitBreaker.get_breaker(f"github {api_url or Consts.DEFAULT_BASE_URL}", GithubAppClient.__is_service_failure)
+        requester = self.__github_client._Github__requester
+        request_json_and_check = requester.requestJsonAndCheck
+        requester.requestJsonAndCheck = lambda *args, **kwargs: self.__circuit_breaker.call(request_json_and_check, *args, **kwargs)
+
+    @staticmethod
+    def __is_service_failure(error: BaseException) -> bool:
+        # Client errors (not found, validation) are answers of a working service
+        if isinstance(error, GithubException):
+            return error.status >= 500
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
 
     def __format_event(self, event_type, data):
         try:
@@ -262,6 +297,30 @@ class GithubAppClient(BotsBaseClient):
     def installation_impl(self) -> Installation:
         return self.__installation_client
 
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        return self.__circuit_breaker
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.__access_token
+
+    @property
+    def certificate_path(self) -> Optional[str]:
+        return self.__certificate_path
+
+    @property
+    def async_impl(self) -> "GithubAsyncClient":
+        if not self.__access_token:
+            raise Exception("Async github client requires an access token")
+        with self.__async_client_lock:
+            if self.__async_client is None:
+                # Only import on demand, aiohttp is not needed for purely synchronous bots
+                from octo_bots_python.clients.github_async_client import \
+                    GithubAsyncClient
+                self.__async_client = GithubAsyncClient(self.__api_url, self.__access_token, self.__certificate_path)
+            return self.__async_client
+
     def is_valid_client(self) -> bool:
         # Refresh it one minute before it ends
         return ((datetime.datetime.now() - self.__client_creation_time).total_seconds() / 60) < max(0, self.__validity_time_minutes - 1)
@@ -290,7 +349,101 @@ class GithubAppClient(BotsBaseClient):
                 return False
         return True
 
+    def wait_for_rate_limit(self, reserve: int = DEFAULT_RATE_LIMIT_RESERVE):
+        # The rate limit is tracked by PyGithub from the last response, and is shared by all the bots using the installation
+        remaining, _ = self.__github_client.rate_limiting
+        if remaining > reserve:
+            return
+        wait_seconds = max(0, self.__github_client.rate_limiting_resettime - time.time()) + 1
+        logger.warn(f"Github rate limit budget exhausted [remaining={remaining}, reserve={reserve}], waiting {int(wait_seconds)} seconds")
+        time.sleep(wait_seconds)
+
+    def paginate(self, content_class: type, url: str, parameters: Optional[Dict[str, Any]] = None,
+                 list_item: Optional[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 prefetch_pages: int = DEFAULT_PREFETCH_PAGES, max_pages: Optional[int] = None) -> GithubPaginator:
+        return GithubPaginator(self.rest_impl, content_class, url, parameters, list_item,
+                               max_workers, prefetch_pages, max_pages)
+
+    def queue_check_run(self, name: str, pr: PullRequest) -> Optional[CheckRun]:
+        # Returns the queued check run, or None when another event already queued it for the same commit
+        key = (pr.base.repo.url, pr.head.sha, name)
+        with GithubAppClient.__queued_check_runs_lock:
+            if key in GithubAppClient.__queued_check_runs:
+                return None
+            # Held by a placeholder while it is created, so concurrent events of the same commit do not create it again
+            placeholder = object()
+            GithubAppClient.__queued_check_runs[key] = placeholder
+        try:
+            headers, data = self.rest_impl.requestJsonAndCheck(
+                "POST",
+                pr.base.repo.url + "/check-runs",
+                input = {
+                    'name': name,
+                    'head_sha': pr.head.sha,
+                    'status': "queued"
+                },
+                headers = {
+                    "accept": "application/vnd.github.antiope-preview+json"
+                }
+            )
+        except:
+            with GithubAppClient.__queued_check_runs_lock:
+                if GithubAppClient.__queued_check_runs.get(key) is placeholder:
+                    del GithubAppClient.__queued_check_runs[key]
+            raise
+        check_run = CheckRun(self.rest_impl, headers, data, completed=True)
+        with GithubAppClient.__queued_check_runs_lock:
+            is_taken_over = GithubAppClient.__queued_check_runs.get(key) is not placeholder
+            if not is_taken_over:
+                GithubAppClient.__queued_check_runs[key] = check_run
+        if is_taken_over:
+            # The operation started (with a check run of its own) while this one was created
+            self.__skip_check_run(check_run)
+            return None
+        return check_run
+
+    def __skip_check_run(self, check_run: CheckRun):
+        self.rest_impl.requestJsonAndCheck(
+            "PATCH",
+            check_run.url,
+            input = {
+                'status': 'completed',
+                'conclusion': 'skipped',
+                'completed_at': datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+            },
+            headers = {
+                "accept": "application/vnd.github.antiope-preview+json"
+            }
+        )
+
+    def skip_queued_check_runs(self, check_runs: List[CheckRun]):
+        # Check runs which were queued but never started (the operation ended up not running for the event) are skipped,
+        # only if they are still queued, as another event of the same commit may have taken them over
+        for check_run in check_runs:
+            with GithubAppClient.__queued_check_runs_lock:
+                key = next((k for k, v in GithubAppClient.__queued_check_runs.items() if v is check_run), None)
+                if key is None:
+                    continue
+                del GithubAppClient.__queued_check_runs[key]
+            self.__skip_check_run(check_run)
+
     def create_check_run(self, name: str, pr: PullRequest) -> CheckRun:
+        with GithubAppClient.__queued_check_runs_lock:
+            queued_check_run = GithubAppClient.__queued_check_runs.pop((pr.base.repo.url, pr.head.sha, name), None)
+        if isinstance(queued_check_run, CheckRun):
+            # Started on the check run which was queued when the event was accepted
+            headers, data = self.rest_impl.requestJsonAndCheck(
+                "PATCH",
+                queued_check_run.url,
+                input = {
+                    'started_at': datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    'status': "in_progress"
+                },
+                headers = {
+                    "accept": "application/vnd.github.antiope-preview+json"
+                }
+            )
+            return CheckRun(self.rest_impl, headers, data, completed=True)
         headers, data = self.rest_impl.requestJsonAndCheck(
             "POST",
             pr.base.repo.url + "/check-runs",
@@ -307,6 +460,8 @@ class GithubAppClient(BotsBaseClient):
         return CheckRun(self.rest_impl, headers, data, completed=True)
 
     def complete_check_run(self, check_run: CheckRun, conclusion: str, output: dict):
+        with self.__check_run_updates_lock:
+            self.__check_run_updates.pop(check_run.url, None)
         self.rest_impl.requestJsonAndCheck(
             "PATCH",
             check_run.url,
@@ -321,6 +476,33 @@ class GithubAppClient(BotsBaseClient):
             }
         )
 
+    def update_check_run(self, check_run: CheckRun, output: dict,
+                         min_interval_seconds: float = DEFAULT_CHECK_RUN_UPDATE_INTERVAL_SECONDS) -> bool:
+        # Annotations of every update are appended to the ones already on the check run, so those are always sent
+        # Progress only updates are dropped when the previous update of the check run is too recent, or the rate
+        # limit is close to its reserve, as a later update (or the completion) supersedes them anyway
+        if 'annotations' not in output:
+            remaining, _ = self.rest_impl.rate_limiting
+            if 0 <= remaining <= DEFAULT_RATE_LIMIT_RESERVE:
+                return False
+        now = time.monotonic()
+        with self.__check_run_updates_lock:
+            last_update = self.__check_run_updates.get(check_run.url)
+            if 'annotations' not in output and last_update is not None and now - last_update < min_interval_seconds:
+                return False
+            self.__check_run_updates[check_run.url] = now
+        self.rest_impl.requestJsonAndCheck(
+            "PATCH",
+            check_run.url,
+            input = {
+                'output': output
+            },
+            headers = {
+                "accept": "application/vnd.github.antiope-preview+json"
+            }
+        )
+        return True
+
     @staticmethod
     def client_type() -> str:
         return CLIENT_NAME
\ No newline at end of file
@@ -0,0 +1,92 @@
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from github.Requester import Requester
+
+from octo_bots_python.common.logger import Logger
+
+DEFAULT_PER_PAGE = 100
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PREFETCH_PAGES = 4
+
+LINK_HEADER_KEY = "link"
+LINK_REL_LAST = "last"
+LINK_PATTERN = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"')
+
+logger = Logger("github_paginator")
+
+
+class GithubPaginator:
+    def __init__(self, requester: Requester, content_class: type, url: str,
+                 parameters: Optional[Dict[str, Any]] = None,
+                 list_item: Optional[str] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 prefetch_pages: int = DEFAULT_PREFETCH_PAGES,
+                 max_pages: Optional[int] = None):
+        self.__requester = requester
+        self.__content_class = content_class
+        self.__url = url
+        self.__parameters = dict(parameters or {})
+        self.__parameters.setdefault("per_page", DEFAULT_PER_PAGE)
+        self.__list_item = list_item
+        self.__max_workers = max(1, max_workers)
+        self.__prefetch_pages = max(1, prefetch_pages)
+        self.__max_pages = max_pages
+
+    @staticmethod
+    def __last_page_from_headers(headers: Dict[str, str]) -> int:
+        # Github only sends the link header if there is more than one page
+        links = headers.get(LINK_HEADER_KEY)
+        if not links:
+            return 1
+        for url, rel in LINK_PATTERN.findall(links):
+            if rel == LINK_REL_LAST:
+                page = parse_qs(urlparse(url).query).get("page")
+                if page:
+                    return int(page[0])
+        return 1
+
+    def __fetch_page(self, page: int) -> Tuple[Dict[str, str], List[dict]]:
+        parameters = dict(self.__parameters)
+        parameters["page"] = page
+        headers, data = self.__requester.requestJsonAndCheck("GET", self.__url, parameters=parameters)
+        if self.__list_item and isinstance(data, dict):
+            data = data.get(self.__list_item, [])
+        return headers, data or []
+
+    def __wrap_elements(self, headers: Dict[str, str], elements: List[dict]) -> Iterator[Any]:
+        for element in elements:
+            yield self.__content_class(self.__requester, headers, element, completed=False)
+
+    def __iter__(self) -> Iterator[Any]:
+        # The first page is always fetched sequentially, as it tells us how many pages there are
+        headers, elements = self.__fetch_page(1)
+        last_page = self.__last_page_from_headers(headers)
+        if self.__max_pages:
+            last_page = min(last_page, self.__max_pages)
+        if last_page <= 1:
+            yield from self.__wrap_elements(headers, elements)
+            return
+
+        logger.debug(f"Fetching {last_page} pages from [{self.__url}] with {self.__max_workers} workers")
+        # Only keep a bounded window of pages in flight so memory stays flat on huge listings
+        pending: Deque[Future] = deque()
+        next_page = 2
+        with ThreadPoolExecutor(max_workers=min(self.__max_workers, last_page - 1)) as pool:
+            try:
+                while next_page <= last_page and len(pending) < self.__prefetch_pages:
+                    pending.append(pool.submit(self.__fetch_page, next_page))
+                    next_page += 1
+                yield from self.__wrap_elements(headers, elements)
+                while pending:
+                    headers, elements = pending.popleft().result()
+                    if next_page <= last_page:
+                        pending.append(pool.submit(self.__fetch_page, next_page))
+                        next_page += 1
+                    yield from self.__wrap_elements(headers, elements)
+            finally:
+                for future in pending:
+                    future.cancel()
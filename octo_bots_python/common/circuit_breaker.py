@@ -0,0 +1,130 @@
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+from octo_bots_python.common.logger import Logger
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+DEFAULT_FAILURE_RATE_THRESHOLD = 0.5
+DEFAULT_WINDOW_SIZE = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_OPEN_SECONDS = 60
+
+logger = Logger("circuit_breaker")
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in_seconds: float):
+        super().__init__(f"{name} is unavailable, calls are stopped for the next {int(retry_in_seconds)} seconds")
+        self.name = name
+        self.retry_in_seconds = retry_in_seconds
+
+
+class CircuitBreaker:
+    # Breakers per service, shared by every client as clients are recreated once their validity passes
+    __breakers: Dict[str, "CircuitBreaker"] = {}
+    __breakers_lock = Lock()
+
+    def __init__(self, name: str, is_failure: Optional[Callable[[BaseException], bool]] = None,
+                 failure_rate_threshold: float = DEFAULT_FAILURE_RATE_THRESHOLD, window_size: int = DEFAULT_WINDOW_SIZE,
+                 min_calls: int = DEFAULT_MIN_CALLS, open_seconds: float = DEFAULT_OPEN_SECONDS):
+        self.__name = name
+        self.__is_failure = is_failure or (lambda e: True)
+        self.__failure_rate_threshold = failure_rate_threshold
+        self.__min_calls = min_calls
+        self.__open_seconds = open_seconds
+        # Outcomes of the latest calls (True for a failure)
+        self.__outcomes = deque(maxlen=window_size)
+        self.__state = CIRCUIT_CLOSED
+        self.__opened_at = 0.0
+        self.__probing = False
+        self.__lock = Lock()
+
+    @staticmethod
+    def get_breaker(name: str, is_failure: Optional[Callable[[BaseException], bool]] = None) -> "CircuitBreaker":
+        with CircuitBreaker.__breakers_lock:
+            if name not in CircuitBreaker.__breakers:
+                CircuitBreaker.__breakers[name] = CircuitBreaker(name, is_failure)
+            return CircuitBreaker.__breakers[name]
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            return self.__state
+
+    def __before_call(self) -> bool:
+        # Returns whether the call is the half open probe
+        with self.__lock:
+            if self.__state == CIRCUIT_CLOSED:
+                return False
+            retry_in_seconds = self.__opened_at + self.__open_seconds - time.time()
+            if self.__state == CIRCUIT_OPEN and retry_in_seconds <= 0:
+                logger.info(f"Circuit of {self.__name} is half open, probing")
+                self.__state = CIRCUIT_HALF_OPEN
+            if self.__state == CIRCUIT_HALF_OPEN and not self.__probing:
+                # A single call goes through, every other call keeps failing fast until it ends
+                self.__probing = True
+                return True
+            raise CircuitOpenError(self.__name, max(0, retry_in_seconds))
+
+    def __open(self):
+        logger.warn(f"Circuit of {self.__name} is open for {self.__open_seconds} seconds")
+        self.__state = CIRCUIT_OPEN
+        self.__opened_at = time.time()
+
+    def __after_call(self, probe: bool, failed: bool):
+        with self.__lock:
+            if probe:
+                self.__probing = False
+                if failed:
+                    self.__open()
+                    return
+                logger.info(f"Circuit of {self.__name} is closed")
+                self.__state = CIRCUIT_CLOSED
+                self.__outcomes.clear()
+                return
+            if self.__state != CIRCUIT_CLOSED:
+                # Calls started before the circuit opened
+                return
+            self.__outcomes.append(failed)
+            if len(self.__outcomes) >= self.__min_calls and \
+                    sum(self.__outcomes) / len(self.__outcomes) >= self.__failure_rate_threshold:
+                self.__open()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        probe = self.__before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.__after_call(probe, self.__is_failure(e))
+            raise
+        self.__after_call(probe, False)
+        return result
+
+    def is_available(self) -> bool:
+        # Whether a call would go through, without counting as the half open probe
+        with self.__lock:
+            return self.__state == CIRCUIT_CLOSED or \
+                (self.__state == CIRCUIT_OPEN and time.time() >= self.__opened_at + self.__open_seconds) or \
+                (self.__state == CIRCUIT_HALF_OPEN and not self.__probing)
+
+
+class CircuitBreakerProxy:
+    # Passes every method call of the wrapped object through the breaker
+    def __init__(self, target: Any, breaker: CircuitBreaker):
+        self.__target = target
+        self.__breaker = breaker
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.__target, name)
+        if not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self.__breaker.call(attr, *args, **kwargs)
@@ -0,0 +1,47 @@
+import asyncio
+from threading import Lock, Thread, get_ident
+from typing import Any, Coroutine, Optional
+
+from octo_bots_python.common.logger import Logger
+
+logger = Logger("event_loop")
+
+
+class SharedEventLoop:
+    __loop: Optional[asyncio.AbstractEventLoop] = None
+    __thread: Optional[Thread] = None
+    __lock = Lock()
+
+    @staticmethod
+    def get_loop() -> asyncio.AbstractEventLoop:
+        with SharedEventLoop.__lock:
+            if SharedEventLoop.__loop is None or SharedEventLoop.__loop.is_closed():
+                logger.info("Starting shared event loop")
+                SharedEventLoop.__loop = asyncio.new_event_loop()
+                SharedEventLoop.__thread = Thread(target=SharedEventLoop.__run_loop, args=(SharedEventLoop.__loop,),
+                                                  name="shared-event-loop", daemon=True)
+                SharedEventLoop.__thread.start()
+            return SharedEventLoop.__loop
+
+    @staticmethod
+    def __run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    @staticmethod
+    def run(coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        loop = SharedEventLoop.get_loop()
+        # Blocking on the loop from within itself would deadlock
+        if SharedEventLoop.__thread and SharedEventLoop.__thread.ident == get_ident():
+            raise Exception("Cannot block on the shared event loop from within the loop")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+
+    @staticmethod
+    def stop():
+        with SharedEventLoop.__lock:
+            if SharedEventLoop.__loop is not None:
+                SharedEventLoop.__loop.call_soon_threadsafe(SharedEventLoop.__loop.stop)
+                SharedEventLoop.__thread.join()
+                SharedEventLoop.__loop.close()
+                SharedEventLoop.__loop = None
+                SharedEventLoop.__thread = None
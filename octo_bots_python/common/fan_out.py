@@ -0,0 +1,45 @@
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Semaphore
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from octo_bots_python.common.logger import Logger
+
+logger = Logger("fan_out")
+
+
+def fan_out(items: Iterable[Any], worker: Callable[[Any], Any], max_workers: int,
+            on_done: Optional[Callable[[Any, Any, Optional[BaseException]], None]] = None,
+            max_pending: Optional[int] = None):
+    # Items are consumed lazily from the iterable (the producer), and only a bounded amount
+    # is ever queued ahead of the workers, so huge listings are never materialized
+    pending = Semaphore(max_pending or max_workers * 2)
+
+    def done_callback(item: Any, future: Future):
+        try:
+            if on_done:
+                error = future.exception()
+                on_done(item, None if error else future.result(), error)
+        except:
+            logger.warn(traceback.format_exc())
+        finally:
+            pending.release()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for item in items:
+            pending.acquire()
+            future = pool.submit(worker, item)
+            future.add_done_callback(lambda f, item=item: done_callback(item, f))
+
+
+def bounded_map(pool: ThreadPoolExecutor, worker: Callable[[Any], Any], items: Iterable[Any], window: int) -> Iterator[Any]:
+    # Like pool.map, but only a window of items is submitted ahead of the consumer,
+    # so the results of a slow consumer do not pile up in memory
+    pending = deque()
+    for item in items:
+        if len(pending) >= max(1, window):
+            yield pending.popleft().result()
+        pending.append(pool.submit(worker, item))
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import os
+import resource
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Condition
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from octo_bots_python.common.logger import Logger
+
+PRIORITY_BOT = 0
+PRIORITY_BACKGROUND = 10
+
+DEFAULT_BACKGROUND_NICE = 10
+
+logger = Logger("tool_runner")
+
+
+class ToolResult:
+    def __init__(self, returncode: int, stdout: str, stderr: str):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class ToolRunner:
+    # Process wide budget for external tools, every operation spawning processes goes through here
+    __cpu_slots = os.cpu_count() or 1
+    __memory_limit_mb: Optional[int] = None
+    __cpu_time_limit_seconds: Optional[int] = None
+    __background_nice = DEFAULT_BACKGROUND_NICE
+    __used_slots = 0
+    # Waiting runs as (priority, sequence), the head of the queue is the next to get slots
+    __waiting: List[Tuple[int, int]] = []
+    __sequence = itertools.count()
+    __condition = Condition()
+    __priority = ContextVar("tool_runner_priority", default=PRIORITY_BOT)
+
+    @staticmethod
+    def configure(cpu_slots: Optional[int] = None, memory_limit_mb: Optional[int] = None,
+                  cpu_time_limit_seconds: Optional[int] = None, background_nice: int = DEFAULT_BACKGROUND_NICE):
+        with ToolRunner.__condition:
+            ToolRunner.__cpu_slots = cpu_slots or os.cpu_count() or 1
+            ToolRunner.__memory_limit_mb = memory_limit_mb
+            ToolRunner.__cpu_time_limit_seconds = cpu_time_limit_seconds
+            ToolRunner.__background_nice = background_nice
+            ToolRunner.__condition.notify_all()
+        logger.info(f"Tool runner configured with {ToolRunner.__cpu_slots} cpu slots")
+
+    @staticmethod
+    def cpu_slots() -> int:
+        return ToolRunner.__cpu_slots
+
+    @staticmethod
+    def current_priority() -> int:
+        return ToolRunner.__priority.get()
+
+    @staticmethod
+    @contextmanager
+    def priority(priority: int) -> Iterator[None]:
+        # Tools ran from within the context (on the same thread) are queued with the given priority
+        token = ToolRunner.__priority.set(priority)
+        try:
+            yield
+        finally:
+            ToolRunner.__priority.reset(token)
+
+    @staticmethod
+    def __acquire_slots(slots: int, priority: int):
+        entry = (priority, next(ToolRunner.__sequence))
+        with ToolRunner.__condition:
+            heapq.heappush(ToolRunner.__waiting, entry)
+            # Runs are admitted in priority order, a big run at the head holds back smaller ones behind it
+            while ToolRunner.__waiting[0] != entry or ToolRunner.__used_slots + slots > ToolRunner.__cpu_slots:
+                ToolRunner.__condition.wait()
+            heapq.heappop(ToolRunner.__waiting)
+            ToolRunner.__used_slots += slots
+            ToolRunner.__condition.notify_all()
+
+    @staticmethod
+    def __release_slots(slots: int):
+        with ToolRunner.__condition:
+            ToolRunner.__used_slots -= slots
+            ToolRunner.__condition.notify_all()
+
+    @staticmethod
+    def __limit_process(pid: int, memory_limit_mb: Optional[int], cpu_time_limit_seconds: Optional[int], nice: int):
+        # Applied from the parent once the process started, as a preexec_fn is unsafe in a threaded process and prevents spawning with vfork
+        if memory_limit_mb:
+            limit = memory_limit_mb * 1024 * 1024
+            resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+        if cpu_time_limit_seconds:
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_time_limit_seconds, cpu_time_limit_seconds))
+        if nice:
+            os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + nice)
+
+    @staticmethod
+    def run(args: List[str], cwd: Optional[str] = None, slots: int = 1, priority: Optional[int] = None,
+            timeout: Optional[float] = None, env: Optional[Dict[str, str]] = None) -> ToolResult:
+        priority = ToolRunner.current_priority() if priority is None else priority
+        slots = max(1, min(slots, ToolRunner.__cpu_slots))
+        nice = ToolRunner.__background_nice if priority >= PRIORITY_BACKGROUND else 0
+        memory_limit_mb = ToolRunner.__memory_limit_mb
+        cpu_time_limit_seconds = ToolRunner.__cpu_time_limit_seconds
+        ToolRunner.__acquire_slots(slots, priority)
+        try:
+            logger.debug(f"Running {' '.join(args)} with {slots} slots")
+            with subprocess.Popen(args, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  encoding='utf-8', errors='replace') as proc:
+                if memory_limit_mb or cpu_time_limit_seconds or nice:
+                    try:
+                        ToolRunner.__limit_process(proc.pid, memory_limit_mb, cpu_time_limit_seconds, nice)
+                    except ProcessLookupError:
+                        # The tool already exited
+                        pass
+                try:
+                    # Both pipes are drained together, so a full stderr pipe can never block the tool
+                    stdout, stderr = proc.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.communicate()
+                    raise
+            return ToolResult(proc.returncode, stdout, stderr)
+        finally:
+            ToolRunner.__release_slots(slots)
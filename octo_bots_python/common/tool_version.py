@@ -0,0 +1,18 @@
+from threading import Lock
+from typing import Dict
+
+from octo_bots_python.common.tool_runner import ToolRunner
+
+
+class ToolVersion:
+    # Tools are not upgraded under a running server, so each version is only queried once
+    __versions: Dict[str, str] = {}
+    __lock = Lock()
+
+    @staticmethod
+    def get_version(executable: str) -> str:
+        with ToolVersion.__lock:
+            if executable not in ToolVersion.__versions:
+                proc = ToolRunner.run([executable, "--version"])
+                ToolVersion.__versions[executable] = proc.stdout.strip()
+            return ToolVersion.__versions[executable]
@@ -0,0 +1,2 @@
+import octo_bots_python.leases.file_lease_backend
+import octo_bots_python.leases.sqlite_lease_backend
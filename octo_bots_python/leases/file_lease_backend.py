@@ -0,0 +1,74 @@
+import fcntl
+import json
+import os
+import time
+
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.leases.lease_backend import LeaseBackend
+from octo_bots_python.leases.leases_loader import LeasesLoader
+
+BACKEND_NAME = 'file-lease'
+
+PATH_KEY = 'path'
+MANDATORY_KEYS = [PATH_KEY]
+
+OWNER_KEY = 'owner'
+EXPIRES_AT_KEY = 'expires-at'
+
+logger = Logger("file_lease_backend")
+
+
+class FileLeaseBackend(LeaseBackend):
+    def __init__(self, path: str):
+        self.__path = path
+        os.makedirs(self.__path, exist_ok=True)
+
+    @staticmethod
+    def create_lease_backend(config: dict) -> LeaseBackend:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for file lease backend")
+        return FileLeaseBackend(config[PATH_KEY])
+
+    @staticmethod
+    def backend_type() -> str:
+        return BACKEND_NAME
+
+    def __lease_path(self, name: str) -> str:
+        return os.path.join(self.__path, f"{name.replace(os.sep, '_')}.lease")
+
+    def __update_lease(self, name: str, owner: str, ttl_seconds: float, release: bool) -> bool:
+        # The lease file itself is flocked while read and rewritten, so replicas on the shared path are serialized
+        fd = os.open(self.__lease_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r+') as stream:
+                content = stream.read()
+                lease = json.loads(content) if content.strip() else {}
+                now = time.time()
+                is_holder = lease.get(OWNER_KEY) == owner
+                if release:
+                    if not is_holder:
+                        return False
+                    lease = {}
+                elif is_holder or lease.get(EXPIRES_AT_KEY, 0) < now:
+                    lease = {OWNER_KEY: owner, EXPIRES_AT_KEY: now + ttl_seconds}
+                else:
+                    return False
+                stream.seek(0)
+                stream.truncate()
+                stream.write(json.dumps(lease))
+                stream.flush()
+                os.fsync(stream.fileno())
+                return True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        return self.__update_lease(name, owner, ttl_seconds, False)
+
+    def release_lease(self, name: str, owner: str):
+        self.__update_lease(name, owner, 0, True)
+
+
+LeasesLoader.register_lease_backend(FileLeaseBackend)
@@ -0,0 +1,25 @@
+from abc import abstractmethod
+
+
+class LeaseBackend:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def create_lease_backend(config: dict) -> 'LeaseBackend':
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def backend_type() -> str:
+        pass
+
+    @abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        # Acquires the lease if it is free or expired, or renews it if the owner already holds it
+        pass
+
+    @abstractmethod
+    def release_lease(self, name: str, owner: str):
+        pass
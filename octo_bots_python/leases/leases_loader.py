@@ -0,0 +1,17 @@
+from octo_bots_python.leases.lease_backend import LeaseBackend
+
+
+class LeasesLoader:
+    lease_backend_classes = {}
+
+    @staticmethod
+    def load_lease_backend(type_name: str, config: dict) -> LeaseBackend:
+        if type_name not in LeasesLoader.lease_backend_classes.keys():
+            raise Exception(f"Unknown type name given for leases loader [type: {type_name}]")
+        return LeasesLoader.lease_backend_classes[type_name].create_lease_backend(config)
+
+    @staticmethod
+    def register_lease_backend(clazz: type):
+        if not issubclass(clazz, LeaseBackend):
+            raise Exception("Invalid class given for leases loader")
+        LeasesLoader.lease_backend_classes[clazz.backend_type()] = clazz
@@ -0,0 +1,56 @@
+import time
+
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.leases.lease_backend import LeaseBackend
+from octo_bots_python.leases.leases_loader import LeasesLoader
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+BACKEND_NAME = 'sqlite-lease'
+
+PATH_KEY = 'path'
+MANDATORY_KEYS = [PATH_KEY]
+
+# The lease file is shared between replicas, possibly on a network filesystem which WAL shared memory does not work on
+JOURNAL_MODE = 'DELETE'
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )"""
+]
+
+logger = Logger("sqlite_lease_backend")
+
+
+class SqliteLeaseBackend(LeaseBackend):
+    def __init__(self, path: str):
+        self.__store = SqliteStore(path, SCHEMA, JOURNAL_MODE)
+
+    @staticmethod
+    def create_lease_backend(config: dict) -> LeaseBackend:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for sqlite lease backend")
+        return SqliteLeaseBackend(config[PATH_KEY])
+
+    @staticmethod
+    def backend_type() -> str:
+        return BACKEND_NAME
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self.__store.transaction() as connection:
+            # The upsert only takes over the lease if we already hold it or it has expired
+            connection.execute("INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                               "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                               "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                               (name, owner, now + ttl_seconds, now))
+            row = connection.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row['owner'] == owner
+
+    def release_lease(self, name: str, owner: str):
+        self.__store.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+
+LeasesLoader.register_lease_backend(SqliteLeaseBackend)
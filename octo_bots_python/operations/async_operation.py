@@ -0,0 +1,33 @@
+import asyncio
+import traceback
+from abc import abstractmethod
+from typing import Dict, List
+
+from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.common.event_loop import SharedEventLoop
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.operation import Operation
+
+logger = Logger("async_operation")
+
+
+class AsyncOperation(Operation):
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    async def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        pass
+
+    @staticmethod
+    def execute_async_operations(operations: "List[AsyncOperation]", clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        # All of the operations share a single blocking wait on the shared loop instead of a thread each
+        async def execute_all():
+            return await asyncio.gather(*[op.execute_operation(clients, headers, event) for op in operations],
+                                        return_exceptions=True)
+
+        results = SharedEventLoop.run(execute_all())
+        for operation, result in zip(operations, results):
+            if isinstance(result, BaseException):
+                logger.warn(f"Operation {operation.operation_type()} failed: " +
+                            ''.join(traceback.format_exception(type(result), result, result.__traceback__)))
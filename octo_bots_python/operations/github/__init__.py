@@ -1,6 +1,9 @@
 import octo_bots_python.operations.github.branch_deleted_checkmarx_cleanup_operation
+import octo_bots_python.operations.github.checkmarx_projects_reconcile_operation
+import octo_bots_python.operations.github.checkmarx_scans_tracker_operation
 import octo_bots_python.operations.github.clang_format_validator_operation
 import octo_bots_python.operations.github.close_stale_operation
+import octo_bots_python.operations.github.contributors_ranking_refresh_operation
 import octo_bots_python.operations.github.pull_request_checkmarx_operation
 import octo_bots_python.operations.github.pull_request_cppcheck_operation
 import octo_bots_python.operations.github.pull_request_forbidden_files_operation
@@ -9,3 +12,4 @@ import octo_bots_python.operations.github.pull_request_labels_operation
 import octo_bots_python.operations.github.pull_request_naming_enforcer_operation
 import octo_bots_python.operations.github.pull_request_release_branch_creation_operation
 import octo_bots_python.operations.github.pull_request_reviewers_assign_operation
+import octo_bots_python.operations.github.stale_index_update_operation
@@ -49,10 +49,16 @@ class BranchDeletedCheckmarxCleanupOperation(Operation):
             # Only delete merged PR's
             if not any(fnmatch.fnmatch(event['ref'], branch) for branch in self.__forbidden_branches):
                 # Perform deletion
-                logger.info(f"Trying to delete checkmarx project {repo.name}@{event['ref'].replace('/', '_')}")
-                proj_id = checkmarx_client.projects_client.get_project_id_by_project_name_and_team_full_name(f"{repo.name}@{event['ref'].replace('/', '_')}", checkmarx_client.team_full_name)
-                if proj_id != None:
-                    checkmarx_client.projects_client.delete_project_by_id(proj_id)
+                proj_name = f"{repo.name}@{event['ref'].replace('/', '_')}"
+                logger.info(f"Trying to delete checkmarx project {proj_name}")
+                proj = checkmarx_client.get_project_by_name(proj_name)
+                if proj != None:
+                    try:
+                        checkmarx_client.projects_client.delete_project_by_id(proj.project_id)
+                    except:
+                        checkmarx_client.invalidate_projects_index()
+                        raise
+                    checkmarx_client.remove_project(proj_name)
 
 
 OperationsLoader.register_operation(BranchDeletedCheckmarxCleanupOperation)
@@ -0,0 +1,150 @@
+import datetime
+import fnmatch
+import time
+import traceback
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+import dateparser
+from github.Branch import Branch
+from github.PullRequest import PullRequest
+from github.Repository import Repository
+
+from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.fan_out import fan_out
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.operation import Operation
+from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.checkmarx_scans_store import CheckmarxScansStore
+
+OPERATION_NAME = 'checkmarx-projects-reconcile'
+
+FORBIDDEN_BRANCHES_KEY = 'forbidden-branches'
+DRY_RUN_KEY = 'dry-run'
+DELETE_BATCH_SIZE_KEY = 'delete-batch-size'
+DELETE_BATCH_INTERVAL_KEY = 'delete-batch-interval'
+PARALLEL_REPOS_KEY = 'parallel-repos'
+TRACKER_PATH_KEY = 'tracker-path'
+MANDATORY_KEYS = []
+
+DEFAULT_DRY_RUN = False
+DEFAULT_DELETE_BATCH_SIZE = 20
+DEFAULT_DELETE_BATCH_INTERVAL = '1 minute'
+DEFAULT_PARALLEL_REPOS = 4
+
+BRANCHED_PROJECT_SEPARATOR = '@'
+
+logger = Logger("checkmarx_projects_reconcile_operation")
+
+
+class CheckmarxProjectsReconcileOperation(Operation):
+    def __init__(self, forbidden_branches: List[str], dry_run: bool, delete_batch_size: int, delete_batch_interval: str,
+                 parallel_repos: int = DEFAULT_PARALLEL_REPOS, tracker_path: Optional[str] = None):
+        # Branched project names have / replaced by _, so the patterns are matched the same way
+        self.__forbidden_branches = [branch.replace('/', '_') for branch in forbidden_branches]
+        self.__dry_run = dry_run
+        self.__delete_batch_size = max(1, delete_batch_size)
+        now = datetime.datetime.now()
+        self.__delete_batch_interval = dateparser.parse(delete_batch_interval, settings={'PREFER_DATES_FROM': 'future', 'RELATIVE_BASE': now}) - now
+        self.__parallel_repos = parallel_repos
+        self.__tracker_path = tracker_path
+
+    @staticmethod
+    def create_operation(config: dict) -> Operation:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for checkmarx projects reconcile operation")
+        forbidden_branches = []
+        if FORBIDDEN_BRANCHES_KEY in config.keys():
+            forbidden_branches = config[FORBIDDEN_BRANCHES_KEY]
+        return CheckmarxProjectsReconcileOperation(forbidden_branches,
+                                                   config.get(DRY_RUN_KEY, DEFAULT_DRY_RUN),
+                                                   config.get(DELETE_BATCH_SIZE_KEY, DEFAULT_DELETE_BATCH_SIZE),
+                                                   config.get(DELETE_BATCH_INTERVAL_KEY, DEFAULT_DELETE_BATCH_INTERVAL),
+                                                   config.get(PARALLEL_REPOS_KEY, DEFAULT_PARALLEL_REPOS),
+                                                   config.get(TRACKER_PATH_KEY))
+
+    @staticmethod
+    def operation_type() -> str:
+        return OPERATION_NAME
+
+    def __list_branched_projects(self, git_client: GithubAppClient, repo: Repository) -> Set[str]:
+        # Project names the existing branches of the repo would have
+        projects = {f"{repo.name}{BRANCHED_PROJECT_SEPARATOR}{branch.name.replace('/', '_')}"
+                    for branch in git_client.paginate(Branch, f"{repo.url}/branches")}
+        # Branches of forks are not in the repo, the projects of open PRs from forks are named after the fork and its branch
+        for pr in git_client.paginate(PullRequest, f"{repo.url}/pulls", {'state': 'open'}):
+            head_repo_name = pr.head.repo.name if pr.head.repo else repo.name
+            projects.add(f"{head_repo_name}{BRANCHED_PROJECT_SEPARATOR}{pr.head.ref.replace('/', '_')}")
+        return projects
+
+    def __delete_projects(self, checkmarx_client: CheckmarxClient, projects: List["CxProject"]) -> int:
+        deleted = 0
+        for i in range(0, len(projects), self.__delete_batch_size):
+            if i > 0:
+                # Spread over time, so the deletions do not compete with the scans on the checkmarx instance
+                time.sleep(self.__delete_batch_interval.total_seconds())
+            for project in projects[i:i + self.__delete_batch_size]:
+                try:
+                    checkmarx_client.projects_client.delete_project_by_id(project.project_id)
+                    checkmarx_client.remove_project(project.name)
+                    deleted += 1
+                except:
+                    logger.warn(f"Failed deleting checkmarx project {project.name} [{traceback.format_exc()}]")
+                    checkmarx_client.invalidate_projects_index()
+        return deleted
+
+    def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        if GithubAppClient.client_type() not in clients.keys():
+            raise Exception("Client github does not exist")
+        if CheckmarxClient.client_type() not in clients.keys():
+            raise Exception("Client checkmarx does not exist")
+        git_client: GithubAppClient = clients[GithubAppClient.client_type()]
+        checkmarx_client: CheckmarxClient = clients[CheckmarxClient.client_type()]
+
+        # Branched projects per repo name, the repo projects themselves are never deleted
+        branched_projects: Dict[str, Dict[str, "CxProject"]] = {}
+        for project in checkmarx_client.list_projects():
+            if BRANCHED_PROJECT_SEPARATOR in project.name:
+                repo_name, branch = project.name.split(BRANCHED_PROJECT_SEPARATOR, 1)
+                if not any(fnmatch.fnmatch(branch, pattern) for pattern in self.__forbidden_branches):
+                    branched_projects.setdefault(repo_name, {})[project.name] = project
+        logger.info(f"Found {sum(len(projects) for projects in branched_projects.values())} branched checkmarx projects over {len(branched_projects)} repos")
+
+        # Only repos with branched projects have their branches listed
+        # Projects of repos which are not in the installation (or failed listing) are left alone, as their branches are unknown
+        listing_lock = Lock()
+        existing_projects: Set[str] = set()
+        listed_repos: Set[str] = set()
+        failed_repos: Set[str] = set()
+
+        def on_repo_done(repo: Repository, repo_projects: Optional[Set[str]], error: Optional[BaseException]):
+            with listing_lock:
+                if error:
+                    logger.warn(f"Failed listing branches of repo [{repo.name}] [{str(error)}]")
+                    failed_repos.add(repo.name)
+                    return
+                listed_repos.add(repo.name)
+                existing_projects.update(repo_projects)
+
+        repos = (repo for repo in git_client.paginate(Repository, "/installation/repositories", list_item="repositories")
+                 if repo.name in branched_projects)
+        fan_out(repos, lambda repo: self.__list_branched_projects(git_client, repo), self.__parallel_repos, on_repo_done)
+
+        # Projects still being scanned are kept, as their branch or PR may be newer than the listing
+        scanning_projects = CheckmarxScansStore.get_store(self.__tracker_path).scanning_project_ids() if self.__tracker_path else set()
+        orphans = [branched_projects[repo_name][name] for repo_name in listed_repos - failed_repos
+                   for name in branched_projects[repo_name].keys() - existing_projects
+                   if branched_projects[repo_name][name].project_id not in scanning_projects]
+        orphans.sort(key=lambda project: project.name)
+        if self.__dry_run:
+            for project in orphans:
+                logger.info(f"Would delete orphaned checkmarx project {project.name}")
+            logger.info(f"Found {len(orphans)} orphaned checkmarx projects (dry run)")
+            return
+        deleted = self.__delete_projects(checkmarx_client, orphans)
+        logger.info(f"Deleted {deleted} out of {len(orphans)} orphaned checkmarx projects")
+
+
+OperationsLoader.register_operation(CheckmarxProjectsReconcileOperation)
@@ -0,0 +1,130 @@
+import time
+import traceback
+from typing import Dict, List
+
+from github.CheckRun import CheckRun
+
+from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.checkmarx_scan_result import (
+    SCAN_DONE_STATES, SCAN_FINISHED_STATE, complete_scan_check_run)
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.circuit_breaker import CircuitOpenError
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.operation import Operation
+from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.checkmarx_scans_store import (CheckmarxScansStore,
+                                                           PendingScan)
+
+OPERATION_NAME = 'checkmarx-scans-tracker'
+
+TRACKER_PATH_KEY = 'tracker-path'
+RETENTION_DAYS_KEY = 'retention-days'
+MANDATORY_KEYS = [TRACKER_PATH_KEY]
+
+DEFAULT_RETENTION_DAYS = 30
+
+logger = Logger("checkmarx_scans_tracker_operation")
+
+
+class CheckmarxScansTrackerOperation(Operation):
+    def __init__(self, tracker_path: str, retention_days: int):
+        self.__tracker_path = tracker_path
+        self.__retention_days = retention_days
+
+    @staticmethod
+    def create_operation(config: dict) -> Operation:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for checkmarx scans tracker operation")
+        return CheckmarxScansTrackerOperation(config[TRACKER_PATH_KEY], config.get(RETENTION_DAYS_KEY, DEFAULT_RETENTION_DAYS))
+
+    @staticmethod
+    def operation_type() -> str:
+        return OPERATION_NAME
+
+    def __complete_timed_out_scans(self, checkmarx_client: CheckmarxClient, git_client: GithubAppClient, scans_store: CheckmarxScansStore,
+                                   scans: List[PendingScan]):
+        # Scans whose details cannot be fetched (deleted scans, long outages) would otherwise be polled forever
+        scan = scans[0]
+        timed_out_scans = [pending_scan for pending_scan in scans if time.time() > pending_scan.timeout_at]
+        for pending_scan in timed_out_scans:
+            logger.info(f"Scan {pending_scan.scan_id} of project {pending_scan.project_name} timed out")
+            check_run = CheckRun(git_client.rest_impl, {}, {'url': pending_scan.check_run_url}, completed=True)
+            complete_scan_check_run(checkmarx_client, git_client, check_run, None, pending_scan.project_id, pending_scan.risk_scheme)
+            scans_store.remove_scan(pending_scan.scan_id, pending_scan.check_run_url)
+        if len(timed_out_scans) == len(scans):
+            # Dynamic import due to internal config checkmarx
+            from CheckmarxPythonSDK.CxRestAPISDK.exceptions.CxError import \
+                CxError
+
+            # No check run waits on the scan anymore, so it is not left running (or queued) on checkmarx
+            try:
+                checkmarx_client.cancel_scan(scan.scan_id)
+            except CxError as e:
+                # Most likely ended already or deleted, the project scan is dropped either way
+                logger.warn(f"Failed canceling scan {scan.scan_id} [{str(e)}]")
+            scans_store.remove_project_scan(scan.scan_id)
+
+    def __track_scan(self, checkmarx_client: CheckmarxClient, git_client: GithubAppClient, scans_store: CheckmarxScansStore, scans: List[PendingScan]):
+        # Several check runs may wait on the same scan (events of the same commit), its state is fetched once for all of them
+        scan = scans[0]
+        try:
+            scan_details = checkmarx_client.scans_client.get_sast_scan_details_by_scan_id(scan.scan_id)
+        except:
+            self.__complete_timed_out_scans(checkmarx_client, git_client, scans_store, scans)
+            raise
+        ended = scan_details.status.name in SCAN_DONE_STATES
+        if not ended:
+            self.__complete_timed_out_scans(checkmarx_client, git_client, scans_store, scans)
+            for pending_scan in scans:
+                if time.time() > pending_scan.timeout_at:
+                    continue
+                # Only the url is needed to update the check run, so it is not fetched again
+                check_run = CheckRun(git_client.rest_impl, {}, {'url': pending_scan.check_run_url}, completed=True)
+                git_client.update_check_run(check_run,
+                    {'title': "Checkmarx Scan",
+                    'summary': f"Scan {scan_details.status.name}",
+                    'text': f"Scan {scan.scan_id} of project {scan.project_name} started {int((time.time() - pending_scan.started_at) / 60)} minutes ago"})
+            return
+        logger.info(f"Scan {scan.scan_id} of project {scan.project_name} ended with {scan_details.status.name}")
+        for pending_scan in scans:
+            check_run = CheckRun(git_client.rest_impl, {}, {'url': pending_scan.check_run_url}, completed=True)
+            complete_scan_check_run(checkmarx_client, git_client, check_run, scan_details, pending_scan.project_id, pending_scan.risk_scheme)
+            # Removed only once the check run was completed, so a failure is retried on the next run
+            scans_store.remove_scan(pending_scan.scan_id, pending_scan.check_run_url)
+        if scan_details.status.name == SCAN_FINISHED_STATE:
+            # Kept so later events of the same commit reuse the result
+            scans_store.set_project_scan_finished(scan.scan_id)
+        else:
+            # The next event of the commit scans it again
+            scans_store.remove_project_scan(scan.scan_id)
+
+    def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        if GithubAppClient.client_type() not in clients.keys():
+            raise Exception("Client github does not exist")
+        if CheckmarxClient.client_type() not in clients.keys():
+            raise Exception("Client checkmarx does not exist")
+        git_client: GithubAppClient = clients[GithubAppClient.client_type()]
+        checkmarx_client: CheckmarxClient = clients[CheckmarxClient.client_type()]
+        # Every outstanding scan is polled in a single pass, scans recorded before a restart included
+        scans_store: CheckmarxScansStore = CheckmarxScansStore.get_store(self.__tracker_path)
+        pending_scans = scans_store.pending_scans()
+        logger.info(f"Tracking {len(pending_scans)} checkmarx scans")
+        scans_by_id: Dict[int, List[PendingScan]] = {}
+        for scan in pending_scans:
+            scans_by_id.setdefault(scan.scan_id, []).append(scan)
+        circuit_open = False
+        for scans in scans_by_id.values():
+            try:
+                self.__track_scan(checkmarx_client, git_client, scans_store, scans)
+            except CircuitOpenError as e:
+                # Calls fail fast until the circuit closes, the scans past their timeout are still completed
+                if not circuit_open:
+                    logger.warn(f"Checkmarx scans are polled again on the next run [{str(e)}]")
+                circuit_open = True
+            except:
+                logger.warn(traceback.format_exc())
+        scans_store.prune_project_scans(time.time() - self.__retention_days * 24 * 60 * 60)
+
+
+OperationsLoader.register_operation(CheckmarxScansTrackerOperation)
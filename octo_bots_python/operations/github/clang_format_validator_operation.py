@@ -2,48 +2,123 @@ import codecs
 import datetime
 import difflib
 import errno
-import fnmatch
 import io
 import os
-import shutil
-import subprocess
+import re
 import sys
-import tempfile
 import traceback
-import uuid
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
-import git
 from github import Github
 from github.CheckRun import CheckRun
+from github.File import File
 from github.Label import Label
 from github.PullRequest import PullRequest
 from github.Requester import Requester
 
 from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.clients.check_run_report import (ANNOTATION_FAILURE,
+                                                       CheckRunReport)
 from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.fan_out import bounded_map
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import ToolRunner
+from octo_bots_python.common.tool_version import ToolVersion
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.lint_results_store import \
+    DEFAULT_MAX_SIZE_MB as DEFAULT_LINT_CACHE_MAX_SIZE_MB
+from octo_bots_python.stores.lint_results_store import LintResultsStore
+from octo_bots_python.workspaces.git_command import list_blob_shas
+from octo_bots_python.workspaces.git_source_provider import GitSourceProvider
+from octo_bots_python.workspaces.source_provider import SourceProvider
+from octo_bots_python.workspaces.source_providers_loader import \
+    SourceProvidersLoader
+from octo_bots_python.workspaces.workspace_indexer import (GlobMatcher,
+                                                           WorkspaceIndexer)
 
 OPERATION_NAME = 'clang-format-validator'
 
+SOURCE_KEY = 'source'
+SCOPE_KEY = 'scope'
+PARALLEL_FILES_KEY = 'parallel-files'
+LINT_CACHE_PATH_KEY = 'lint-cache-path'
+LINT_CACHE_MAX_SIZE_MB_KEY = 'lint-cache-max-size-mb'
 MANDATORY_KEYS = []
 
+SCOPE_FULL = 'full'
+SCOPE_FILES = 'files'
+SCOPE_LINES = 'lines'
+SCOPES = [SCOPE_FULL, SCOPE_FILES, SCOPE_LINES]
+
 DEFAULT_EXTENSIONS = 'c,h,C,H,cpp,hpp,cc,hh,c++,h++,cxx,hxx'
 DEFAULT_CLANG_FORMAT_IGNORE = '.clang-format-ignore'
+STYLE_FILES = ['.clang-format', '_clang-format', DEFAULT_CLANG_FORMAT_IGNORE]
+
+DEFAULT_DRY_RUN_BATCH_SIZE = 50
+# Bumped whenever the cached results change shape, the cache holds the diff of each file (empty when formatted)
+LINT_CACHE_FORMAT = 2
+
+VIOLATION_PATTERN = re.compile(r'^(.+?):\d+:\d+: (?:warning|error): code should be clang-formatted', re.MULTILINE)
+HUNK_HEADER_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+ORIGINAL_HUNK_HEADER_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+')
 
 logger = Logger("clang_format_validator_operation")
 
 
+def added_line_ranges(patch: Optional[str]) -> Optional[List[Tuple[int, int]]]:
+    # Runs of added lines on the head side, the hunk context lines are left out as they were not changed
+    # Github omits the patch of huge diffs, in which case the whole file is validated
+    if not patch:
+        return None
+    ranges = []
+    line_number = 0
+    for line in patch.splitlines():
+        match = HUNK_HEADER_PATTERN.match(line)
+        if match:
+            line_number = int(match.group(1))
+        elif line.startswith('+'):
+            if ranges and ranges[-1][1] == line_number - 1:
+                ranges[-1] = (ranges[-1][0], line_number)
+            else:
+                ranges.append((line_number, line_number))
+            line_number += 1
+        elif line.startswith(' '):
+            line_number += 1
+        # Removed lines and "\ No newline at end of file" markers have no head side line
+    return ranges
+
+
+def effective_style_files(blob_shas: Dict[str, str], file: str) -> List[Tuple[str, str]]:
+    # The style files of the file directory and of its parents, as --style=file uses the nearest one
+    # and a nearest one with InheritParentConfig also reads the ones above it
+    directories = set()
+    directory = os.path.dirname(file)
+    while directory:
+        directories.add(directory)
+        directory = os.path.dirname(directory)
+    directories.add('')
+    return sorted((path, sha) for path, sha in blob_shas.items()
+                  if os.path.basename(path) in STYLE_FILES and os.path.dirname(path) in directories)
+
+
 class ClangFormatValidatorOperation(Operation):
-    def __init__(self):
-        pass
+    def __init__(self, source_provider: Optional[SourceProvider] = None, scope: str = SCOPE_FULL,
+                 parallel_files: Optional[int] = None, lint_cache_path: Optional[str] = None,
+                 lint_cache_max_size_mb: int = DEFAULT_LINT_CACHE_MAX_SIZE_MB):
+        if scope not in SCOPES:
+            raise Exception(f"Unknown clang format scope {scope}, expected one of {SCOPES}")
+        self.__source_provider = source_provider or GitSourceProvider()
+        self.__scope = scope
+        self.__parallel_files = parallel_files or ToolRunner.cpu_slots()
+        self.__lint_cache_path = lint_cache_path
+        self.__lint_cache_max_size_mb = lint_cache_max_size_mb
 
-    def __excludes_from_file(self):
+    def __excludes_from_file(self, workspace_path: str):
         excludes = []
         try:
-            with io.open(DEFAULT_CLANG_FORMAT_IGNORE, 'r', encoding='utf-8') as f:
+            with io.open(os.path.join(workspace_path, DEFAULT_CLANG_FORMAT_IGNORE), 'r', encoding='utf-8') as f:
                 for line in f:
                     if line.startswith('#'):
                         # ignore comments
@@ -58,40 +133,23 @@ class ClangFormatValidatorOperation(Operation):
                 raise
         return excludes
 
-    def __list_files(self, workspace_path: str):
-        extensions = DEFAULT_EXTENSIONS
-        exclude = self.__excludes_from_file()
-        ignore_names = ['.git']
+    def __list_files(self, workspace_path: str, pr: PullRequest, exclude: List[str]) -> List[str]:
+        include_patterns = [f"*.{extension}" for extension in DEFAULT_EXTENSIONS.split(',')]
+        files = WorkspaceIndexer.index_workspace(workspace_path, pr.base.repo.full_name, pr.head.sha, include_patterns, exclude)
+        return [os.path.join(workspace_path, file) for file in files]
 
-        out = []
-        for file in os.listdir(workspace_path):
-            if file in ignore_names:
+    def __changed_files(self, git_client: GithubAppClient, pr: PullRequest, exclude: List[str]) -> Dict[str, Optional[List[Tuple[int, int]]]]:
+        # Changed files (relative to the repo root) with the changed line ranges on the head side
+        extensions = DEFAULT_EXTENSIONS.split(',')
+        exclude_matcher = GlobMatcher(exclude)
+        changed_files = {}
+        for changed_file in git_client.paginate(File, f"{pr.url}/files"):
+            if changed_file.status == 'removed' or os.path.splitext(changed_file.filename)[1][1:] not in extensions:
                 continue
-            full_path = os.path.join(workspace_path, file)
-            if os.path.isdir(full_path):
-                for dirpath, dnames, fnames in os.walk(full_path):
-                    fpaths = [os.path.join(dirpath, fname) for fname in fnames]
-                    for pattern in exclude:
-                        # os.walk() supports trimming down the dnames list
-                        # by modifying it in-place,
-                        # to avoid unnecessary directory listings.
-                        dnames[:] = [
-                            x for x in dnames
-                            if
-                            not fnmatch.fnmatch(os.path.join(dirpath, x).replace(workspace_path, '')[1:], pattern)
-                        ]
-                        fpaths = [
-                            x for x in fpaths if not fnmatch.fnmatch(x, pattern)
-                        ]
-                    for f in fpaths:
-                        ext = os.path.splitext(f)[1][1:]
-                        if ext != "" and ext in extensions:
-                            out.append(f)
-            else:
-                ext = os.path.splitext(file)[1][1:]
-                if ext != "" and ext in extensions:
-                    out.append(full_path)
-        return out
+            if exclude_matcher.matches_path_or_parent(changed_file.filename):
+                continue
+            changed_files[changed_file.filename] = added_line_ranges(changed_file.patch) if self.__scope == SCOPE_LINES else None
+        return changed_files
 
     def __make_diff(self, file: str, original: List[str], reformatted: List[str]):
         return list(difflib.unified_diff(
@@ -101,31 +159,117 @@ class ClangFormatValidatorOperation(Operation):
                 tofile=f"{file}(reformatted)",
                 n=3))
 
-    def __run_clang_format_diff(self, file: str):
+    def __run_clang_format(self, workspace_path: str, files: List[str], extra_args: List[str], priority: int) -> str:
+        # The cwd is passed per process, as chdir is process wide and races with the other bots threads
+        proc = ToolRunner.run(["clang-format", "--style=file"] + extra_args + files, cwd=workspace_path, priority=priority)
+        if proc.returncode != 0:
+            raise Exception(f"clang-format failed with {proc.returncode} [{proc.stderr.strip()}]")
+        return proc.stdout if '--dry-run' not in extra_args else proc.stderr
+
+    def __find_violations(self, workspace_path: str, files: List[str], line_ranges: Optional[List[Tuple[int, int]]], priority: int) -> List[str]:
+        # Dry run only reports the violating files, so unchanged files are never diffed on our side
+        lines_args = [f"--lines={start}:{end}" for start, end in line_ranges or []]
+        errs = self.__run_clang_format(workspace_path, files, ["--dry-run"] + lines_args, priority)
+        return list(set(VIOLATION_PATTERN.findall(errs)) & set(files))
+
+    def __run_clang_format_diff(self, workspace_path: str, file: str, line_ranges: Optional[List[Tuple[int, int]]], priority: int):
         with io.open(file, 'r', encoding='utf-8') as f:
             original = f.readlines()
-        
-        invocation = ["clang-format", "--style=file", file]
 
-        proc = subprocess.Popen(
-            invocation,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding='utf-8')
+        # Only the given lines are formatted, so the diff is limited to them
+        lines_args = [f"--lines={start}:{end}" for start, end in line_ranges or []]
+        outs = self.__run_clang_format(workspace_path, [file], lines_args, priority).splitlines(keepends=True)
+        return {'diffs': self.__make_diff(os.path.relpath(file, workspace_path), original, outs), 'file': file}
+
+    def __report_diff(self, report: CheckRunReport, file: str, diffs: List[str]):
+        diffs = [diff for diff in diffs if diff.strip() != '']
+        report.add_text("```diff\n" + ''.join(diffs).strip() + "\n```\n")
+        # An annotation per hunk, on the original lines which would be reformatted
+        for index, diff in enumerate(diffs):
+            match = ORIGINAL_HUNK_HEADER_PATTERN.match(diff)
+            if not match:
+                continue
+            start = max(1, int(match.group(1)))
+            length = 1 if match.group(2) is None else int(match.group(2))
+            hunk = []
+            for line in diffs[index + 1:]:
+                if line.startswith('@@'):
+                    break
+                hunk.append(line)
+            report.add_annotation(file, start, start + max(length, 1) - 1, ANNOTATION_FAILURE,
+                                  ''.join(hunk), "Code should be clang-formatted")
+
+    def __cached_diffs(self, lint_cache: LintResultsStore, tool: str, workspace_path: str, files: List[str],
+                       line_ranges: Dict[str, Optional[List[Tuple[int, int]]]]) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, List[str]]]:
+        # Results are keyed by the file content and everything else which affects them, the style files and the line ranges
+        blob_shas = list_blob_shas(workspace_path)
+        cache_keys = {}
+        for file in files:
+            relative_file = os.path.relpath(file, workspace_path)
+            blob_sha = blob_shas.get(relative_file)
+            if blob_sha:
+                cache_keys[file] = (blob_sha, LintResultsStore.config_hash(effective_style_files(blob_shas, relative_file),
+                                                                           line_ranges.get(file), LINT_CACHE_FORMAT))
+        cached = lint_cache.get_results(tool, cache_keys.values())
+        return cache_keys, {file: cached[key] for file, key in cache_keys.items() if key in cached}
+
+    def __validate_files(self, workspace_path: str, files: List[str], line_ranges: Dict[str, Optional[List[Tuple[int, int]]]]):
+        lint_cache = None
+        cache_keys = {}
+        cached_diffs = {}
+        if self.__lint_cache_path:
+            lint_cache = LintResultsStore.get_store(self.__lint_cache_path)
+            tool = f"clang-format {ToolVersion.get_version('clang-format')}"
+            cache_keys, cached_diffs = self.__cached_diffs(lint_cache, tool, workspace_path, files, line_ranges)
+            logger.info(f"Found {len(cached_diffs)} cached results out of {len(files)} files")
+        checked_files = [file for file in files if file not in cached_diffs]
 
-        # hopefully the stderr pipe won't get full and block the process
-        outs = list(proc.stdout.readlines())
-        proc.wait()
-        return {'diffs': self.__make_diff(file, original, outs), 'file': file}
+        # Files with line ranges need an invocation of their own (--lines applies to a single file), the rest are batched
+        batches = [([file], line_ranges[file]) for file in checked_files if line_ranges.get(file)]
+        whole_files = [file for file in checked_files if not line_ranges.get(file)]
+        batches += [(whole_files[i:i + DEFAULT_DRY_RUN_BATCH_SIZE], None)
+                    for i in range(0, len(whole_files), DEFAULT_DRY_RUN_BATCH_SIZE)]
+        # The pool threads do not inherit the priority of the calling thread, so it is passed along
+        priority = ToolRunner.current_priority()
+        with ThreadPoolExecutor(max_workers=self.__parallel_files) as pool:
+            violations = pool.map(lambda batch: self.__find_violations(workspace_path, batch[0], batch[1], priority), batches)
+            new_violations = set(file for batch_violations in violations for file in batch_violations)
+            if lint_cache:
+                # The violating files are cached once diffed
+                lint_cache.put_results(tool, {cache_keys[file]: [] for file in checked_files
+                                              if file in cache_keys and file not in new_violations})
+            violating_files = sorted(new_violations | set(file for file, diffs in cached_diffs.items() if diffs))
+            if len(violating_files) > 0:
+                logger.info(f"Found {len(violating_files)} files with invalid format out of {len(files)}")
+            # Yielded as they are diffed, so the diffs are reported without keeping all of them around
+            # The cached violations are replayed as is, only the new ones are diffed
+            for out in bounded_map(pool, lambda file: {'diffs': cached_diffs[file], 'file': file} if file in cached_diffs
+                                   else self.__run_clang_format_diff(workspace_path, file, line_ranges.get(file), priority),
+                                   violating_files, self.__parallel_files):
+                if lint_cache and out['file'] in new_violations and out['file'] in cache_keys:
+                    lint_cache.put_results(tool, {cache_keys[out['file']]: out['diffs']})
+                yield out
+            if lint_cache:
+                lint_cache.evict(self.__lint_cache_max_size_mb)
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
-        return ClangFormatValidatorOperation()
+        # Without a source config, the git checkout keys are read from the operation config itself
+        source_provider = SourceProvidersLoader.load_source_provider_from_config(config[SOURCE_KEY]) \
+            if SOURCE_KEY in config.keys() else GitSourceProvider.create_source_provider(config)
+        return ClangFormatValidatorOperation(source_provider,
+                                             config.get(SCOPE_KEY, SCOPE_FULL),
+                                             config.get(PARALLEL_FILES_KEY),
+                                             config.get(LINT_CACHE_PATH_KEY),
+                                             config.get(LINT_CACHE_MAX_SIZE_MB_KEY, DEFAULT_LINT_CACHE_MAX_SIZE_MB))
 
     @staticmethod
     def operation_type() -> str:
         return OPERATION_NAME
 
+    def check_run_names(self, event: dict) -> List[str]:
+        return ["clang-format-validation"] if 'pull_request' in event.keys() else []
+
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
@@ -137,47 +281,39 @@ class ClangFormatValidatorOperation(Operation):
             # Create the check for the PR
             logger.info("Creating clang format validation check run")
             check_run = None
-            working_dir = None
-            # Clone the repo and run the clang validator
+            # Checkout the repo and run the clang validator
             try:
                 check_run = git_client.create_check_run("clang-format-validation", pr)
-                working_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
-                os.makedirs(working_dir)
-                git.Repo.clone_from(url=pr.head.repo.clone_url, branch=pr.head.ref, to_path=working_dir)
-
-                # Run the validator
-                curr_dir = os.getcwd()
-                os.chdir(working_dir)
-
-                # Get the files to format
-                files = self.__list_files(working_dir)
-                diff_files = [self.__run_clang_format_diff(file) for file in files]
-                os.chdir(curr_dir)
-                diffs = []
-                for out in diff_files:
-                    if len(out['diffs']) > 0:
-                        diffs.append(out)
-                if len(diffs) > 0:
-                    logger.info("Found diffs, setting the check status to failure")
-                    str_diffs = ""
-                    str_diff_files = ""
-                    for diff_file in diffs:
-                        diffs = [diff for diff in diff_file['diffs'] if diff.strip() != '']
-                        str_diff_files += diff_file['file'].replace(working_dir, '')[1:] + "\n"
-                        str_diffs += "```diff" + ''.join(diffs).strip().replace(working_dir, '.')
-                    if len(str_diffs) > 65000:
-                        str_diffs = str_diff_files
-                    git_client.complete_check_run(check_run,
-                        "failure",
-                        {'title': "Clang Format Diffs", 
-                        'summary': "Invalid format found for some files",
-                        'text': str_diffs})
-                else:
-                    logger.info("No diffs found, setting the check status to success")
-                    git_client.complete_check_run(check_run,
-                        "success",
-                        {'title': "Clang Format Diffs", 
-                        'summary': "No invalid formats found"})
+                # The style files are needed as well when only the sources are fetched
+                with self.__source_provider.checkout(git_client, pr, DEFAULT_EXTENSIONS.split(','), STYLE_FILES) as working_dir:
+                    # Get the files to format, either the whole repo or only what the PR changed
+                    line_ranges = {}
+                    exclude = self.__excludes_from_file(working_dir)
+                    if self.__scope == SCOPE_FULL:
+                        files = self.__list_files(working_dir, pr, exclude)
+                    else:
+                        changed_files = self.__changed_files(git_client, pr, exclude)
+                        files = [os.path.join(working_dir, file) for file in changed_files.keys()
+                                 if os.path.isfile(os.path.join(working_dir, file))]
+                        line_ranges = {os.path.join(working_dir, file): ranges for file, ranges in changed_files.items()}
+                        logger.info(f"Validating {len(files)} changed files")
+                    # A file without any added lines (only deletions) has nothing to format
+                    files = [file for file in files if line_ranges.get(file) != []]
+                    # Diffs are added to the report as they are made, the report keeps to the check run size limits
+                    report = CheckRunReport(git_client, check_run, "Clang Format Diffs")
+                    report.report_progress(f"Validating {len(files)} files")
+                    diff_files = 0
+                    for out in self.__validate_files(working_dir, files, line_ranges):
+                        if len(out['diffs']) > 0:
+                            self.__report_diff(report, os.path.relpath(out['file'], working_dir), out['diffs'])
+                            diff_files += 1
+                            report.report_progress(f"Found {diff_files} files with invalid format so far")
+                    if diff_files > 0:
+                        logger.info("Found diffs, setting the check status to failure")
+                        report.complete("failure", f"Invalid format found for {diff_files} files")
+                    else:
+                        logger.info("No diffs found, setting the check status to success")
+                        report.complete("success", "No invalid formats found")
             except:
                 logger.warn(traceback.format_exc())
                 if check_run:
@@ -185,9 +321,6 @@ class ClangFormatValidatorOperation(Operation):
                         "failure",
                         {'title': "Clang Format Diffs", 
                         'summary': "Internal error occured"})
-            finally:
-                if working_dir:
-                    shutil.rmtree(working_dir)
 
 
 OperationsLoader.register_operation(ClangFormatValidatorOperation)
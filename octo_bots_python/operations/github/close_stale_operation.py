@@ -1,20 +1,25 @@
 import datetime
-from typing import Dict, List, Union
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Union
 
 import dateparser
 from github import Github
-from github.Installation import Installation
 from github.Issue import Issue
 from github.PullRequest import PullRequest
 from github.Repository import Repository
 
 from octo_bots_python.bots_client import BotsBaseClient
-from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.clients.github_client import (DEFAULT_RATE_LIMIT_RESERVE,
+                                                    GithubAppClient)
+from octo_bots_python.common.fan_out import fan_out
 from octo_bots_python.common.logger import Logger
 from octo_bots_python.filters.filter import Filter
 from octo_bots_python.filters.filters_loader import FiltersLoader
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.stale_items_store import (StaleItem,
+                                                       StaleItemsStore)
 
 OPERATION_NAME = 'close-stale'
 
@@ -24,19 +29,33 @@ CLOSE_PRS_KEY = 'close-prs'
 STALE_EXPIRATION = 'stale-expiration'
 STALE_COMMENT = 'stale-comment'
 EXEMPT_LABELS = 'exempt-labels'
+PARALLEL_REPOS_KEY = 'parallel-repos'
+RATE_LIMIT_RESERVE_KEY = 'rate-limit-reserve'
+INDEX_PATH_KEY = 'index-path'
+INDEX_FULL_SYNC_EVERY_KEY = 'index-full-sync-every'
 MANDATORY_KEYS = [STALE_EXPIRATION, STALE_COMMENT]
 
+DEFAULT_PARALLEL_REPOS = 4
+DEFAULT_INDEX_FULL_SYNC_EVERY = '1 day'
+
 logger = Logger("close_stale_operation")
 
 
 class CloseStaleOperation(Operation):
-    def __init__(self, repo_filters: List[Filter], close_issues: bool, close_prs: bool, stale_expiration: str, stale_comment: str, exempt_labels: List[str]):
+    def __init__(self, repo_filters: List[Filter], close_issues: bool, close_prs: bool, stale_expiration: str, stale_comment: str, exempt_labels: List[str],
+                 parallel_repos: int = DEFAULT_PARALLEL_REPOS, rate_limit_reserve: int = DEFAULT_RATE_LIMIT_RESERVE,
+                 index_path: Optional[str] = None, index_full_sync_every: str = DEFAULT_INDEX_FULL_SYNC_EVERY):
         self.__repo_filters = repo_filters
         self.__close_issues = close_issues
         self.__close_prs = close_prs
         self.__stale_expiration = stale_expiration
         self.__stale_comment = stale_comment
         self.__exempt_labels = exempt_labels
+        self.__parallel_repos = parallel_repos
+        self.__rate_limit_reserve = rate_limit_reserve
+        self.__index_path = index_path
+        now = datetime.datetime.now()
+        self.__index_full_sync_interval = dateparser.parse(index_full_sync_every, settings={'PREFER_DATES_FROM': 'future', 'RELATIVE_BASE': now}) - now
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
@@ -59,39 +78,124 @@ class CloseStaleOperation(Operation):
         exempt_labels = []
         if EXEMPT_LABELS in config.keys():
             exempt_labels = config[EXEMPT_LABELS]
-        return CloseStaleOperation(repo_filters, close_issues, close_prs, config[STALE_EXPIRATION], config[STALE_COMMENT], exempt_labels)
+        return CloseStaleOperation(repo_filters, close_issues, close_prs, config[STALE_EXPIRATION], config[STALE_COMMENT], exempt_labels,
+                                   config.get(PARALLEL_REPOS_KEY, DEFAULT_PARALLEL_REPOS),
+                                   config.get(RATE_LIMIT_RESERVE_KEY, DEFAULT_RATE_LIMIT_RESERVE),
+                                   config.get(INDEX_PATH_KEY), config.get(INDEX_FULL_SYNC_EVERY_KEY, DEFAULT_INDEX_FULL_SYNC_EVERY))
 
     @staticmethod
     def operation_type() -> str:
         return OPERATION_NAME
 
-    def __validate_stale(self, stale_item: Union[PullRequest, Issue]):
-        if stale_item.state == 'open' and datetime.datetime.now() - stale_item.updated_at > \
-            dateparser.parse(self.__stale_expiration, settings={'PREFER_DATES_FROM': 'future'}) - datetime.datetime.now() and \
+    def __validate_stale(self, git_client: GithubAppClient, stale_item: Union[PullRequest, Issue], expiration: datetime.timedelta) -> bool:
+        if stale_item.state == 'open' and time.time() - StaleItemsStore.to_timestamp(stale_item.updated_at) > expiration.total_seconds() and \
             all(l.name not in self.__exempt_labels for l in stale_item.labels):
             logger.info(f"Closing stale item [{stale_item.title}]")
+            git_client.wait_for_rate_limit(self.__rate_limit_reserve)
             if isinstance(stale_item, PullRequest):
                 stale_item.create_issue_comment(self.__stale_comment)
             else:
                 stale_item.create_comment(self.__stale_comment)
             stale_item.edit(state='closed')
+            return True
+        return False
+
+    def __close_repo_stale_items(self, git_client: GithubAppClient, repo: Repository, expiration: datetime.timedelta) -> int:
+        closed = 0
+        git_client.wait_for_rate_limit(self.__rate_limit_reserve)
+        if self.__close_issues:
+            for issue in git_client.paginate(Issue, f"{repo.url}/issues", {'state': 'open'}):
+                closed += self.__validate_stale(git_client, issue, expiration)
+        if self.__close_prs:
+            for pr in git_client.paginate(PullRequest, f"{repo.url}/pulls", {'state': 'open'}):
+                closed += self.__validate_stale(git_client, pr, expiration)
+        return closed
+
+    def __sync_repo_stale_items(self, git_client: GithubAppClient, index: StaleItemsStore, repo: Repository, expiration: datetime.timedelta) -> int:
+        # The issues listing includes pull requests as well, so a single listing reconciles the whole repo
+        closed = 0
+        open_items = []
+        git_client.wait_for_rate_limit(self.__rate_limit_reserve)
+        for issue in git_client.paginate(Issue, f"{repo.url}/issues", {'state': 'open'}):
+            is_pull_request = issue.pull_request is not None
+            if (self.__close_prs if is_pull_request else self.__close_issues) and self.__validate_stale(git_client, issue, expiration):
+                closed += 1
+            else:
+                open_items.append(StaleItem(repo.full_name, repo.url, issue.number, is_pull_request, issue.title,
+                                            StaleItemsStore.to_timestamp(issue.updated_at), [l.name for l in issue.labels]))
+        index.replace_repo_items(repo.full_name, repo.url, open_items)
+        return closed
+
+    def __close_indexed_stale_item(self, git_client: GithubAppClient, index: StaleItemsStore, item: StaleItem, expiration: datetime.timedelta) -> int:
+        # The index may lag behind (missed webhook), so the item is re-read before closing it
+        git_client.wait_for_rate_limit(self.__rate_limit_reserve)
+        headers, data = git_client.rest_impl.requestJsonAndCheck("GET", f"{item.repo_url}/issues/{item.number}")
+        issue = Issue(git_client.rest_impl, headers, data, completed=True)
+        closed = self.__validate_stale(git_client, issue, expiration)
+        if closed or issue.state != 'open':
+            index.remove_item(item.repo_full_name, item.number)
+            return int(closed)
+        index.upsert_item(item.repo_full_name, item.number, item.is_pull_request, issue.title,
+                          StaleItemsStore.to_timestamp(issue.updated_at), [l.name for l in issue.labels])
+        return 0
 
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if GithubAppClient.client_type() not in clients.keys():
             raise Exception("Client github does not exist")
         # The event can be ignored here as we go over all of the repos for the client
         git_client: GithubAppClient = clients[GithubAppClient.client_type()]
-        git_installation: Installation = git_client.installation_impl
-
-        # Go over each repo and handle issues / pull requests
-        for repo in git_installation.get_repos():
-            if not any(f.filter(clients, repo.raw_headers, repo.raw_data) for f in self.__repo_filters):
-                if self.__close_issues:
-                    for issue in repo.get_issues():
-                        self.__validate_stale(issue)
-                if self.__close_prs:
-                    for pr in repo.get_pulls():
-                        self.__validate_stale(pr)
+        expiration = dateparser.parse(self.__stale_expiration, settings={'PREFER_DATES_FROM': 'future'}) - datetime.datetime.now()
+
+        progress_lock = Lock()
+        progress = {'repos': 0, 'closed': 0, 'failed': 0}
+        synced_repos = []
+
+        def on_repo_done(repo: Repository, closed: Optional[int], error: Optional[BaseException]):
+            with progress_lock:
+                progress['repos'] += 1
+                synced_repos.append(repo.full_name)
+                if error:
+                    progress['failed'] += 1
+                    logger.warn(f"[{progress['repos']}] Failed handling stale items of repo [{repo.name}] [{str(error)}]")
+                else:
+                    progress['closed'] += closed
+                    logger.info(f"[{progress['repos']}] Finished repo [{repo.name}], closed {closed} stale items")
+
+        index: Optional[StaleItemsStore] = None
+        if self.__index_path:
+            index = StaleItemsStore.get_store(self.__index_path)
+            last_full_sync = index.last_full_sync()
+            if last_full_sync and time.time() - last_full_sync < self.__index_full_sync_interval.total_seconds():
+                # The index is maintained by webhooks, so only the stale candidates are queried and closed
+                candidates = [item for item in index.query_stale_items(time.time() - expiration.total_seconds())
+                              if (self.__close_prs if item.is_pull_request else self.__close_issues) and
+                              all(label not in self.__exempt_labels for label in item.labels)]
+                logger.info(f"Found {len(candidates)} stale candidates in the stale index")
+                closed_items = []
+
+                def on_item_done(item: StaleItem, closed: Optional[int], error: Optional[BaseException]):
+                    if error:
+                        logger.warn(f"Failed closing stale item {item.repo_full_name}#{item.number} [{str(error)}]")
+                    else:
+                        closed_items.append(closed or 0)
+
+                fan_out(candidates, lambda item: self.__close_indexed_stale_item(git_client, index, item, expiration), self.__parallel_repos,
+                        on_item_done)
+                logger.info(f"Closed {sum(closed_items)} stale items from the stale index")
+                return
+            logger.info("Running a full sync of the stale index")
+
+        # Repos are streamed from the installation listing, while a bounded pool handles each repo's items
+        repos = (repo for repo in git_client.paginate(Repository, "/installation/repositories", list_item="repositories")
+                 if not any(f.filter(clients, repo.raw_headers, repo.raw_data) for f in self.__repo_filters))
+        if index:
+            fan_out(repos, lambda repo: self.__sync_repo_stale_items(git_client, index, repo, expiration), self.__parallel_repos, on_repo_done)
+            if progress['failed'] == 0:
+                index.remove_repos_not_in(synced_repos)
+                index.set_last_full_sync(time.time())
+        else:
+            fan_out(repos, lambda repo: self.__close_repo_stale_items(git_client, repo, expiration), self.__parallel_repos, on_repo_done)
+        logger.info(f"Closed {progress['closed']} stale items over {progress['repos']} repos ({progress['failed']} failed)")
 
 
 OperationsLoader.register_operation(CloseStaleOperation)
@@ -0,0 +1,99 @@
+import itertools
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from github.NamedUser import NamedUser
+from github.Repository import Repository
+
+from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.fan_out import fan_out
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.operation import Operation
+from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.contributors_ranking_store import \
+    ContributorsRankingStore
+
+OPERATION_NAME = 'contributors-ranking-refresh'
+
+RANKING_PATH_KEY = 'ranking-path'
+RANKING_SIZE_KEY = 'ranking-size'
+PARALLEL_REPOS_KEY = 'parallel-repos'
+MANDATORY_KEYS = [RANKING_PATH_KEY]
+
+DEFAULT_RANKING_SIZE = 30
+DEFAULT_PARALLEL_REPOS = 4
+
+logger = Logger("contributors_ranking_refresh_operation")
+
+
+def list_ranked_contributors(git_client: GithubAppClient, repo_url: str, ranking_size: int) -> List[Tuple[str, int]]:
+    # Contributors are sorted by contributions, so only the first page is ever needed
+    ranked_contributors = git_client.paginate(NamedUser, f"{repo_url}/contributors", {'per_page': ranking_size}, max_pages=1)
+    return [(contributor.login, contributor.contributions) for contributor in itertools.islice(ranked_contributors, ranking_size)]
+
+
+class ContributorsRankingRefreshOperation(Operation):
+    def __init__(self, ranking_path: str, ranking_size: int, parallel_repos: int = DEFAULT_PARALLEL_REPOS):
+        self.__ranking_path = ranking_path
+        self.__ranking_size = ranking_size
+        self.__parallel_repos = parallel_repos
+
+    @staticmethod
+    def create_operation(config: dict) -> Operation:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for contributors ranking refresh operation")
+        return ContributorsRankingRefreshOperation(config[RANKING_PATH_KEY],
+                                                   config.get(RANKING_SIZE_KEY, DEFAULT_RANKING_SIZE),
+                                                   config.get(PARALLEL_REPOS_KEY, DEFAULT_PARALLEL_REPOS))
+
+    @staticmethod
+    def operation_type() -> str:
+        return OPERATION_NAME
+
+    def __refresh_repo(self, git_client: GithubAppClient, ranking: ContributorsRankingStore, repo_full_name: str, repo_url: str) -> int:
+        contributors = list_ranked_contributors(git_client, repo_url, self.__ranking_size)
+        if not contributors:
+            # Github answers with no content while it computes the contributors of a big repo, the previous ranking is kept until then
+            logger.info(f"No contributors listed for repo [{repo_full_name}], keeping its previous ranking")
+            return 0
+        ranking.set_ranking(repo_full_name, contributors, self.__ranking_size)
+        return len(contributors)
+
+    def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        if GithubAppClient.client_type() not in clients.keys():
+            raise Exception("Client github does not exist")
+        git_client: GithubAppClient = clients[GithubAppClient.client_type()]
+        ranking: ContributorsRankingStore = ContributorsRankingStore.get_store(self.__ranking_path)
+
+        if 'repository' in event.keys():
+            # Push webhooks, only a push to the default branch changes the ranking
+            repo = event['repository']
+            if 'pusher' not in event.keys() or event.get('ref') != f"refs/heads/{repo['default_branch']}":
+                return
+            # The push event repository url is the html one
+            ranked = self.__refresh_repo(git_client, ranking, repo['full_name'], f"/repos/{repo['full_name']}")
+            logger.info(f"Refreshed contributors ranking of repo [{repo['full_name']}] with {ranked} contributors")
+            return
+
+        # Scheduled, every repo of the installation is ranked again
+        progress_lock = Lock()
+        progress = {'repos': 0, 'failed': 0}
+        ranked_repos = []
+
+        def on_repo_done(repo: Repository, ranked: Optional[int], error: Optional[BaseException]):
+            with progress_lock:
+                progress['repos'] += 1
+                ranked_repos.append(repo.full_name)
+                if error:
+                    progress['failed'] += 1
+                    logger.warn(f"Failed ranking contributors of repo [{repo.name}] [{str(error)}]")
+
+        repos = git_client.paginate(Repository, "/installation/repositories", list_item="repositories")
+        fan_out(repos, lambda repo: self.__refresh_repo(git_client, ranking, repo.full_name, repo.url), self.__parallel_repos, on_repo_done)
+        if progress['failed'] == 0:
+            ranking.remove_repos_not_in(ranked_repos)
+        logger.info(f"Refreshed contributors ranking of {progress['repos']} repos ({progress['failed']} failed)")
+
+
+OperationsLoader.register_operation(ContributorsRankingRefreshOperation)
@@ -2,17 +2,24 @@ import datetime
 import os
 import time
 import traceback
-from typing import Dict, List, Union
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
 
 import dateparser
+from github.CheckRun import CheckRun
 from github.PullRequest import PullRequest
 
 from octo_bots_python.bots_client import BotsBaseClient
 from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.checkmarx_scan_result import (
+    MANDATORY_RISK_SCHEME_KEYS, SCAN_DONE_STATES, complete_scan_check_run)
 from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.circuit_breaker import CircuitOpenError
 from octo_bots_python.common.logger import Logger
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.checkmarx_scans_store import (CheckmarxScansStore,
+                                                           PendingScan)
 
 OPERATION_NAME = 'pull-request-checkmarx'
 
@@ -20,14 +27,9 @@ RISK_SCHEME_KEY = 'risk-scheme'
 ONLY_MAIN_BRANCH_KEY = 'only-main-branch'
 SCAN_TIMEOUT_KEY = 'scan-timeout'
 SCAN_POLL_INTERVAL_KEY = 'scan-poll-interval'
+TRACKER_PATH_KEY = 'tracker-path'
 MANDATORY_KEYS = [RISK_SCHEME_KEY]
 
-RISK_SCHEME_MIN_HIGH_KEY = 'min-high-vuls'
-RISK_SCHEME_MIN_MEDIUM_KEY = 'min-medium-vuls'
-RISK_SCHEME_MIN_LOW_KEY = 'min-low-vuls'
-RISK_SCHEME_MIN_INFO_KEY = 'min-info-vuls'
-MANDATORY_RISK_SCHEME_KEYS = [RISK_SCHEME_MIN_HIGH_KEY, RISK_SCHEME_MIN_MEDIUM_KEY, RISK_SCHEME_MIN_LOW_KEY, RISK_SCHEME_MIN_INFO_KEY]
-
 DEFAULT_ONLY_MAIN_BRACNH = True
 DEFAULT_SCAN_TIMEOUT = '30 minutes'
 DEFAULT_SCAN_POLL_INTERVAL = '5 seconds'
@@ -36,11 +38,16 @@ logger = Logger("pull_request_checkmarx")
 
 
 class PullRequestCheckmarxOperation(Operation):
-    def __init__(self, risk_scheme: Dict[str, int], only_main_branch: bool, scan_timeout: str, scan_poll_interval: str):
+    # Serializes finding and creating the scan of a commit, so concurrent events of the same commit share a single scan
+    __scans_lock = Lock()
+
+    def __init__(self, risk_scheme: Dict[str, int], only_main_branch: bool, scan_timeout: str, scan_poll_interval: str,
+                 tracker_path: Optional[str] = None):
         self.__risk_scheme = risk_scheme
         self.__only_main_branch = only_main_branch
         self.__scan_timeout = scan_timeout
         self.__scan_poll_interval = scan_poll_interval
+        self.__tracker_path = tracker_path
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
@@ -57,7 +64,8 @@ class PullRequestCheckmarxOperation(Operation):
         scan_poll_interval = DEFAULT_SCAN_POLL_INTERVAL
         if SCAN_POLL_INTERVAL_KEY in config.keys():
             scan_poll_interval = config[SCAN_POLL_INTERVAL_KEY]
-        return PullRequestCheckmarxOperation(config[RISK_SCHEME_KEY], only_main_branch, scan_timeout, scan_poll_interval)
+        return PullRequestCheckmarxOperation(config[RISK_SCHEME_KEY], only_main_branch, scan_timeout, scan_poll_interval,
+                                             config.get(TRACKER_PATH_KEY))
 
     @staticmethod
     def operation_type() -> str:
@@ -65,22 +73,17 @@ class PullRequestCheckmarxOperation(Operation):
 
     def __prepare_checkmarx_project(self, checkmarx_client: CheckmarxClient, pr: PullRequest) -> Union["CxProject", bool]:
         # Find the repo checkmarx project
-        projects = checkmarx_client.projects_client.get_all_project_details(team_id=checkmarx_client.team_id)
-        found_proj = None
-        found_branched_proj = None
         is_incremental = True
         branched_proj_name = f"{pr.head.repo.name}@{pr.head.ref.replace('/', '_')}"
-        for proj in projects:
-            if pr.head.repo.name == proj.name:
-                found_proj = proj
-            if proj.name == branched_proj_name:
-                found_branched_proj = proj
+        found_proj = checkmarx_client.get_project_by_name(pr.head.repo.name)
+        found_branched_proj = checkmarx_client.get_project_by_name(branched_proj_name)
         # Create a new project if not found with the master branch
         if found_proj == None:
             logger.info(f"Creating new checkmarx project for {pr.head.repo.name}")
             found_proj = checkmarx_client.projects_client.create_project_with_default_configuration(pr.head.repo.name, team_id=checkmarx_client.team_id)
             found_proj = checkmarx_client.projects_client.get_project_details_by_id(found_proj.id)
             checkmarx_client.projects_client.set_remote_source_setting_to_git(found_proj.project_id, pr.head.repo.clone_url, f"refs/heads/{pr.head.repo.default_branch}")
+            checkmarx_client.add_project(found_proj)
             is_incremental = False
         # Branch project for the git branch
         if found_branched_proj == None:
@@ -88,24 +91,78 @@ class PullRequestCheckmarxOperation(Operation):
             resp = checkmarx_client.projects_client.create_branched_project(found_proj.project_id, branched_proj_name)
             found_branched_proj = checkmarx_client.projects_client.get_project_details_by_id(resp.id)
             checkmarx_client.projects_client.set_remote_source_setting_to_git(found_branched_proj.project_id, pr.head.repo.clone_url, f"refs/heads/{pr.head.ref}")
+            checkmarx_client.add_project(found_branched_proj)
         return found_branched_proj, is_incremental
 
-    def __execute_scan(self, checkmarx_client: CheckmarxClient, pr: PullRequest, found_branched_proj: "CxProject", is_incremental: bool) -> "CxScanDetail":
-        scan_resp = checkmarx_client.scans_client.create_new_scan(found_branched_proj.project_id, is_incremental=is_incremental, comment="Auto scan by github pull request webhook")
+    def __cancel_superseded_scans(self, checkmarx_client: CheckmarxClient, scans_store: CheckmarxScansStore, found_branched_proj: "CxProject", pr: PullRequest):
+        # Dynamic import due to internal config checkmarx
+        from CheckmarxPythonSDK.CxRestAPISDK.exceptions.CxError import CxError
 
+        # The branched project only scans the PR branch, so a scan of any other commit of it is for an outdated head
+        for scan_id in scans_store.unfinished_project_scans(found_branched_proj.project_id, pr.head.sha):
+            logger.info(f"Canceling scan {scan_id} of project {found_branched_proj.name}, superseded by {pr.head.sha}")
+            try:
+                checkmarx_client.cancel_scan(scan_id)
+            except CxError as e:
+                # Most likely ended already (no longer in the queue), the tracker completes its check run either way
+                logger.warn(f"Failed canceling scan {scan_id} [{str(e)}]")
+
+    def __find_or_create_scan(self, checkmarx_client: CheckmarxClient, scans_store: CheckmarxScansStore, found_branched_proj: "CxProject",
+                              pr: PullRequest, is_incremental: bool) -> Tuple[int, bool]:
+        # Scans are keyed by the branched project and the head sha, a commit already scanned (or being scanned) is not scanned again
+        with PullRequestCheckmarxOperation.__scans_lock:
+            project_scan = scans_store.find_project_scan(found_branched_proj.project_id, pr.head.sha)
+            if project_scan is not None:
+                logger.info(f"Reusing scan {project_scan[0]} of project {found_branched_proj.name} for {pr.head.sha}")
+                return project_scan
+            self.__cancel_superseded_scans(checkmarx_client, scans_store, found_branched_proj, pr)
+            logger.info(f"Triggering a checkmarx scan for {pr.head.repo.name}@{pr.head.ref.replace('/', '_')}")
+            scan_resp = checkmarx_client.scans_client.create_new_scan(found_branched_proj.project_id, is_incremental=is_incremental,
+                                                                      comment=f"Auto scan by github pull request webhook for {pr.head.sha}")
+            scans_store.add_project_scan(found_branched_proj.project_id, pr.head.sha, scan_resp.id, time.time())
+            return scan_resp.id, False
+
+    def __track_scan(self, git_client: GithubAppClient, check_run: CheckRun, pr: PullRequest, found_branched_proj: "CxProject", scan_id: int):
+        # The scans tracker background operation completes the check run, so no thread waits on the scan
+        started_at = datetime.datetime.now()
+        scan_timeout = dateparser.parse(self.__scan_timeout, settings={'PREFER_DATES_FROM': 'future', 'RELATIVE_BASE': started_at})
+        scans_store: CheckmarxScansStore = CheckmarxScansStore.get_store(self.__tracker_path)
+        scans_store.add_scan(PendingScan(scan_id, found_branched_proj.project_id, found_branched_proj.name, pr.head.sha, check_run.url,
+                                         self.__risk_scheme, started_at.timestamp(), scan_timeout.timestamp()))
+        git_client.update_check_run(check_run,
+            {'title': "Checkmarx Scan",
+            'summary': "Scan Queued",
+            'text': f"Scan {scan_id} of project {found_branched_proj.name} is tracked until it ends"})
+
+    def __wait_for_scan(self, checkmarx_client: CheckmarxClient, git_client: GithubAppClient, check_run: CheckRun, pr: PullRequest,
+                        found_branched_proj: "CxProject", scan_resp: "CxCreateScanResponse") -> "CxScanDetail":
         # Wait for the scan to end
         scan_timeout = dateparser.parse(self.__scan_timeout, settings={'PREFER_DATES_FROM': 'future'})
         poll_interval = (dateparser.parse(self.__scan_poll_interval, settings={'PREFER_DATES_FROM': 'future'}) - datetime.datetime.now()).total_seconds()
         scan_details_resp = None
+        scan_started = datetime.datetime.now()
         while scan_timeout > datetime.datetime.now():
             logger.info(f"Checking checkmarx scan state for scan {pr.head.repo.name}@{pr.head.ref.replace('/', '_')}")
             scan_status_resp = checkmarx_client.scans_client.get_sast_scan_details_by_scan_id(scan_resp.id)
-            if scan_status_resp.status.name in ["Finished", "Canceled", "Failed"]:
+            if scan_status_resp.status.name in SCAN_DONE_STATES:
                 scan_details_resp = scan_status_resp
                 break
+            # Polled far more often than github needs to hear about it, the client drops the too frequent updates
+            git_client.update_check_run(check_run,
+                {'title': "Checkmarx Scan",
+                'summary': f"Scan {scan_status_resp.status.name}",
+                'text': f"Scan {scan_resp.id} of project {found_branched_proj.name} started {int((datetime.datetime.now() - scan_started).total_seconds() / 60)} minutes ago"})
             time.sleep(poll_interval)
         return scan_details_resp
 
+    def check_run_names(self, event: dict) -> List[str]:
+        if 'pull_request' not in event.keys():
+            return []
+        base = event['pull_request']['base']
+        if self.__only_main_branch and base['repo']['default_branch'] != base['ref']:
+            return []
+        return ["checkmarx-code-scan"]
+
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
@@ -137,52 +194,34 @@ class PullRequestCheckmarxOperation(Operation):
                 # Get / create the needed project
                 found_branched_proj, is_incremental = self.__prepare_checkmarx_project(checkmarx_client, pr)
 
+                if self.__tracker_path:
+                    scans_store: CheckmarxScansStore = CheckmarxScansStore.get_store(self.__tracker_path)
+                    scan_id, finished = self.__find_or_create_scan(checkmarx_client, scans_store, found_branched_proj, pr, is_incremental)
+                    if finished:
+                        scan_details_resp = checkmarx_client.scans_client.get_sast_scan_details_by_scan_id(scan_id)
+                        complete_scan_check_run(checkmarx_client, git_client, check_run, scan_details_resp, found_branched_proj.project_id, self.__risk_scheme)
+                    else:
+                        self.__track_scan(git_client, check_run, pr, found_branched_proj, scan_id)
+                    return
+
                 # Execute a scan for that project id
                 logger.info(f"Triggering a checkmarx scan for {pr.head.repo.name}@{pr.head.ref.replace('/', '_')}")
-                scan_details_resp = self.__execute_scan(checkmarx_client, pr, found_branched_proj, is_incremental)
-
-                # Timeout
-                if scan_details_resp == None:
-                    git_client.complete_check_run(check_run,
-                        "failure",
-                        {'title': "Checkmarx Scan", 
-                        'summary': "Timeout on Scan",
-                        'text': ""})
-                # Scan Failure
-                if scan_details_resp.status.name in ["Canceled", "Failed"]:
-                    git_client.complete_check_run(check_run,
-                        "failure",
-                        {'title': "Checkmarx Scan", 
-                        'summary': "Scan Failed",
-                        'text': scan_details_resp.partial_scan_reasons})
-                # Scan Finished
-                # Get scan stats
-                scan_stats = checkmarx_client.scans_client.get_statistics_results_by_scan_id(scan_details_resp.id)
-                scan_url = f"{checkmarx_client.api_url}/CxWebClient/ViewerMain.aspx?scanId={scan_details_resp.id}&ProjectID={found_branched_proj.project_id}"
-                logger.info(f"Scan results: {str(scan_stats)} for {pr.head.repo.name}@{pr.head.ref.replace('/', '_')}")
-                if scan_stats.high_severity >= self.__risk_scheme[RISK_SCHEME_MIN_HIGH_KEY] or scan_stats.medium_severity >= self.__risk_scheme[RISK_SCHEME_MIN_MEDIUM_KEY] or \
-                    scan_stats.low_severity >= self.__risk_scheme[RISK_SCHEME_MIN_LOW_KEY] or scan_stats.info_severity >= self.__risk_scheme[RISK_SCHEME_MIN_INFO_KEY]:
-                    # Threshold passed
-                    git_client.complete_check_run(check_run,
-                        "failure",
-                        {'title': "Checkmarx Scan", 
-                        'summary': f"Scan Finished, but threshold scan was passed",
-                        'text': f'```Scan Summary:\n' + \
-                                f'High Severity: {scan_stats.high_severity}\n' + \
-                                f'Medium Severity: {scan_stats.medium_severity}\n' + \
-                                f'Low Severity: {scan_stats.low_severity}\n' + \
-                                f'Info Severity: {scan_stats.info_severity}\n```\nPlease refer to the following url for more info:\n{scan_url}'})
-                else:
+                scan_resp = checkmarx_client.scans_client.create_new_scan(found_branched_proj.project_id, is_incremental=is_incremental, comment="Auto scan by github pull request webhook")
+                scan_details_resp = self.__wait_for_scan(checkmarx_client, git_client, check_run, pr, found_branched_proj, scan_resp)
+                complete_scan_check_run(checkmarx_client, git_client, check_run, scan_details_resp, found_branched_proj.project_id, self.__risk_scheme)
+            except CircuitOpenError as e:
+                # Checkmarx is down, which says nothing about the PR itself
+                if e.name != checkmarx_client.circuit_breaker.name:
+                    raise
+                if check_run:
                     git_client.complete_check_run(check_run,
-                        "success",
-                        {'title': "Checkmarx Scan", 
-                        'summary': f"Scan Finished and threshold scan was not passed",
-                        'text': f'```Scan Summary:\n' + \
-                                f'High Severity: {scan_stats.high_severity}\n' + \
-                                f'Medium Severity: {scan_stats.medium_severity}\n' + \
-                                f'Low Severity: {scan_stats.low_severity}\n' + \
-                                f'Info Severity: {scan_stats.info_severity}\n```\nPlease refer to the following url for more info:\n{scan_url}'})
+                        "neutral",
+                        {'title': "Checkmarx Scan",
+                        'summary': "Checkmarx is unavailable, the PR was not scanned",
+                        'text': str(e)})
             except Exception as e:
+                # The project index may be out of date (projects changed outside of the bots), so it is listed again next time
+                checkmarx_client.invalidate_projects_index()
                 if check_run:
                     git_client.complete_check_run(check_run,
                         "failure",
@@ -1,40 +1,267 @@
 import fnmatch
 import os
-import subprocess
+import re
 import tempfile
 import traceback
-import uuid
-from typing import Dict, List
+from contextlib import nullcontext
+from threading import Lock
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional, Set,
+                    Tuple)
 
-import git
+from github.File import File
 from github.PullRequest import PullRequest
 
 from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.clients.check_run_report import (ANNOTATION_FAILURE,
+                                                       ANNOTATION_NOTICE,
+                                                       ANNOTATION_WARNING,
+                                                       CheckRunReport)
 from octo_bots_python.clients.checkmarx_client import CheckmarxClient
 from octo_bots_python.clients.github_client import GithubAppClient
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import ToolRunner
+from octo_bots_python.common.tool_version import ToolVersion
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.lint_results_store import \
+    DEFAULT_MAX_SIZE_MB as DEFAULT_LINT_CACHE_MAX_SIZE_MB
+from octo_bots_python.stores.lint_results_store import LintResultsStore
+from octo_bots_python.workspaces.git_command import list_blob_shas
+from octo_bots_python.workspaces.git_source_provider import GitSourceProvider
+from octo_bots_python.workspaces.include_graph import (read_includes,
+                                                       transitive_includes,
+                                                       with_includers)
+from octo_bots_python.workspaces.source_provider import SourceProvider
+from octo_bots_python.workspaces.source_providers_loader import \
+    SourceProvidersLoader
+from octo_bots_python.workspaces.workspace_indexer import WorkspaceIndexer
 
 OPERATION_NAME = 'cppcheck-validator'
 
+SOURCE_KEY = 'source'
+LINT_CACHE_PATH_KEY = 'lint-cache-path'
+LINT_CACHE_MAX_SIZE_MB_KEY = 'lint-cache-max-size-mb'
+BUILD_DIR_PATH_KEY = 'build-dir-path'
+CPU_SHARE_KEY = 'cpu-share'
+SCOPE_KEY = 'scope'
 MANDATORY_KEYS = []
 
+SCOPE_FULL = 'full'
+SCOPE_CHANGED = 'changed'
+SCOPES = [SCOPE_FULL, SCOPE_CHANGED]
+
+DEFAULT_CPU_SHARE = 0.5
+
+DEFAULT_EXTENSIONS = 'c,h,C,H,cpp,hpp,cc,hh,c++,h++,cxx,hxx'
+
+# A single line per diagnostic, so the diagnostics can be split per file
+CPPCHECK_ARGS = ["--quiet", "--suppress=missingInclude", "--template={file}:{line}:{column}: {severity}: {message} [{id}]"]
+DIAGNOSTIC_PATTERN = re.compile(r'^(.+?):\d+:\d+: ')
+ANNOTATION_PATTERN = re.compile(r'^(.+?):(\d+):\d+: (\w+): (.*) \[(\w+)\]$')
+
+SEVERITY_ANNOTATION_LEVELS = {
+    'error': ANNOTATION_FAILURE,
+    'warning': ANNOTATION_WARNING,
+    'performance': ANNOTATION_WARNING,
+    'portability': ANNOTATION_WARNING
+}
+
+# Cached results hold the diagnostics naming a file (without its path), and whether they come from analyzing the file itself
+# or only from analyzing files including it
+LINT_CACHE_FORMAT = 3
+LINT_CACHE_DIAGNOSTICS_KEY = 'diagnostics'
+LINT_CACHE_ANALYZED_KEY = 'analyzed'
+
 logger = Logger("cppcheck_validator")
 
 
+def content_keys(files: Dict[str, str], source_files: Dict[str, str], includes: Dict[str, Set[str]]) -> Dict[str, str]:
+    # The blob sha of every file, combined with the blob shas of the headers it includes, as diagnostics depend on both
+    keys = {}
+    for path, sha in files.items():
+        headers = transitive_includes(includes, path)
+        keys[path] = LintResultsStore.config_hash(sha, sorted((header, source_files[header]) for header in headers)) if headers else sha
+    return keys
+
+
+def split_diagnostics(lines: Iterable[str], working_dir: str, paths: Iterable[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+    # Diagnostics per file (without the file path), and every line naming none of the files
+    diagnostics = {path: [] for path in paths}
+    other_lines = []
+    for line in lines:
+        match = DIAGNOSTIC_PATTERN.match(line)
+        path = os.path.relpath(match.group(1), working_dir) if match else None
+        if path in diagnostics:
+            diagnostics[path].append(line[len(match.group(1)):])
+        else:
+            other_lines.append(line)
+    return diagnostics, other_lines
+
+
+def run_cached_cppcheck(lint_cache: LintResultsStore, tool: str, working_dir: str, files: Dict[str, str], source_files: Dict[str, str],
+                        includes: Dict[str, Set[str]], run_cppcheck: Callable[[List[str]], Tuple[int, Iterable[str]]]) -> Tuple[int, Iterable[str]]:
+    # Only the files whose content (along with the headers they include) has no cached diagnostics are analyzed
+    # Diagnostics are cached under the content key of the file they name, so a header diagnostic found while analyzing
+    # an includer is emitted again only for the includers of that same header content
+    config_hash = LintResultsStore.config_hash(CPPCHECK_ARGS, LINT_CACHE_FORMAT)
+    headers = {path: transitive_includes(includes, path) for path in files.keys()}
+    named_files = set(files.keys()).union(*headers.values())
+    keys = content_keys({path: source_files[path] for path in named_files}, source_files, includes)
+    cached = lint_cache.get_results(tool, [(key, config_hash) for key in keys.values()])
+    results = {path: cached[(key, config_hash)] for path, key in keys.items() if (key, config_hash) in cached}
+    # A file is a cache hit once it was analyzed itself, and the diagnostics of every header it includes are still cached
+    unchecked_files = [path for path in files.keys() if not results.get(path, {}).get(LINT_CACHE_ANALYZED_KEY)
+                       or any(header not in results for header in headers[path])]
+    logger.info(f"Found {len(files) - len(unchecked_files)} cached results out of {len(files)} files")
+    other_lines = []
+    if len(unchecked_files) > 0:
+        returncode, lines = run_cppcheck(unchecked_files)
+        if returncode != 0:
+            return returncode, []
+        unchecked_named_files = set(unchecked_files).union(*(headers[path] for path in unchecked_files))
+        diagnostics, other_lines = split_diagnostics(lines, working_dir, unchecked_named_files)
+        # Diagnostics of the same content found by other runs are kept along, as each run only sees some of the includers
+        new_results = {path: {LINT_CACHE_ANALYZED_KEY: path in unchecked_files or results.get(path, {}).get(LINT_CACHE_ANALYZED_KEY, False),
+                              LINT_CACHE_DIAGNOSTICS_KEY: sorted(set(suffixes).union(results.get(path, {}).get(LINT_CACHE_DIAGNOSTICS_KEY, [])))}
+                       for path, suffixes in diagnostics.items()}
+        lint_cache.put_results(tool, {(keys[path], config_hash): result for path, result in new_results.items()})
+        results.update(new_results)
+    # Lines naming no source file (global information) are not cached, they are only reported by the run which found them
+    output = set(other_lines)
+    for path in files.keys():
+        for named_file in {path}.union(headers[path]):
+            output.update(os.path.join(working_dir, named_file) + suffix
+                          for suffix in results.get(named_file, {}).get(LINT_CACHE_DIAGNOSTICS_KEY, []))
+    return 0, sorted(output)
+
+
 class PullRequestCppCheckOperation(Operation):
-    def __init__(self):
-        pass
+    # Runs sharing a build dir are serialized, cppcheck does not support concurrent writers on it
+    __build_dir_locks: Dict[str, Lock] = {}
+    __build_dir_locks_lock = Lock()
+
+    def __init__(self, source_provider: Optional[SourceProvider] = None, lint_cache_path: Optional[str] = None,
+                 lint_cache_max_size_mb: int = DEFAULT_LINT_CACHE_MAX_SIZE_MB, build_dir_path: Optional[str] = None,
+                 cpu_share: float = DEFAULT_CPU_SHARE, scope: str = SCOPE_FULL):
+        if scope not in SCOPES:
+            raise Exception(f"Unknown cppcheck scope {scope}, expected one of {SCOPES}")
+        self.__source_provider = source_provider or GitSourceProvider()
+        self.__lint_cache_path = lint_cache_path
+        self.__lint_cache_max_size_mb = lint_cache_max_size_mb
+        self.__build_dir_path = build_dir_path
+        self.__cpu_share = cpu_share
+        self.__scope = scope
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
-        return PullRequestCppCheckOperation()
+        # Without a source config, the git checkout keys are read from the operation config itself
+        source_provider = SourceProvidersLoader.load_source_provider_from_config(config[SOURCE_KEY]) \
+            if SOURCE_KEY in config.keys() else GitSourceProvider.create_source_provider(config)
+        return PullRequestCppCheckOperation(source_provider,
+                                            config.get(LINT_CACHE_PATH_KEY),
+                                            config.get(LINT_CACHE_MAX_SIZE_MB_KEY, DEFAULT_LINT_CACHE_MAX_SIZE_MB),
+                                            config.get(BUILD_DIR_PATH_KEY),
+                                            config.get(CPU_SHARE_KEY, DEFAULT_CPU_SHARE),
+                                            config.get(SCOPE_KEY, SCOPE_FULL))
 
     @staticmethod
     def operation_type() -> str:
         return OPERATION_NAME
 
+    def __source_files(self, pr: PullRequest, working_dir: str) -> Dict[str, str]:
+        # Source files of the checkout (relative path to blob sha)
+        include_patterns = [f"*.{extension}" for extension in DEFAULT_EXTENSIONS.split(',')]
+        blob_shas = list_blob_shas(working_dir)
+        return {path: blob_shas[path] for path in WorkspaceIndexer.index_workspace(working_dir, pr.base.repo.full_name, pr.head.sha, include_patterns)
+                if path in blob_shas}
+
+    def __changed_files_with_includers(self, git_client: GithubAppClient, pr: PullRequest, includes: Dict[str, Set[str]]) -> List[str]:
+        changed_files = set(f.filename for f in git_client.paginate(File, f"{pr.url}/files")
+                            if f.status != 'removed' and f.filename in includes)
+        # Includers of changed headers are analyzed as well, transitively
+        files = with_includers(includes, changed_files)
+        logger.info(f"Analyzing {len(changed_files)} changed files and {len(files) - len(changed_files)} of their includers")
+        return sorted(files)
+
+    def __run_cppcheck(self, working_dir: str, output_dir: str, files: Optional[List[str]], build_dir: Optional[str]) -> Tuple[int, Iterable[str]]:
+        # Ran from the checkout with relative paths, so the build dir entries stay valid between checkouts
+        # The jobs are taken from the tool runner budget, so a big analysis does not starve the other bots
+        jobs = max(1, int(ToolRunner.cpu_slots() * self.__cpu_share))
+        args = ["cppcheck", f"--output-file={output_dir}/out.txt", f"-j{jobs}"] + CPPCHECK_ARGS
+        if build_dir:
+            args.append(f"--cppcheck-build-dir={build_dir}")
+        if files is None:
+            args.append(".")
+        else:
+            with open(f"{output_dir}/files.txt", "w") as f:
+                f.write("\n".join(files))
+            args.append(f"--file-list={output_dir}/files.txt")
+        proc = ToolRunner.run(args, cwd=working_dir, slots=jobs)
+        if proc.returncode != 0 or not os.path.exists(f"{output_dir}/out.txt"):
+            return proc.returncode or 1, []
+        return 0, self.__read_diagnostics(working_dir, f"{output_dir}/out.txt")
+
+    def __read_diagnostics(self, working_dir: str, output_path: str) -> Iterator[str]:
+        # Read lazily line by line, the output of a whole repo analysis is never loaded at once
+        with open(output_path, "r") as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if line.strip() == '':
+                    continue
+                match = DIAGNOSTIC_PATTERN.match(line)
+                if match:
+                    line = os.path.join(working_dir, os.path.normpath(match.group(1))) + line[len(match.group(1)):]
+                yield line
+
+    def __report_diagnostic(self, report: CheckRunReport, working_dir: str, line: str):
+        report.add_text(line.replace(working_dir, "") + "\n")
+        match = ANNOTATION_PATTERN.match(line)
+        if not match or not match.group(1).startswith(working_dir + os.sep):
+            return
+        path, line_number, severity, message, check_id = match.groups()
+        line_number = max(1, int(line_number))
+        report.add_annotation(os.path.relpath(path, working_dir), line_number, line_number,
+                              SEVERITY_ANNOTATION_LEVELS.get(severity, ANNOTATION_NOTICE), message, f"cppcheck {check_id}")
+
+    def __run_cached_cppcheck(self, working_dir: str, output_dir: str, files: Dict[str, str], source_files: Dict[str, str],
+                              includes: Dict[str, Set[str]], build_dir: Optional[str]) -> Tuple[int, Iterable[str]]:
+        lint_cache: LintResultsStore = LintResultsStore.get_store(self.__lint_cache_path)
+        tool = f"cppcheck {ToolVersion.get_version('cppcheck')}"
+        result = run_cached_cppcheck(lint_cache, tool, working_dir, files, source_files, includes,
+                                     lambda unchecked_files: self.__run_cppcheck(working_dir, output_dir, unchecked_files, build_dir))
+        lint_cache.evict(self.__lint_cache_max_size_mb)
+        return result
+
+    def __analyze(self, git_client: GithubAppClient, pr: PullRequest, working_dir: str, output_dir: str, report: CheckRunReport) -> Tuple[int, Iterable[str]]:
+        files = None
+        if self.__scope == SCOPE_CHANGED or self.__lint_cache_path:
+            source_files = self.__source_files(pr, working_dir)
+            includes = read_includes(working_dir, list(source_files.keys()))
+            files = source_files
+            if self.__scope == SCOPE_CHANGED:
+                changed_files = self.__changed_files_with_includers(git_client, pr, includes)
+                files = {path: source_files[path] for path in changed_files}
+        if files is not None and len(files) == 0:
+            # cppcheck fails on an empty file list, and there is nothing to analyze anyway
+            logger.info("No source files to analyze")
+            return 0, []
+        report.report_progress(f"Analyzing {len(files)} files" if files is not None else "Analyzing the repo")
+        build_dir = None
+        build_dir_lock = nullcontext()
+        if self.__build_dir_path:
+            # A build dir per repo, cppcheck skips the translation units which did not change since the last analysis
+            build_dir = os.path.join(self.__build_dir_path, pr.base.repo.full_name.replace('/', '_'))
+            os.makedirs(build_dir, exist_ok=True)
+            with PullRequestCppCheckOperation.__build_dir_locks_lock:
+                build_dir_lock = PullRequestCppCheckOperation.__build_dir_locks.setdefault(build_dir, Lock())
+        with build_dir_lock:
+            if self.__lint_cache_path:
+                return self.__run_cached_cppcheck(working_dir, output_dir, files, source_files, includes, build_dir)
+            return self.__run_cppcheck(working_dir, output_dir, list(files.keys()) if files is not None else None, build_dir)
+
+    def check_run_names(self, event: dict) -> List[str]:
+        return ["cppcheck"] if 'pull_request' in event.keys() else []
+
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
@@ -50,36 +277,25 @@ class PullRequestCppCheckOperation(Operation):
             try:
                 check_run = git_client.create_check_run("cppcheck", pr)
 
-                working_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
-                os.makedirs(working_dir)
-                git.Repo.clone_from(url=pr.head.repo.clone_url, branch=pr.head.ref, to_path=working_dir)
-
-                p = subprocess.Popen(f"cppcheck --quiet --output-file={working_dir}/out.txt --suppress=missingInclude {working_dir}".split(), stdout=subprocess.PIPE)
-                p.communicate()
+                # The checkout may be shared with other operations, so the report is written outside of it
+                with self.__source_provider.checkout(git_client, pr, DEFAULT_EXTENSIONS.split(','), []) as working_dir, tempfile.TemporaryDirectory() as output_dir:
+                    # Diagnostics are streamed into the report, which keeps to the check run size limits
+                    report = CheckRunReport(git_client, check_run, "CppCheck", "```\n", "```\n")
+                    returncode, lines = self.__analyze(git_client, pr, working_dir, output_dir, report)
 
-                if p.returncode == 0 and os.path.exists(f"{working_dir}/out.txt"):
-                    f = open(f"{working_dir}/out.txt", "r")
-                    data = f.read().strip().replace(working_dir, "")
-                    if len(data) > 0:
-                        if len(data) > 65000:
-                            data = "Too many cppcheck errors occured, please run cppcheck manually and investigate"
-                        git_client.complete_check_run(check_run,
-                            "failure",
-                            {'title': "CppCheck", 
-                            'summary': "CppCheck Errors found",
-                            'text': "```\n" + data})
+                    if returncode == 0:
+                        for line in lines:
+                            self.__report_diagnostic(report, working_dir, line)
+                        if not report.is_empty:
+                            report.complete("failure", "CppCheck Errors found")
+                        else:
+                            report.complete("success", "No errors found")
                     else:
                         git_client.complete_check_run(check_run,
-                            "success",
+                            "failure",
                             {'title': "CppCheck", 
-                            'summary': "No errors found",
+                            'summary': "CppCheck Internal Error Occured",
                             'text': ""})
-                else:
-                    git_client.complete_check_run(check_run,
-                        "failure",
-                        {'title': "CppCheck", 
-                        'summary': "CppCheck Internal Error Occured",
-                        'text': ""})
             except Exception as e:
                 if check_run:
                     git_client.complete_check_run(check_run,
@@ -11,6 +11,8 @@ from octo_bots_python.clients.github_client import GithubAppClient
 from octo_bots_python.common.logger import Logger
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.workspaces.workspace_indexer import (GlobMatcher,
+                                                           WorkspaceIndexer)
 
 OPERATION_NAME = 'pull-request-forbidden-files'
 
@@ -25,6 +27,7 @@ class PullRequestForbiddenFilesOperation(Operation):
     def __init__(self, forbidden_files: List[str], target_pr_branches: List[str]):
         self.__forbidden_files = forbidden_files
         self.__target_pr_branches = target_pr_branches
+        self.__forbidden_files_matcher = GlobMatcher(forbidden_files, match_separator=False)
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
@@ -36,6 +39,32 @@ class PullRequestForbiddenFilesOperation(Operation):
     def operation_type() -> str:
         return OPERATION_NAME
 
+    def __find_in_dir_contents(self, pr: PullRequest) -> List[str]:
+        found_files = []
+        for file_path in self.__forbidden_files:
+            file_name = os.path.basename(file_path)
+            files = pr.head.repo.get_dir_contents(os.path.dirname(file_path), ref=pr.head.ref)
+            if any(fnmatch.fnmatch(f.name, file_name) for f in files):
+                found_files.append(file_path)
+        return found_files
+
+    def __find_forbidden_files(self, git_client: GithubAppClient, pr: PullRequest) -> List[str]:
+        # A single tree listing of the head commit (cached per sha) instead of a contents request per forbidden file
+        # Directories are listed as well, as forbidden files may be directories (build, node_modules)
+        paths = WorkspaceIndexer.index_tree(git_client, pr.head.repo.url, pr.head.sha, include_dirs=True)
+        if paths is None:
+            return self.__find_in_dir_contents(pr)
+        # Only the few paths matching any forbidden file are matched again per forbidden file
+        matched_paths = [path for path in paths if self.__forbidden_files_matcher.matches(path)]
+        return [file_path for file_path in self.__forbidden_files
+                if any(GlobMatcher([file_path], match_separator=False).matches(path) for path in matched_paths)]
+
+    def check_run_names(self, event: dict) -> List[str]:
+        if 'pull_request' not in event.keys():
+            return []
+        base_ref = event['pull_request']['base']['ref']
+        return ["forbidden-files"] if any(fnmatch.fnmatch(base_ref, branch) for branch in self.__target_pr_branches) else []
+
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
@@ -49,14 +78,9 @@ class PullRequestForbiddenFilesOperation(Operation):
                 try:
                     check_run = git_client.create_check_run("forbidden-files", pr)
                     # Check if any of the files are in the pull request
-                    found_files = []
-                    for file_path in self.__forbidden_files:
-                        file_name = os.path.basename(file_path)
-                        files = pr.head.repo.get_dir_contents(os.path.dirname(file_path), ref=pr.head.ref)
-                        found = any(fnmatch.fnmatch(f.name, file_name) for f in files)
-                        if found:
-                            logger.info(f"File [{file_path}] found in head branch [{pr.head.name}]")
-                            found_files.append(file_path)
+                    found_files = self.__find_forbidden_files(git_client, pr)
+                    for file_path in found_files:
+                        logger.info(f"File [{file_path}] found in head branch [{pr.head.ref}]")
                     if len(found_files) > 0:
                         git_client.complete_check_run(check_run,
                             "failure",
@@ -3,6 +3,7 @@ import os
 import traceback
 from typing import Dict, List
 
+from github.Branch import Branch
 from github.PullRequest import PullRequest
 
 from octo_bots_python.bots_client import BotsBaseClient
@@ -48,7 +49,7 @@ class PullRequestHeadBranchDeletionOperation(Operation):
                 # Perform deletion
                 logger.info(f"Trying to delete branch {pr.head.ref}")
                 pr.update()
-                if any(branch.name == pr.head.ref for branch in pr.head.repo.get_branches()):
+                if any(branch.name == pr.head.ref for branch in git_client.paginate(Branch, f"{pr.head.repo.url}/branches")):
                     pr.head.repo.get_git_ref(f'heads/{pr.head.ref}').delete()
 
 
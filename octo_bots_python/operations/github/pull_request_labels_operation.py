@@ -1,12 +1,11 @@
+import asyncio
 import fnmatch
 from typing import Dict, List
 
-from github.Label import Label
-from github.PullRequest import PullRequest
-
 from octo_bots_python.bots_client import BotsBaseClient
 from octo_bots_python.clients.github_client import GithubAppClient
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.async_operation import AsyncOperation
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
 
@@ -33,13 +32,13 @@ WIP_LABEL = ('wip', "eac424")
 logger = Logger("pull_request_labels_operation")
 
 
-class PullRequestLabelsOperation(Operation):
+class PullRequestLabelsOperation(AsyncOperation):
     def __init__(self, scheme: str):
         if scheme not in ALLOWED_SCHEMES:
             raise Exception("Given scheme is invalid for pull request tags operation")
         self.__scheme = scheme
 
-    def __create_labels_list(self, head: str, base: str, existing_labels: List[Label]) -> List[str]:
+    def __create_labels_list(self, head: str, base: str, existing_labels: List[dict]) -> Dict[str, str]:
         labels = []
         if self.__scheme == BRANCHES_SCHEME:
             labels = [DEVPIPELINE_LABEL]
@@ -67,8 +66,8 @@ class PullRequestLabelsOperation(Operation):
         # Combine the labels with the existing ones
         labels = dict(labels)
         for label in existing_labels:
-            if label.name not in labels.keys():
-                labels[label.name] = label.color
+            if label['name'] not in labels.keys():
+                labels[label['name']] = label['color']
         return labels
 
     @staticmethod
@@ -81,23 +80,22 @@ class PullRequestLabelsOperation(Operation):
     def operation_type() -> str:
         return OPERATION_NAME
 
-    def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+    async def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
                 raise Exception("Client github does not exist")
             git_client: GithubAppClient = clients[GithubAppClient.client_type()]
-            # Create the PR object
-            pr = PullRequest(git_client.rest_impl, headers, event['pull_request'], True)
-            pr.update()
-            
+            async_client = git_client.async_impl
+            # Refresh the PR object
+            pr = await async_client.get_pull_request(event['pull_request']['url'])
+
             # Create the label list based on the branches of the PR
-            labels = self.__create_labels_list(pr.head.ref.lower(), pr.base.ref.lower(), pr.labels)
-            logger.info(f"Setting labels [{labels}] for PR [{pr.title}] [Head={pr.head.ref}, Base={pr.base.ref}]")
-            pr.set_labels(*list(labels.keys()))
+            labels = self.__create_labels_list(pr['head']['ref'].lower(), pr['base']['ref'].lower(), pr['labels'])
+            logger.info(f"Setting labels [{labels}] for PR [{pr['title']}] [Head={pr['head']['ref']}, Base={pr['base']['ref']}]")
+            pr_labels = await async_client.set_issue_labels(pr['issue_url'], list(labels.keys()))
             logger.info(f"Adding label colors")
-            pr.update()
-            for label in pr.labels:
-                label.edit(label.name, labels[label.name])
+            await asyncio.gather(*[async_client.edit_label(pr['base']['repo']['url'], label['name'], labels.get(label['name'], label['color']))
+                                   for label in pr_labels])
 
 
 OperationsLoader.register_operation(PullRequestLabelsOperation)
@@ -3,6 +3,7 @@ import os
 import traceback
 from typing import Dict, List
 
+from github.Branch import Branch
 from github.Repository import Repository
 
 from octo_bots_python.bots_client import BotsBaseClient
@@ -41,7 +42,7 @@ class PullRequestReleaseBranchCreationOperation(Operation):
             # Create the repo object
             repo = Repository(git_client.rest_impl, headers, event['repository'], True)
             base_branch = 'master'
-            if any(branch.name == 'staging' for branch in repo.get_branches()):
+            if any(branch.name == 'staging' for branch in git_client.paginate(Branch, f"{repo.url}/branches")):
                 base_branch = 'staging'
             # Check if branch name fits any patterns
             if any(fnmatch.fnmatch(event['ref'], pat) for pat in self.__release_patterns):
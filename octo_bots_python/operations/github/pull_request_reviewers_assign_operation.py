@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from github.Label import Label
 from github.PullRequest import PullRequest
@@ -6,12 +6,17 @@ from github.PullRequest import PullRequest
 from octo_bots_python.bots_client import BotsBaseClient
 from octo_bots_python.clients.github_client import GithubAppClient
 from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.github.contributors_ranking_refresh_operation import (
+    DEFAULT_RANKING_SIZE, list_ranked_contributors)
 from octo_bots_python.operations.operation import Operation
 from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.contributors_ranking_store import \
+    ContributorsRankingStore
 
 OPERATION_NAME = 'pull-request-reviewers-assign'
 
 SCHEME_KEY = 'scheme'
+RANKING_PATH_KEY = 'ranking-path'
 MANDATORY_KEYS = [SCHEME_KEY]
 
 TOP_CONTRIBUTERS_SCHEME = 'top-contributers'
@@ -25,21 +30,38 @@ logger = Logger("pull_request_reviewers_assign")
 
 
 class PullRequestRevieersAssignOperation(Operation):
-    def __init__(self, scheme: dict):
+    def __init__(self, scheme: dict, ranking_path: Optional[str] = None):
         if SCHEME_NAME_KEY not in scheme.keys() or scheme[SCHEME_NAME_KEY] not in ALLOWED_SCHEMES:
             raise Exception("Given scheme is invalid for pull request reviewers assign operation")
         self.__scheme = scheme
+        self.__ranking_path = ranking_path
 
     @staticmethod
     def create_operation(config: dict) -> Operation:
         if any(key not in config.keys() for key in MANDATORY_KEYS):
             raise Exception("Missing mandatory keys for pull request reviewers assign operation")
-        return PullRequestRevieersAssignOperation(config[SCHEME_KEY])
+        return PullRequestRevieersAssignOperation(config[SCHEME_KEY], config.get(RANKING_PATH_KEY))
 
     @staticmethod
     def operation_type() -> str:
         return OPERATION_NAME
 
+    def __top_contributors(self, git_client: GithubAppClient, pr: PullRequest, top_contrib: int) -> List[str]:
+        if not self.__ranking_path:
+            return [login for login, _ in list_ranked_contributors(git_client, pr.base.repo.url, top_contrib)]
+        # Ranked in the background by the contributors ranking refresh operation, listed here only while the repo was never ranked,
+        # or was ranked with less contributors than needed (a ranking-size smaller than top), in which case it is ranked again here
+        ranking: ContributorsRankingStore = ContributorsRankingStore.get_store(self.__ranking_path)
+        ranked_contributors = ranking.get_ranking(pr.base.repo.full_name, top_contrib)
+        if ranked_contributors is not None:
+            return ranked_contributors
+        logger.info(f"No contributors ranking of top [{top_contrib}] for repo [{pr.base.repo.full_name}], listing its contributors")
+        ranking_size = max(top_contrib, DEFAULT_RANKING_SIZE)
+        contributors = list_ranked_contributors(git_client, pr.base.repo.url, ranking_size)
+        if contributors:
+            ranking.set_ranking(pr.base.repo.full_name, contributors, ranking_size)
+        return [login for login, _ in contributors[:top_contrib]]
+
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         if 'pull_request' in event.keys():
             if GithubAppClient.client_type() not in clients.keys():
@@ -53,7 +75,7 @@ class PullRequestRevieersAssignOperation(Operation):
                 top_contrib = TOP_CONTRI_TOP_DEFAULT_VAL
                 if TOP_CONTRI_TOP_KEY in self.__scheme.keys():
                     top_contrib = self.__scheme[TOP_CONTRI_TOP_KEY]
-                contributers = [cont.login for cont in pr.base.repo.get_contributors()[:top_contrib] if cont.login != pr.user.login]
+                contributers = [cont for cont in self.__top_contributors(git_client, pr, top_contrib) if cont != pr.user.login]
                 existing_review_reqs = pr.get_review_requests()
                 contributers_to_add = []
                 for cont in contributers:
@@ -0,0 +1,57 @@
+from typing import Dict
+
+from octo_bots_python.bots_client import BotsBaseClient
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.operations.operation import Operation
+from octo_bots_python.operations.operations_loader import OperationsLoader
+from octo_bots_python.stores.stale_items_store import StaleItemsStore
+
+OPERATION_NAME = 'stale-index-update'
+
+INDEX_PATH_KEY = 'index-path'
+MANDATORY_KEYS = [INDEX_PATH_KEY]
+
+logger = Logger("stale_index_update_operation")
+
+
+class StaleIndexUpdateOperation(Operation):
+    def __init__(self, index_path: str):
+        self.__index_path = index_path
+
+    @staticmethod
+    def create_operation(config: dict) -> Operation:
+        if any(key not in config.keys() for key in MANDATORY_KEYS):
+            raise Exception("Missing mandatory keys for stale index update operation")
+        return StaleIndexUpdateOperation(config[INDEX_PATH_KEY])
+
+    @staticmethod
+    def operation_type() -> str:
+        return OPERATION_NAME
+
+    def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
+        # Handles issues, issue_comment, pull_request and pull_request_review_comment webhooks
+        if 'repository' not in event.keys():
+            return
+        if 'issue' in event.keys():
+            item = event['issue']
+            is_pull_request = 'pull_request' in item.keys()
+        elif 'pull_request' in event.keys():
+            item = event['pull_request']
+            is_pull_request = True
+        else:
+            return
+        index: StaleItemsStore = StaleItemsStore.get_store(self.__index_path)
+        repo_full_name = event['repository']['full_name']
+        if item['state'] != 'open' or (event.get('action') in ['deleted', 'transferred'] and 'comment' not in event.keys()):
+            logger.debug(f"Removing {repo_full_name}#{item['number']} from stale index")
+            index.remove_item(repo_full_name, item['number'])
+            return
+        updated_at = StaleItemsStore.to_timestamp(item['updated_at'])
+        if 'comment' in event.keys() and event['comment'].get('updated_at'):
+            updated_at = max(updated_at, StaleItemsStore.to_timestamp(event['comment']['updated_at']))
+        logger.debug(f"Updating {repo_full_name}#{item['number']} in stale index")
+        index.upsert_item(repo_full_name, item['number'], is_pull_request, item['title'], updated_at,
+                          [label['name'] for label in item.get('labels', [])])
+
+
+OperationsLoader.register_operation(StaleIndexUpdateOperation)
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Dict
+from typing import Dict, List
 
 from octo_bots_python.bots_client import BotsBaseClient
 
@@ -21,3 +21,7 @@ class Operation:
     @abstractmethod
     def execute_operation(self, clients: Dict[str, BotsBaseClient], headers: dict, event: dict):
         pass
+
+    def check_run_names(self, event: dict) -> List[str]:
+        # Names of the check runs the operation will create for the event, which are queued as soon as the event is accepted
+        return []
@@ -0,0 +1,28 @@
+import datetime
+from typing import Optional
+
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+# Only the last run is kept, the next one is derived from it and the job schedule so a changed schedule applies right away
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS background_jobs_state (
+        job_name TEXT PRIMARY KEY,
+        last_run TEXT
+    )"""
+]
+
+
+class BackgroundJobsStateStore(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path, SCHEMA)
+
+    def load_last_run(self, job_name: str) -> Optional[datetime.datetime]:
+        rows = self.execute("SELECT last_run FROM background_jobs_state WHERE job_name = ?", (job_name,))
+        if len(rows) == 0 or not rows[0]['last_run']:
+            return None
+        return datetime.datetime.fromisoformat(rows[0]['last_run'])
+
+    def save_last_run(self, job_name: str, last_run: datetime.datetime):
+        self.execute("INSERT INTO background_jobs_state (job_name, last_run) VALUES (?, ?) "
+                     "ON CONFLICT(job_name) DO UPDATE SET last_run = excluded.last_run",
+                     (job_name, last_run.isoformat()))
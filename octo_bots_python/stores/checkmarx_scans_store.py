@@ -0,0 +1,88 @@
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS checkmarx_scans (
+        scan_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL,
+        project_name TEXT NOT NULL,
+        head_sha TEXT NOT NULL,
+        check_run_url TEXT NOT NULL,
+        risk_scheme TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        timeout_at REAL NOT NULL,
+        PRIMARY KEY (scan_id, check_run_url)
+    )""",
+    """CREATE TABLE IF NOT EXISTS checkmarx_project_scans (
+        project_id INTEGER NOT NULL,
+        head_sha TEXT NOT NULL,
+        scan_id INTEGER NOT NULL,
+        finished INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (project_id, head_sha)
+    )""",
+    "CREATE INDEX IF NOT EXISTS checkmarx_project_scans_scan_id ON checkmarx_project_scans (scan_id)"
+]
+
+
+class PendingScan:
+    def __init__(self, scan_id: int, project_id: int, project_name: str, head_sha: str, check_run_url: str,
+                 risk_scheme: Dict[str, int], started_at: float, timeout_at: float):
+        self.scan_id = scan_id
+        self.project_id = project_id
+        self.project_name = project_name
+        self.head_sha = head_sha
+        self.check_run_url = check_run_url
+        self.risk_scheme = risk_scheme
+        self.started_at = started_at
+        self.timeout_at = timeout_at
+
+
+class CheckmarxScansStore(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path, SCHEMA)
+
+    def add_scan(self, scan: PendingScan):
+        # A scan may be pending for several check runs, when events of the same commit attach to it
+        self.execute("INSERT OR REPLACE INTO checkmarx_scans (scan_id, project_id, project_name, head_sha, check_run_url, risk_scheme, started_at, timeout_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (scan.scan_id, scan.project_id, scan.project_name, scan.head_sha, scan.check_run_url,
+                      json.dumps(scan.risk_scheme), scan.started_at, scan.timeout_at))
+
+    def remove_scan(self, scan_id: int, check_run_url: str):
+        self.execute("DELETE FROM checkmarx_scans WHERE scan_id = ? AND check_run_url = ?", (scan_id, check_run_url))
+
+    def pending_scans(self) -> List[PendingScan]:
+        rows = self.execute("SELECT * FROM checkmarx_scans ORDER BY started_at")
+        return [PendingScan(row['scan_id'], row['project_id'], row['project_name'], row['head_sha'], row['check_run_url'],
+                            json.loads(row['risk_scheme']), row['started_at'], row['timeout_at']) for row in rows]
+
+    def find_project_scan(self, project_id: int, head_sha: str) -> Optional[Tuple[int, bool]]:
+        # The scan (and whether it finished) of a commit of a project, if it was already scanned or is being scanned
+        rows = self.execute("SELECT scan_id, finished FROM checkmarx_project_scans WHERE project_id = ? AND head_sha = ?", (project_id, head_sha))
+        return (rows[0]['scan_id'], bool(rows[0]['finished'])) if len(rows) > 0 else None
+
+    def add_project_scan(self, project_id: int, head_sha: str, scan_id: int, created_at: float):
+        self.execute("INSERT OR REPLACE INTO checkmarx_project_scans (project_id, head_sha, scan_id, finished, created_at) VALUES (?, ?, ?, 0, ?)",
+                     (project_id, head_sha, scan_id, created_at))
+
+    def unfinished_project_scans(self, project_id: int, excluded_head_sha: str) -> List[int]:
+        rows = self.execute("SELECT scan_id FROM checkmarx_project_scans WHERE project_id = ? AND head_sha != ? AND finished = 0",
+                            (project_id, excluded_head_sha))
+        return [row['scan_id'] for row in rows]
+
+    def set_project_scan_finished(self, scan_id: int):
+        self.execute("UPDATE checkmarx_project_scans SET finished = 1 WHERE scan_id = ?", (scan_id,))
+
+    def remove_project_scan(self, scan_id: int):
+        self.execute("DELETE FROM checkmarx_project_scans WHERE scan_id = ?", (scan_id,))
+
+    def scanning_project_ids(self) -> Set[int]:
+        # Projects with a scan which is still tracked or not finished yet
+        rows = self.execute("SELECT project_id FROM checkmarx_scans UNION SELECT project_id FROM checkmarx_project_scans WHERE finished = 0")
+        return {row['project_id'] for row in rows}
+
+    def prune_project_scans(self, created_before: float):
+        self.execute("DELETE FROM checkmarx_project_scans WHERE finished = 1 AND created_at < ?", (created_before,))
@@ -0,0 +1,53 @@
+import time
+from typing import List, Optional, Tuple
+
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS contributors_rankings (
+        repo_full_name TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        login TEXT NOT NULL,
+        contributions INTEGER NOT NULL,
+        PRIMARY KEY (repo_full_name, rank)
+    )""",
+    """CREATE TABLE IF NOT EXISTS contributors_rankings_repos (
+        repo_full_name TEXT PRIMARY KEY,
+        ranking_size INTEGER NOT NULL,
+        refreshed_at REAL NOT NULL
+    )"""
+]
+
+
+class ContributorsRankingStore(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path, SCHEMA)
+
+    def set_ranking(self, repo_full_name: str, contributors: List[Tuple[str, int]], ranking_size: int):
+        # Contributors (login and contributions) ordered by rank, replaced in one transaction so lookups never see half a ranking
+        # The ranking size is the amount of contributors listed, a repo may have less of them
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM contributors_rankings WHERE repo_full_name = ?", (repo_full_name,))
+            connection.executemany("INSERT INTO contributors_rankings (repo_full_name, rank, login, contributions) VALUES (?, ?, ?, ?)",
+                                   [(repo_full_name, rank, login, contributions) for rank, (login, contributions) in enumerate(contributors)])
+            connection.execute("INSERT OR REPLACE INTO contributors_rankings_repos (repo_full_name, ranking_size, refreshed_at) VALUES (?, ?, ?)",
+                               (repo_full_name, ranking_size, time.time()))
+
+    def get_ranking(self, repo_full_name: str, top: int) -> Optional[List[str]]:
+        # Logins of the top contributors, or None when the repo was never ranked or was ranked with less than top contributors
+        with self.transaction() as connection:
+            row = connection.execute("SELECT ranking_size FROM contributors_rankings_repos WHERE repo_full_name = ?", (repo_full_name,)).fetchone()
+            if row is None or row['ranking_size'] < top:
+                return None
+            rows = connection.execute("SELECT login FROM contributors_rankings WHERE repo_full_name = ? ORDER BY rank LIMIT ?",
+                                      (repo_full_name, top)).fetchall()
+            return [row['login'] for row in rows]
+
+    def remove_repos_not_in(self, repo_full_names: List[str]):
+        existing_repos = set(repo_full_names)
+        with self.transaction() as connection:
+            ranked_repos = [row['repo_full_name'] for row in connection.execute("SELECT repo_full_name FROM contributors_rankings_repos").fetchall()]
+            for repo_full_name in ranked_repos:
+                if repo_full_name not in existing_repos:
+                    connection.execute("DELETE FROM contributors_rankings WHERE repo_full_name = ?", (repo_full_name,))
+                    connection.execute("DELETE FROM contributors_rankings_repos WHERE repo_full_name = ?", (repo_full_name,))
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+DEFAULT_MAX_SIZE_MB = 512
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS lint_results (
+        blob_sha TEXT NOT NULL,
+        tool TEXT NOT NULL,
+        config_hash TEXT NOT NULL,
+        result TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (blob_sha, tool, config_hash)
+    )""",
+    "CREATE INDEX IF NOT EXISTS lint_results_last_used ON lint_results (last_used)"
+]
+
+# Sqlite limits the amount of variables in a single statement
+QUERY_BATCH_SIZE = 400
+
+
+class LintResultsStore(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path, SCHEMA)
+
+    @staticmethod
+    def config_hash(*parts: Any) -> str:
+        # Anything that changes the tool results for the same file content (style files, arguments, line ranges)
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get_results(self, tool: str, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        # Keys are (blob sha, config hash), results found are marked as used for the LRU eviction
+        keys = list(set(keys))
+        results = {}
+        now = time.time()
+        with self.transaction() as connection:
+            for i in range(0, len(keys), QUERY_BATCH_SIZE):
+                batch = keys[i:i + QUERY_BATCH_SIZE]
+                condition = " OR ".join(["(blob_sha = ? AND config_hash = ?)"] * len(batch))
+                parameters = [value for key in batch for value in key]
+                rows = connection.execute(f"SELECT blob_sha, config_hash, result FROM lint_results WHERE tool = ? AND ({condition})",
+                                          [tool] + parameters).fetchall()
+                for row in rows:
+                    results[(row['blob_sha'], row['config_hash'])] = json.loads(row['result'])
+                connection.executemany("UPDATE lint_results SET last_used = ? WHERE blob_sha = ? AND tool = ? AND config_hash = ?",
+                                       [(now, row['blob_sha'], tool, row['config_hash']) for row in rows])
+        return results
+
+    def put_results(self, tool: str, results: Dict[Tuple[str, str], Any]):
+        now = time.time()
+        rows = []
+        for (blob_sha, config_hash), result in results.items():
+            serialized = json.dumps(result)
+            rows.append((blob_sha, tool, config_hash, serialized, len(serialized), now))
+        with self.transaction() as connection:
+            connection.executemany("INSERT OR REPLACE INTO lint_results (blob_sha, tool, config_hash, result, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                                   rows)
+
+    def evict(self, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        # Least recently used results are dropped until the stored results fit the size bound
+        max_size = max_size_mb * 1024 * 1024
+        with self.transaction() as connection:
+            total_size = connection.execute("SELECT COALESCE(SUM(size), 0) AS total FROM lint_results").fetchone()['total']
+            if total_size <= max_size:
+                return
+            evicted: List[Tuple[str, str, str]] = []
+            for row in connection.execute("SELECT blob_sha, tool, config_hash, size FROM lint_results ORDER BY last_used"):
+                if total_size <= max_size:
+                    break
+                evicted.append((row['blob_sha'], row['tool'], row['config_hash']))
+                total_size -= row['size']
+            connection.executemany("DELETE FROM lint_results WHERE blob_sha = ? AND tool = ? AND config_hash = ?", evicted)
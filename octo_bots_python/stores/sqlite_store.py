@@ -0,0 +1,57 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Iterator, List, Sequence
+
+from octo_bots_python.common.logger import Logger
+
+# WAL lets readers run along a writer, but relies on shared memory so the file must stay on a single host
+DEFAULT_JOURNAL_MODE = 'WAL'
+
+logger = Logger("sqlite_store")
+
+
+class SqliteStore:
+    # Stores are shared per path, so operations using the same store share its connection and lock
+    __stores = {}
+    __stores_lock = Lock()
+
+    def __init__(self, path: str, schema: List[str], journal_mode: str = DEFAULT_JOURNAL_MODE):
+        self.__path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+        self.__lock = Lock()
+        # A single connection is shared between the bots threads, guarded by the store lock
+        self.__connection = sqlite3.connect(self.__path, timeout=30, check_same_thread=False)
+        self.__connection.row_factory = sqlite3.Row
+        with self.transaction() as connection:
+            connection.execute(f"PRAGMA journal_mode={journal_mode}")
+            for statement in schema:
+                connection.execute(statement)
+        logger.debug(f"Opened sqlite store [{self.__path}]")
+
+    @classmethod
+    def get_store(cls, path: str) -> "SqliteStore":
+        key = (cls, os.path.abspath(path))
+        with SqliteStore.__stores_lock:
+            if key not in SqliteStore.__stores:
+                SqliteStore.__stores[key] = cls(path)
+            return SqliteStore.__stores[key]
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.__lock:
+            with self.__connection:
+                yield self.__connection
+
+    def execute(self, query: str, parameters: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        with self.transaction() as connection:
+            return connection.execute(query, parameters).fetchall()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,99 @@
+import calendar
+import datetime
+import json
+import time
+from typing import List, Optional
+
+from octo_bots_python.stores.sqlite_store import SqliteStore
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS stale_items (
+        repo_full_name TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        is_pull_request INTEGER NOT NULL,
+        title TEXT,
+        updated_at REAL NOT NULL,
+        labels TEXT NOT NULL,
+        PRIMARY KEY (repo_full_name, number)
+    )""",
+    "CREATE INDEX IF NOT EXISTS stale_items_updated_at ON stale_items (updated_at)",
+    """CREATE TABLE IF NOT EXISTS stale_items_repos (
+        repo_full_name TEXT PRIMARY KEY,
+        repo_url TEXT NOT NULL,
+        synced_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS stale_items_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )"""
+]
+
+FULL_SYNC_META_KEY = 'full-sync'
+
+
+class StaleItem:
+    def __init__(self, repo_full_name: str, repo_url: str, number: int, is_pull_request: bool, title: str,
+                 updated_at: float, labels: List[str]):
+        self.repo_full_name = repo_full_name
+        self.repo_url = repo_url
+        self.number = number
+        self.is_pull_request = is_pull_request
+        self.title = title
+        self.updated_at = updated_at
+        self.labels = labels
+
+
+class StaleItemsStore(SqliteStore):
+    def __init__(self, path: str):
+        super().__init__(path, SCHEMA)
+
+    @staticmethod
+    def to_timestamp(stamp) -> float:
+        # Github sends ISO strings on webhooks, and PyGithub returns naive UTC datetimes
+        if isinstance(stamp, str):
+            stamp = datetime.datetime.strptime(stamp, "%Y-%m-%dT%H:%M:%SZ")
+        if stamp.tzinfo is None:
+            return calendar.timegm(stamp.utctimetuple())
+        return stamp.timestamp()
+
+    def upsert_item(self, repo_full_name: str, number: int, is_pull_request: bool, title: str, updated_at: float, labels: List[str]):
+        self.execute("INSERT INTO stale_items (repo_full_name, number, is_pull_request, title, updated_at, labels) VALUES (?, ?, ?, ?, ?, ?) "
+                     "ON CONFLICT(repo_full_name, number) DO UPDATE SET is_pull_request = excluded.is_pull_request, title = excluded.title, "
+                     "updated_at = MAX(stale_items.updated_at, excluded.updated_at), labels = excluded.labels",
+                     (repo_full_name, number, int(is_pull_request), title, updated_at, json.dumps(labels)))
+
+    def remove_item(self, repo_full_name: str, number: int):
+        self.execute("DELETE FROM stale_items WHERE repo_full_name = ? AND number = ?", (repo_full_name, number))
+
+    def replace_repo_items(self, repo_full_name: str, repo_url: str, items: List[StaleItem]):
+        # Full reconciliation of a single repo, done in one transaction so queries never see a half synced repo
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM stale_items WHERE repo_full_name = ?", (repo_full_name,))
+            connection.executemany("INSERT OR REPLACE INTO stale_items (repo_full_name, number, is_pull_request, title, updated_at, labels) VALUES (?, ?, ?, ?, ?, ?)",
+                                   [(repo_full_name, item.number, int(item.is_pull_request), item.title, item.updated_at, json.dumps(item.labels))
+                                    for item in items])
+            connection.execute("INSERT OR REPLACE INTO stale_items_repos (repo_full_name, repo_url, synced_at) VALUES (?, ?, ?)",
+                               (repo_full_name, repo_url, time.time()))
+
+    def remove_repos_not_in(self, repo_full_names: List[str]):
+        existing_repos = set(repo_full_names)
+        with self.transaction() as connection:
+            rows = connection.execute("SELECT repo_full_name FROM stale_items_repos").fetchall()
+            removed = [row['repo_full_name'] for row in rows if row['repo_full_name'] not in existing_repos]
+            for repo_full_name in removed:
+                connection.execute("DELETE FROM stale_items WHERE repo_full_name = ?", (repo_full_name,))
+                connection.execute("DELETE FROM stale_items_repos WHERE repo_full_name = ?", (repo_full_name,))
+
+    def query_stale_items(self, updated_before: float) -> List[StaleItem]:
+        # Only repos which passed the last full sync are considered, so repo filters are honored
+        rows = self.execute("SELECT i.*, r.repo_url FROM stale_items i JOIN stale_items_repos r ON i.repo_full_name = r.repo_full_name "
+                            "WHERE i.updated_at < ? ORDER BY i.updated_at", (updated_before,))
+        return [StaleItem(row['repo_full_name'], row['repo_url'], row['number'], bool(row['is_pull_request']), row['title'],
+                          row['updated_at'], json.loads(row['labels'])) for row in rows]
+
+    def last_full_sync(self) -> Optional[float]:
+        rows = self.execute("SELECT value FROM stale_items_meta WHERE key = ?", (FULL_SYNC_META_KEY,))
+        return float(rows[0]['value']) if len(rows) > 0 else None
+
+    def set_last_full_sync(self, stamp: float):
+        self.execute("INSERT OR REPLACE INTO stale_items_meta (key, value) VALUES (?, ?)", (FULL_SYNC_META_KEY, str(stamp)))
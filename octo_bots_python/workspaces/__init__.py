@@ -0,0 +1,2 @@
+import octo_bots_python.workspaces.archive_source_provider
+import octo_bots_python.workspaces.git_source_provider
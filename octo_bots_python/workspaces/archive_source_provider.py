@@ -0,0 +1,89 @@
+import fnmatch
+import os
+import shutil
+import tarfile
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import requests
+from github.PullRequest import PullRequest
+
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.workspaces.source_provider import SourceProvider
+from octo_bots_python.workspaces.source_providers_loader import \
+    SourceProvidersLoader
+
+PROVIDER_NAME = 'archive'
+
+TIMEOUT_SECONDS_KEY = 'timeout-seconds'
+
+DEFAULT_TIMEOUT_SECONDS = 300
+
+logger = Logger("archive_source_provider")
+
+
+class ArchiveSourceProvider(SourceProvider):
+    def __init__(self, timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS):
+        self.__timeout_seconds = timeout_seconds
+
+    @staticmethod
+    def create_source_provider(config: dict) -> SourceProvider:
+        return ArchiveSourceProvider(config.get(TIMEOUT_SECONDS_KEY, DEFAULT_TIMEOUT_SECONDS))
+
+    @staticmethod
+    def provider_type() -> str:
+        return PROVIDER_NAME
+
+    @staticmethod
+    def __should_extract(path: str, extensions: List[str], extra_files: List[str], exclude_patterns: List[str]) -> bool:
+        if os.path.splitext(path)[1][1:] not in extensions and os.path.basename(path) not in extra_files:
+            return False
+        parts = path.split('/')
+        paths = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+        return not any(fnmatch.fnmatch(p, pattern) for p in paths for pattern in exclude_patterns)
+
+    def __extract_archive(self, git_client: GithubAppClient, pr: PullRequest, working_dir: str, extensions: List[str],
+                          extra_files: List[str], exclude_patterns: List[str]) -> int:
+        # The base repo serves the head commit of fork PRs as well (through the pull refs)
+        url = f"{pr.base.repo.url}/tarball/{pr.head.sha}"
+        headers = {'Authorization': f"token {git_client.access_token}"} if git_client.access_token else {}
+        extracted = 0
+        with requests.get(url, headers=headers, stream=True,
+                          timeout=self.__timeout_seconds, verify=git_client.certificate_path or True) as response:
+            response.raise_for_status()
+            # Streamed straight from the socket, entries are written one by one and never kept in memory
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    # Entries are prefixed with a single {owner}-{repo}-{sha} directory
+                    if not member.isfile() or '/' not in member.name:
+                        continue
+                    path = member.name.split('/', 1)[1]
+                    if not self.__should_extract(path, extensions, extra_files, exclude_patterns):
+                        continue
+                    target = os.path.normpath(os.path.join(working_dir, path))
+                    if not target.startswith(working_dir + os.sep):
+                        logger.warn(f"Skipping archive entry outside of the workspace [{member.name}]")
+                        continue
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with archive.extractfile(member) as source, open(target, 'wb') as f:
+                        shutil.copyfileobj(source, f)
+                    extracted += 1
+        return extracted
+
+    @contextmanager
+    def checkout(self, git_client: GithubAppClient, pr: PullRequest, extensions: List[str], extra_files: List[str],
+                 exclude_patterns: Optional[List[str]] = None) -> Iterator[str]:
+        working_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+        os.makedirs(working_dir)
+        try:
+            extracted = self.__extract_archive(git_client, pr, working_dir, extensions, extra_files, exclude_patterns or [])
+            logger.info(f"Extracted {extracted} files from the archive of {pr.head.sha}")
+            yield working_dir
+        finally:
+            shutil.rmtree(working_dir, ignore_errors=True)
+
+
+SourceProvidersLoader.register_source_provider(ArchiveSourceProvider)
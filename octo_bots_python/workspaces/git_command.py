@@ -0,0 +1,44 @@
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.common.tool_runner import ToolRunner
+
+logger = Logger("git_command")
+
+
+def run_git(args: List[str], cwd: Optional[str] = None, check: bool = True) -> str:
+    # Every git invocation of the workspaces goes through here, so there is a single place to tune how git is ran
+    logger.debug(f"Running git {' '.join(args)}")
+    proc = ToolRunner.run(["git"] + args, cwd=cwd)
+    if check and proc.returncode != 0:
+        raise Exception(f"git {args[0]} failed with {proc.returncode} [{proc.stderr.strip()}]")
+    return proc.stdout
+
+
+def hash_blob(path: str) -> str:
+    # Same sha git gives the file content, so results are shared between git and archive workspaces
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_blob_shas(workspace_path: str) -> Dict[str, str]:
+    # Blob shas of every file in the checkout (relative path to sha), as recorded in the index
+    blob_shas = {}
+    if not os.path.exists(os.path.join(workspace_path, '.git')):
+        # Extracted workspaces have no index, their files are hashed instead
+        for dirpath, _, fnames in os.walk(workspace_path):
+            for fname in fnames:
+                path = os.path.join(dirpath, fname)
+                blob_shas[os.path.relpath(path, workspace_path).replace(os.sep, '/')] = hash_blob(path)
+        return blob_shas
+    for entry in run_git(["ls-files", "--stage", "-z"], cwd=workspace_path).split('\0'):
+        if not entry:
+            continue
+        info, path = entry.split('\t', 1)
+        blob_shas[path] = info.split()[1]
+    return blob_shas
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from github.PullRequest import PullRequest
+
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.workspaces.mirror_cache import (DEFAULT_MAX_SIZE_MB,
+                                                      MirrorCache)
+from octo_bots_python.workspaces.pull_request_checkout import (
+    CHECKOUT_FULL, CHECKOUT_STRATEGY_KEY, FETCH_PULL_REF_KEY,
+    SPARSE_CHECKOUT_KEY, CheckoutOptions, checkout_pull_request,
+    extensions_sparse_patterns)
+from octo_bots_python.workspaces.source_provider import SourceProvider
+from octo_bots_python.workspaces.source_providers_loader import \
+    SourceProvidersLoader
+
+PROVIDER_NAME = 'git'
+
+MIRROR_CACHE_PATH_KEY = 'mirror-cache-path'
+MIRROR_CACHE_MAX_SIZE_MB_KEY = 'mirror-cache-max-size-mb'
+
+
+class GitSourceProvider(SourceProvider):
+    def __init__(self, mirror_cache_path: Optional[str] = None, mirror_cache_max_size_mb: int = DEFAULT_MAX_SIZE_MB,
+                 checkout_strategy: str = CHECKOUT_FULL, sparse_checkout: bool = False, fetch_pull_ref: bool = False):
+        self.__mirror_cache_path = mirror_cache_path
+        self.__mirror_cache_max_size_mb = mirror_cache_max_size_mb
+        # Validates the strategy right away, the sparse patterns are only known on checkout
+        self.__checkout_strategy = CheckoutOptions(checkout_strategy).strategy
+        self.__sparse_checkout = sparse_checkout
+        self.__fetch_pull_ref = fetch_pull_ref
+
+    @staticmethod
+    def create_source_provider(config: dict) -> SourceProvider:
+        return GitSourceProvider(config.get(MIRROR_CACHE_PATH_KEY), config.get(MIRROR_CACHE_MAX_SIZE_MB_KEY, DEFAULT_MAX_SIZE_MB),
+                                 config.get(CHECKOUT_STRATEGY_KEY, CHECKOUT_FULL), config.get(SPARSE_CHECKOUT_KEY, False),
+                                 config.get(FETCH_PULL_REF_KEY, False))
+
+    @staticmethod
+    def provider_type() -> str:
+        return PROVIDER_NAME
+
+    @contextmanager
+    def checkout(self, git_client: GithubAppClient, pr: PullRequest, extensions: List[str], extra_files: List[str],
+                 exclude_patterns: Optional[List[str]] = None) -> Iterator[str]:
+        mirror_cache = None
+        if self.__mirror_cache_path:
+            mirror_cache = MirrorCache.get_cache(self.__mirror_cache_path, self.__mirror_cache_max_size_mb)
+        sparse_patterns = extensions_sparse_patterns(extensions, extra_files) if self.__sparse_checkout else None
+        options = CheckoutOptions(self.__checkout_strategy, sparse_patterns, self.__fetch_pull_ref)
+        with checkout_pull_request(pr, mirror_cache, options) as working_dir:
+            yield working_dir
+
+
+SourceProvidersLoader.register_source_provider(GitSourceProvider)
@@ -0,0 +1,47 @@
+import os
+import re
+from typing import Dict, Iterable, List, Set
+
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
+
+
+def read_includes(working_dir: str, source_files: List[str]) -> Dict[str, Set[str]]:
+    # Source files directly included by every source file, include dirs are unknown so an include matches any path ending with it
+    by_basename: Dict[str, List[str]] = {}
+    for path in source_files:
+        by_basename.setdefault(os.path.basename(path), []).append(path)
+    includes: Dict[str, Set[str]] = {}
+    for path in source_files:
+        with open(os.path.join(working_dir, path), 'r', encoding='utf-8', errors='ignore') as f:
+            included = INCLUDE_PATTERN.findall(f.read())
+        includes[path] = {header for include in included for header in by_basename.get(os.path.basename(include), [])
+                          if header != path and (header == include or header.endswith(f"/{include}"))}
+    return includes
+
+
+def transitive_includes(includes: Dict[str, Set[str]], path: str) -> Set[str]:
+    # Every source file the file depends on through its includes
+    included = set()
+    pending = [path]
+    while pending:
+        for header in includes.get(pending.pop(), set()):
+            if header not in included and header != path:
+                included.add(header)
+                pending.append(header)
+    return included
+
+
+def with_includers(includes: Dict[str, Set[str]], files: Iterable[str]) -> Set[str]:
+    # The files along with every file including them, directly or through other headers
+    includers: Dict[str, Set[str]] = {}
+    for path, headers in includes.items():
+        for header in headers:
+            includers.setdefault(header, set()).add(path)
+    result = set(files)
+    pending = list(result)
+    while pending:
+        for path in includers.get(pending.pop(), set()):
+            if path not in result:
+                result.add(path)
+                pending.append(path)
+    return result
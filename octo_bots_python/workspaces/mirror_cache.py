@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from octo_bots_python.common.logger import Logger
+from octo_bots_python.workspaces.git_command import run_git
+
+DEFAULT_MAX_SIZE_MB = 10240
+
+MIRRORS_DIR = 'mirrors'
+WORKTREES_DIR = 'worktrees'
+
+logger = Logger("mirror_cache")
+
+
+def directory_size(path: str) -> int:
+    size = 0
+    for dirpath, _, fnames in os.walk(path):
+        for fname in fnames:
+            try:
+                size += os.lstat(os.path.join(dirpath, fname)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class Mirror:
+    def __init__(self, path: str, clone_url: str):
+        self.path = path
+        self.clone_url = clone_url
+        # Guards fetches and worktree changes, git does not like concurrent writers on the same repo
+        self.lock = Lock()
+        self.last_used = time.time()
+        self.size = 0
+        # Operations currently holding the mirror, such mirrors are never evicted
+        self.users = 0
+        # Worktrees by sha and sparse patterns, each with the amount of operations currently using it
+        self.worktrees: Dict[Tuple[str, Tuple[str, ...]], Tuple[str, int]] = {}
+
+
+class MirrorCache:
+    # Caches are shared per path, so all of the operations using the same path share the bookkeeping
+    __caches = {}
+    __caches_lock = Lock()
+
+    def __init__(self, path: str, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        self.__path = os.path.abspath(path)
+        self.__max_size = max_size_mb * 1024 * 1024
+        self.__lock = Lock()
+        self.__mirrors: Dict[str, Mirror] = {}
+        os.makedirs(os.path.join(self.__path, MIRRORS_DIR), exist_ok=True)
+        # Worktrees are never reused between runs, leftovers of a previous run are dropped
+        shutil.rmtree(os.path.join(self.__path, WORKTREES_DIR), ignore_errors=True)
+        os.makedirs(os.path.join(self.__path, WORKTREES_DIR))
+        for entry in os.scandir(os.path.join(self.__path, MIRRORS_DIR)):
+            if entry.is_dir():
+                clone_url = run_git(["--git-dir", entry.path, "config", "remote.origin.url"], check=False).strip()
+                mirror = Mirror(entry.path, clone_url)
+                mirror.last_used = entry.stat().st_mtime
+                mirror.size = directory_size(entry.path)
+                run_git(["--git-dir", entry.path, "worktree", "prune"], check=False)
+                self.__mirrors[clone_url] = mirror
+
+    @staticmethod
+    def get_cache(path: str, max_size_mb: int = DEFAULT_MAX_SIZE_MB) -> "MirrorCache":
+        key = os.path.abspath(path)
+        with MirrorCache.__caches_lock:
+            if key not in MirrorCache.__caches:
+                MirrorCache.__caches[key] = MirrorCache(path, max_size_mb)
+            return MirrorCache.__caches[key]
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def __mirror_name(self, clone_url: str) -> str:
+        readable = re.sub(r'[^A-Za-z0-9_.-]+', '_', clone_url.split('://')[-1].rstrip('/'))[-64:]
+        return f"{readable}-{hashlib.sha1(clone_url.encode('utf-8')).hexdigest()[:12]}"
+
+    def __get_mirror(self, clone_url: str) -> Mirror:
+        with self.__lock:
+            mirror = self.__mirrors.get(clone_url)
+            if mirror is None:
+                mirror = Mirror(os.path.join(self.__path, MIRRORS_DIR, self.__mirror_name(clone_url)), clone_url)
+                self.__mirrors[clone_url] = mirror
+            mirror.last_used = time.time()
+            mirror.users += 1
+            return mirror
+
+    def __update_mirror(self, mirror: Mirror, ref: str, sha: str, blob_filter: bool):
+        if not os.path.exists(mirror.path):
+            logger.info(f"Creating mirror of [{mirror.clone_url}]")
+            run_git(["init", "--bare", "--quiet", mirror.path])
+            run_git(["--git-dir", mirror.path, "remote", "add", "origin", mirror.clone_url])
+            if blob_filter:
+                # Blobs are fetched lazily by the worktrees, only for the files they check out
+                run_git(["--git-dir", mirror.path, "config", "remote.origin.promisor", "true"])
+                run_git(["--git-dir", mirror.path, "config", "remote.origin.partialclonefilter", "blob:none"])
+        # Nothing to fetch if the ref is already at the commit (a re-run, or another operation on the same PR)
+        # The ref is checked rather than the object, as a missing object would be lazily fetched on partial mirrors
+        if run_git(["--git-dir", mirror.path, "rev-parse", "--verify", "--quiet", ref], check=False).strip() == sha:
+            return
+        logger.info(f"Fetching [{ref}] into mirror of [{mirror.clone_url}]")
+        run_git(["--git-dir", mirror.path, "fetch", "--quiet", "--no-tags", "origin", f"+{ref}:{ref}"])
+        os.utime(mirror.path)
+
+    def __acquire_worktree(self, mirror: Mirror, ref: str, sha: str, sparse_patterns: Tuple[str, ...], blob_filter: bool) -> str:
+        with mirror.lock:
+            key = (sha, sparse_patterns)
+            if key in mirror.worktrees:
+                worktree_path, refs = mirror.worktrees[key]
+                mirror.worktrees[key] = (worktree_path, refs + 1)
+                return worktree_path
+            self.__update_mirror(mirror, ref, sha, blob_filter)
+            worktree_path = os.path.join(self.__path, WORKTREES_DIR, f"{os.path.basename(mirror.path)}-{sha[:12]}-{uuid.uuid4().hex[:8]}")
+            if sparse_patterns:
+                run_git(["--git-dir", mirror.path, "worktree", "add", "--quiet", "--no-checkout", "--detach", worktree_path, sha])
+                run_git(["sparse-checkout", "set", "--no-cone"] + list(sparse_patterns), cwd=worktree_path)
+                run_git(["reset", "--quiet", "--hard"], cwd=worktree_path)
+            else:
+                run_git(["--git-dir", mirror.path, "worktree", "add", "--quiet", "--detach", worktree_path, sha])
+            mirror.worktrees[key] = (worktree_path, 1)
+            return worktree_path
+
+    def __release_worktree(self, mirror: Mirror, sha: str, sparse_patterns: Tuple[str, ...]):
+        with mirror.lock:
+            key = (sha, sparse_patterns)
+            worktree_path, refs = mirror.worktrees[key]
+            if refs > 1:
+                mirror.worktrees[key] = (worktree_path, refs - 1)
+                return
+            del mirror.worktrees[key]
+            run_git(["--git-dir", mirror.path, "worktree", "remove", "--force", worktree_path], check=False)
+            shutil.rmtree(worktree_path, ignore_errors=True)
+            mirror.size = directory_size(mirror.path)
+
+    @contextmanager
+    def checkout(self, clone_url: str, ref: str, sha: str, sparse_patterns: Optional[List[str]] = None,
+                 blob_filter: bool = False) -> Iterator[str]:
+        # The ref is a full ref name (refs/heads/... or refs/pull/.../head) which contains the sha
+        # Concurrent checkouts of the same sha (and sparse patterns) share a single read only worktree
+        sparse_patterns = tuple(sparse_patterns or ())
+        mirror = self.__get_mirror(clone_url)
+        try:
+            worktree_path = self.__acquire_worktree(mirror, ref, sha, sparse_patterns, blob_filter)
+            try:
+                yield worktree_path
+            finally:
+                self.__release_worktree(mirror, sha, sparse_patterns)
+        finally:
+            with self.__lock:
+                mirror.users -= 1
+            self.__evict()
+
+    def __evict(self):
+        # Least recently used mirrors are dropped until we are under the quota, mirrors in use are kept
+        with self.__lock:
+            total_size = sum(mirror.size for mirror in self.__mirrors.values())
+            for mirror in sorted(self.__mirrors.values(), key=lambda m: m.last_used):
+                if total_size <= self.__max_size:
+                    break
+                if mirror.users > 0:
+                    continue
+                logger.info(f"Evicting mirror of [{mirror.clone_url}] ({mirror.size // (1024 * 1024)}MB)")
+                shutil.rmtree(mirror.path, ignore_errors=True)
+                total_size -= mirror.size
+                del self.__mirrors[mirror.clone_url]
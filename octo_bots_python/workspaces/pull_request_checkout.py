@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from github.PullRequest import PullRequest
+
+from octo_bots_python.workspaces.git_command import run_git
+from octo_bots_python.workspaces.mirror_cache import MirrorCache
+
+CHECKOUT_STRATEGY_KEY = 'checkout-strategy'
+SPARSE_CHECKOUT_KEY = 'sparse-checkout'
+FETCH_PULL_REF_KEY = 'fetch-pull-ref'
+
+CHECKOUT_FULL = 'full'
+CHECKOUT_SHALLOW = 'shallow'
+CHECKOUT_PARTIAL = 'partial'
+CHECKOUT_STRATEGIES = [CHECKOUT_FULL, CHECKOUT_SHALLOW, CHECKOUT_PARTIAL]
+
+
+class CheckoutOptions:
+    def __init__(self, strategy: str = CHECKOUT_FULL, sparse_patterns: Optional[List[str]] = None, fetch_pull_ref: bool = False):
+        if strategy not in CHECKOUT_STRATEGIES:
+            raise Exception(f"Unknown checkout strategy {strategy}, expected one of {CHECKOUT_STRATEGIES}")
+        self.strategy = strategy
+        self.sparse_patterns = sparse_patterns
+        self.fetch_pull_ref = fetch_pull_ref
+
+
+def extensions_sparse_patterns(extensions: List[str], extra_paths: Optional[List[str]] = None) -> List[str]:
+    # Non cone patterns, matched at any depth like gitignore patterns
+    return [f"*.{extension}" for extension in extensions] + (extra_paths or [])
+
+
+def pull_request_source(pr: PullRequest, options: CheckoutOptions):
+    # The pull ref lives on the base repo, so fork PRs can be fetched without access to the fork
+    if options.fetch_pull_ref:
+        return pr.base.repo.clone_url, f"refs/pull/{pr.number}/head"
+    return pr.head.repo.clone_url, f"refs/heads/{pr.head.ref}"
+
+
+@contextmanager
+def checkout_pull_request(pr: PullRequest, mirror_cache: Optional[MirrorCache] = None,
+                          options: Optional[CheckoutOptions] = None) -> Iterator[str]:
+    # Yields a read only checkout of the PR head, the checkout must not be modified as it may be shared
+    options = options or CheckoutOptions()
+    clone_url, ref = pull_request_source(pr, options)
+    if mirror_cache:
+        # Mirrors keep their history for incremental fetches, so a shallow strategy does not apply to them
+        with mirror_cache.checkout(clone_url, ref, pr.head.sha, options.sparse_patterns,
+                                   options.strategy == CHECKOUT_PARTIAL) as working_dir:
+            yield working_dir
+        return
+    working_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
+    os.makedirs(working_dir)
+    try:
+        if options.strategy == CHECKOUT_FULL and not options.sparse_patterns and not options.fetch_pull_ref:
+            run_git(["clone", "--quiet", "--branch", pr.head.ref, clone_url, working_dir])
+        else:
+            run_git(["init", "--quiet"], cwd=working_dir)
+            run_git(["remote", "add", "origin", clone_url], cwd=working_dir)
+            fetch_args = ["fetch", "--quiet", "--no-tags"]
+            if options.strategy == CHECKOUT_PARTIAL:
+                run_git(["config", "remote.origin.promisor", "true"], cwd=working_dir)
+                run_git(["config", "remote.origin.partialclonefilter", "blob:none"], cwd=working_dir)
+            if options.strategy == CHECKOUT_SHALLOW:
+                # Fetch the exact sha, the ref may have already moved on since the event was sent
+                fetch_args += ["--depth", "1", "origin", pr.head.sha]
+            else:
+                fetch_args += ["origin", ref]
+            if options.sparse_patterns:
+                run_git(["sparse-checkout", "set", "--no-cone"] + options.sparse_patterns, cwd=working_dir)
+            run_git(fetch_args, cwd=working_dir)
+            run_git(["checkout", "--quiet", "--detach", pr.head.sha], cwd=working_dir)
+        yield working_dir
+    finally:
+        shutil.rmtree(working_dir, ignore_errors=True)
@@ -0,0 +1,30 @@
+from abc import abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from github.PullRequest import PullRequest
+
+from octo_bots_python.clients.github_client import GithubAppClient
+
+
+class SourceProvider:
+    def __init__(self):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def create_source_provider(config: dict) -> 'SourceProvider':
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def provider_type() -> str:
+        pass
+
+    @abstractmethod
+    @contextmanager
+    def checkout(self, git_client: GithubAppClient, pr: PullRequest, extensions: List[str], extra_files: List[str],
+                 exclude_patterns: Optional[List[str]] = None) -> Iterator[str]:
+        # Yields a read only directory with the PR head sources, providers may limit it to the files with the given
+        # extensions (or names) which are not excluded, the directory must not be modified as it may be shared
+        pass
@@ -0,0 +1,28 @@
+from typing import Union
+
+from octo_bots_python.workspaces.source_provider import SourceProvider
+
+
+class SourceProvidersLoader:
+    source_provider_classes = {}
+
+    @staticmethod
+    def load_source_provider(type_name: str, config: dict) -> SourceProvider:
+        if type_name not in SourceProvidersLoader.source_provider_classes.keys():
+            raise Exception(f"Unknown type name given for source providers loader [type: {type_name}]")
+        return SourceProvidersLoader.source_provider_classes[type_name].create_source_provider(config)
+
+    @staticmethod
+    def load_source_provider_from_config(config: Union[str, dict]) -> SourceProvider:
+        # Either just the provider name, or a single {name: config} entry
+        if isinstance(config, str):
+            return SourceProvidersLoader.load_source_provider(config, {})
+        for k in config.keys():
+            return SourceProvidersLoader.load_source_provider(k, config[k])
+        raise Exception("Empty source provider config")
+
+    @staticmethod
+    def register_source_provider(clazz: type):
+        if not issubclass(clazz, SourceProvider):
+            raise Exception("Invalid class given for source providers loader")
+        SourceProvidersLoader.source_provider_classes[clazz.provider_type()] = clazz
@@ -0,0 +1,124 @@
+import fnmatch
+import os
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, List, Optional, Tuple
+
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.logger import Logger
+
+DEFAULT_MAX_CACHED_INDEXES = 64
+
+IGNORED_NAMES = ['.git']
+
+logger = Logger("workspace_indexer")
+
+
+class GlobMatcher:
+    def __init__(self, patterns: List[str], match_separator: bool = True):
+        # All of the patterns are compiled into a single regex, so a path is matched once instead of once per pattern
+        # Without match_separator, * and ? stop at / (and ** crosses it), as in github paths
+        translate = fnmatch.translate if match_separator else GlobMatcher.__translate_path_glob
+        self.__pattern = re.compile('|'.join(f"(?:{translate(p)})" for p in patterns)) if patterns else None
+
+    @staticmethod
+    def __translate_path_glob(pattern: str) -> str:
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if pattern.startswith('**/', i):
+                # Any amount of directories, including none
+                regex += '(?:.*/)?'
+                i += 2
+            elif pattern.startswith('**', i):
+                regex += '.*'
+                i += 1
+            elif c == '*':
+                regex += '[^/]*'
+            elif c == '?':
+                regex += '[^/]'
+            elif c == '[' and ']' in pattern[i + 2:]:
+                end = pattern.index(']', i + 2)
+                group = pattern[i + 1:end].replace('\\', '\\\\')
+                regex += f"[^{group[1:]}]" if group.startswith('!') else f"[{group}]"
+                i = end
+            else:
+                regex += re.escape(c)
+            i += 1
+        return f"(?s:{regex})\\Z"
+
+    def matches(self, path: str) -> bool:
+        return self.__pattern is not None and self.__pattern.match(path) is not None
+
+    def matches_path_or_parent(self, path: str) -> bool:
+        # A file under an excluded directory is excluded as well
+        parts = path.split('/')
+        return any(self.matches('/'.join(parts[:i])) for i in range(1, len(parts) + 1))
+
+
+class WorkspaceIndexer:
+    # Indexes (relative file paths) per repo and sha, a commit never changes so they are only dropped when least recently used
+    __indexes: OrderedDict = OrderedDict()
+    __lock = Lock()
+    __max_cached_indexes = DEFAULT_MAX_CACHED_INDEXES
+
+    @staticmethod
+    def __cached_index(key: Tuple, create_index: Callable[[], Optional[List[str]]]) -> Optional[List[str]]:
+        with WorkspaceIndexer.__lock:
+            if key in WorkspaceIndexer.__indexes:
+                WorkspaceIndexer.__indexes.move_to_end(key)
+                return WorkspaceIndexer.__indexes[key]
+        # Created outside of the lock, at worst the same index is created twice
+        index = create_index()
+        if index is not None:
+            with WorkspaceIndexer.__lock:
+                WorkspaceIndexer.__indexes[key] = index
+                while len(WorkspaceIndexer.__indexes) > WorkspaceIndexer.__max_cached_indexes:
+                    WorkspaceIndexer.__indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def __scan(workspace_path: str, include: GlobMatcher, exclude: GlobMatcher) -> List[str]:
+        files = []
+        pending = ['']
+        while pending:
+            relative_dir = pending.pop()
+            with os.scandir(os.path.join(workspace_path, relative_dir)) as entries:
+                for entry in entries:
+                    if entry.name in IGNORED_NAMES:
+                        continue
+                    path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    # Excluded directories are pruned, so nothing under them is ever listed
+                    if exclude.matches(path):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(path)
+                    elif entry.is_file() and include.matches(path):
+                        files.append(path)
+        return sorted(files)
+
+    @staticmethod
+    def index_workspace(workspace_path: str, repo: str, sha: str, include_patterns: List[str],
+                        exclude_patterns: Optional[List[str]] = None) -> List[str]:
+        # Relative paths of the workspace files matching the include patterns, which are not excluded by themselves or by a parent
+        key = ('workspace', repo, sha, tuple(include_patterns), tuple(exclude_patterns or []))
+        return WorkspaceIndexer.__cached_index(
+            key, lambda: WorkspaceIndexer.__scan(workspace_path, GlobMatcher(include_patterns), GlobMatcher(exclude_patterns or [])))
+
+    @staticmethod
+    def __list_tree(git_client: GithubAppClient, repo_url: str, sha: str, include_dirs: bool) -> Optional[List[str]]:
+        _, data = git_client.rest_impl.requestJsonAndCheck("GET", f"{repo_url}/git/trees/{sha}", parameters={'recursive': '1'})
+        if data.get('truncated', False):
+            logger.warn(f"Tree of {sha} is too big to be listed at once")
+            return None
+        # Directories are trees, and submodules are commits
+        return sorted(entry['path'] for entry in data['tree'] if include_dirs or entry['type'] == 'blob')
+
+    @staticmethod
+    def index_tree(git_client: GithubAppClient, repo_url: str, sha: str, include_dirs: bool = False) -> Optional[List[str]]:
+        # Every file path of the commit from the git trees api, without any checkout, or None when github truncates the tree
+        # With include_dirs, the directories (and submodules) are listed along with the files
+        return WorkspaceIndexer.__cached_index(('tree', repo_url, sha, include_dirs),
+                                               lambda: WorkspaceIndexer.__list_tree(git_client, repo_url, sha, include_dirs))
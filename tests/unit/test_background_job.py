@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+
+from octo_bots_python.background_job import BackgroundJob
+from octo_bots_python.stores.background_jobs_state_store import \
+    BackgroundJobsStateStore
+
+
+def test_jitter_is_parsed_once():
+    job = BackgroundJob("job", "1 hour", [], False, jitter="2 minutes")
+    assert abs(job.jitter.total_seconds() - 120) < 1
+    assert BackgroundJob("job", "1 hour", [], False).jitter == datetime.timedelta()
+
+
+def test_invalid_jitter_is_a_config_error():
+    with pytest.raises(Exception, match="Invalid jitter"):
+        BackgroundJob("job", "1 hour", [], False, jitter="not a duration")
+
+
+def test_invalid_catch_up_is_a_config_error():
+    with pytest.raises(Exception, match="Invalid catch up"):
+        BackgroundJob("job", "1 hour", [], False, catch_up="always")
+
+
+def test_last_run_is_persisted(tmp_path):
+    store = BackgroundJobsStateStore(str(tmp_path / "jobs.db"))
+    assert store.load_last_run("job") is None
+    last_run = datetime.datetime(2024, 5, 1, 3, 0)
+    store.save_last_run("job", last_run)
+    store.save_last_run("job", last_run + datetime.timedelta(hours=1))
+    assert store.load_last_run("job") == last_run + datetime.timedelta(hours=1)
+    assert store.load_last_run("other") is None
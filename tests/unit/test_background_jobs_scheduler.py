@@ -0,0 +1,98 @@
+import datetime
+import time
+from threading import Lock
+
+import pytest
+
+from octo_bots_python.background_job import CATCH_UP_SKIP, BackgroundJob
+from octo_bots_python.background_job_schedule import (BackgroundJobSchedule,
+                                                      CronJobSchedule,
+                                                      IntervalJobSchedule)
+from octo_bots_python.background_jobs_scheduler import BackgroundJobsScheduler
+from octo_bots_python.leases.lease_backend import LeaseBackend
+from octo_bots_python.stores.background_jobs_state_store import \
+    BackgroundJobsStateStore
+
+
+class Dispatched:
+    def __init__(self):
+        self.__lock = Lock()
+        self.jobs = []
+
+    def __call__(self, job: BackgroundJob, scheduled_time: datetime.datetime):
+        with self.__lock:
+            self.jobs.append((job.job_name, scheduled_time))
+
+
+class RefusedLease(LeaseBackend):
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        return False
+
+    def release_lease(self, name: str, owner: str):
+        pass
+
+
+def run_scheduler(jobs, seconds: float, **kwargs) -> Dispatched:
+    dispatched = Dispatched()
+    scheduler = BackgroundJobsScheduler(jobs, dispatched, **kwargs)
+    scheduler.start_scheduler()
+    try:
+        time.sleep(seconds)
+    finally:
+        scheduler.stop_scheduler()
+    return dispatched
+
+
+def job_due_in(store: BackgroundJobsStateStore, name: str, seconds: float, **kwargs) -> BackgroundJob:
+    # An hourly job whose last run makes it due in the given seconds
+    store.save_last_run(name, datetime.datetime.now() - datetime.timedelta(hours=1) + datetime.timedelta(seconds=seconds))
+    return BackgroundJob(name, "1 hour", [], False, **kwargs)
+
+
+def test_schedules_are_created_from_expressions():
+    assert isinstance(BackgroundJobSchedule.create_schedule("@hourly"), CronJobSchedule)
+    assert isinstance(BackgroundJobSchedule.create_schedule("0 3 * * *"), CronJobSchedule)
+    interval = BackgroundJobSchedule.create_schedule("30 minutes")
+    assert isinstance(interval, IntervalJobSchedule)
+    assert abs(interval.interval.total_seconds() - 1800) < 1
+    assert CronJobSchedule("0 3 * * *").next_run_time(datetime.datetime(2024, 5, 1, 4, 0)) == datetime.datetime(2024, 5, 2, 3, 0)
+    with pytest.raises(Exception, match="Invalid interval"):
+        BackgroundJobSchedule.create_schedule("not an interval")
+
+
+def test_jobs_are_dispatched_in_deadline_order(tmp_path):
+    store = BackgroundJobsStateStore(str(tmp_path / "jobs.db"))
+    jobs = [job_due_in(store, "later", 0.4), job_due_in(store, "sooner", 0.2), job_due_in(store, "not-due", 600)]
+    dispatched = run_scheduler(jobs, 1, state_store=store)
+    assert [name for name, _ in dispatched.jobs] == ["sooner", "later"]
+    # The dispatched runs are persisted, so a restart does not run them again
+    assert store.load_last_run("sooner") == dispatched.jobs[0][1]
+
+
+def test_missed_runs_are_caught_up_unless_skipped(tmp_path):
+    store = BackgroundJobsStateStore(str(tmp_path / "jobs.db"))
+    jobs = [job_due_in(store, "caught-up", -3600), job_due_in(store, "skipped", -3600, catch_up=CATCH_UP_SKIP)]
+    dispatched = run_scheduler(jobs, 0.5, state_store=store, catch_up_spread_seconds=0)
+    assert [name for name, _ in dispatched.jobs] == ["caught-up"]
+
+
+def test_followers_do_not_dispatch(tmp_path):
+    store = BackgroundJobsStateStore(str(tmp_path / "jobs.db"))
+    job = job_due_in(store, "job", 0.1)
+    dispatched = run_scheduler([job], 0.5, state_store=store, lease_backend=RefusedLease())
+    assert dispatched.jobs == []
+    # The leader is assumed to have ran it
+    assert job.last_run_stamp > datetime.datetime.now() - datetime.timedelta(seconds=1)
+
+
+def test_pending_jobs_are_not_dispatched_again(tmp_path):
+    store = BackgroundJobsStateStore(str(tmp_path / "jobs.db"))
+    job = BackgroundJob("job", "1 second", [], False)
+    store.save_last_run("job", datetime.datetime.now())
+    # The pool never gets to run the job, as when every worker is busy
+    dispatched = run_scheduler([job], 3.5, state_store=store)
+    assert [name for name, _ in dispatched.jobs] == ["job"]
+    assert job.is_pending
+    job.execute_job({}, {}, {}, dispatched.jobs[0][1])
+    assert not job.is_pending
+    assert job.mark_pending()
@@ -0,0 +1,50 @@
+from octo_bots_python.clients.check_run_report import (ANNOTATION_FAILURE,
+                                                       ANNOTATIONS_BATCH_SIZE,
+                                                       TRUNCATION_NOTE_RESERVE,
+                                                       CheckRunReport)
+
+
+class FakeGithubClient:
+    def __init__(self):
+        self.updates = []
+        self.completed = None
+
+    def update_check_run(self, check_run, output):
+        self.updates.append(output)
+        return True
+
+    def complete_check_run(self, check_run, conclusion, output):
+        self.completed = (conclusion, output)
+
+
+def test_text_is_kept_within_the_budget():
+    git_client = FakeGithubClient()
+    max_text_size = TRUNCATION_NOTE_RESERVE + 100
+    report = CheckRunReport(git_client, None, "Report", "```\n", "```\n", max_text_size=max_text_size)
+    assert report.is_empty
+    assert report.add_text("a" * 40)
+    assert report.add_text("b" * 40)
+    assert not report.add_text("c" * 40)
+    # Once a part is omitted, later ones are omitted too, even when they would fit
+    assert not report.add_text("d")
+    report.complete("failure", "Found issues")
+    conclusion, output = git_client.completed
+    assert conclusion == "failure"
+    assert output['text'].startswith("```\n" + "a" * 40 + "b" * 40 + "```\n")
+    assert "2 more entries were omitted" in output['text']
+    assert len(output['text']) <= max_text_size
+
+
+def test_annotations_are_sent_in_batches():
+    git_client = FakeGithubClient()
+    report = CheckRunReport(git_client, None, "Report")
+    for i in range(ANNOTATIONS_BATCH_SIZE + 3):
+        report.add_annotation("file.c", i + 1, i + 1, ANNOTATION_FAILURE, "x" * 5000)
+    assert len(git_client.updates) == 1
+    assert len(git_client.updates[0]['annotations']) == ANNOTATIONS_BATCH_SIZE
+    assert all(len(annotation['message']) == 4096 for annotation in git_client.updates[0]['annotations'])
+    report.complete("failure", "Found issues")
+    conclusion, output = git_client.completed
+    assert len(output['annotations']) == 3
+    assert report.annotations_count == ANNOTATIONS_BATCH_SIZE + 3
+    assert output['text'] == ''
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from github.Branch import Branch
+from github.PullRequest import PullRequest
+from github.Repository import Repository
+
+from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.operations.github.checkmarx_projects_reconcile_operation import \
+    CheckmarxProjectsReconcileOperation
+from octo_bots_python.stores.checkmarx_scans_store import (CheckmarxScansStore,
+                                                           PendingScan)
+
+
+class FakeGithubClient:
+    def __init__(self, repos):
+        self.__repos = repos
+
+    def paginate(self, content_class, url, parameters=None, list_item=None):
+        if content_class == Repository:
+            return [SimpleNamespace(name=name, url=f"/repos/org/{name}") for name in self.__repos.keys()]
+        repo = self.__repos[url.split('/')[3]]
+        if content_class == Branch:
+            return [SimpleNamespace(name=name) for name in repo['branches']]
+        if content_class == PullRequest:
+            return [SimpleNamespace(head=SimpleNamespace(repo=SimpleNamespace(name=head_repo), ref=ref)) for head_repo, ref in repo['pulls']]
+        raise Exception(f"Unexpected listing {url}")
+
+
+class FakeCheckmarxClient:
+    def __init__(self, project_names):
+        self.projects = [SimpleNamespace(project_id=i, name=name) for i, name in enumerate(project_names)]
+        self.deleted = []
+        self.projects_client = SimpleNamespace(delete_project_by_id=self.deleted.append)
+
+    def list_projects(self):
+        return self.projects
+
+    def remove_project(self, name):
+        pass
+
+
+def reconcile(repos, project_names, tracker_path=None):
+    checkmarx_client = FakeCheckmarxClient(project_names)
+    clients = {GithubAppClient.client_type(): FakeGithubClient(repos), CheckmarxClient.client_type(): checkmarx_client}
+    CheckmarxProjectsReconcileOperation(["release/*"], False, 20, '1 minute', tracker_path=tracker_path).execute_operation(clients, {}, {})
+    return sorted(project_names[project_id] for project_id in checkmarx_client.deleted)
+
+
+def test_orphaned_branch_projects_are_deleted():
+    repos = {'repo': {'branches': ["main", "feature/a"], 'pulls': [("repo", "feature/a"), ("repo", "fork-branch")]}}
+    projects = ["repo", "repo@main", "repo@feature_a", "repo@fork-branch", "repo@gone", "repo@release_1", "other@gone"]
+    # Repo projects, open PR branches (of forks too), forbidden branches and repos outside of the installation are kept
+    assert reconcile(repos, projects) == ["repo@gone"]
+
+
+def test_projects_being_scanned_are_kept(tmp_path):
+    tracker_path = str(tmp_path / "tracker.db")
+    store = CheckmarxScansStore(tracker_path)
+    store.add_scan(PendingScan(10, 1, "repo@tracked", "sha-a", "run-a", {}, 0, 100))
+    store.add_project_scan(2, "sha-b", 11, 0)
+    store.add_project_scan(3, "sha-c", 12, 0)
+    store.set_project_scan_finished(12)
+    repos = {'repo': {'branches': ["main"], 'pulls': []}}
+    projects = ["repo", "repo@tracked", "repo@scanning", "repo@finished"]
+    assert reconcile(repos, projects, tracker_path) == ["repo@finished"]
@@ -0,0 +1,36 @@
+from octo_bots_python.stores.checkmarx_scans_store import CheckmarxScansStore
+
+
+def test_project_scan_is_found_by_project_and_sha(tmp_path):
+    store = CheckmarxScansStore(str(tmp_path / "scans.db"))
+    store.add_project_scan(1, "sha-a", 10, 100)
+    assert store.find_project_scan(1, "sha-a") == (10, False)
+    assert store.find_project_scan(1, "sha-b") is None
+    assert store.find_project_scan(2, "sha-a") is None
+    store.set_project_scan_finished(10)
+    assert store.find_project_scan(1, "sha-a") == (10, True)
+
+
+def test_unfinished_scans_of_other_shas_are_superseded(tmp_path):
+    store = CheckmarxScansStore(str(tmp_path / "scans.db"))
+    store.add_project_scan(1, "sha-a", 10, 100)
+    store.add_project_scan(1, "sha-b", 11, 200)
+    store.add_project_scan(1, "sha-c", 12, 300)
+    store.add_project_scan(2, "sha-a", 20, 100)
+    store.set_project_scan_finished(11)
+    assert store.unfinished_project_scans(1, "sha-c") == [10]
+
+
+def test_removed_and_pruned_project_scans(tmp_path):
+    store = CheckmarxScansStore(str(tmp_path / "scans.db"))
+    store.add_project_scan(1, "sha-a", 10, 100)
+    store.add_project_scan(1, "sha-b", 11, 200)
+    store.add_project_scan(1, "sha-c", 12, 50)
+    store.set_project_scan_finished(10)
+    store.set_project_scan_finished(11)
+    store.remove_project_scan(12)
+    assert store.find_project_scan(1, "sha-c") is None
+    # Only finished scans older than the retention are pruned
+    store.prune_project_scans(150)
+    assert store.find_project_scan(1, "sha-a") is None
+    assert store.find_project_scan(1, "sha-b") == (11, True)
@@ -0,0 +1,116 @@
+import sys
+import time
+from types import ModuleType, SimpleNamespace
+
+import pytest
+from github import Github
+
+from octo_bots_python.clients.checkmarx_client import CheckmarxClient
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.circuit_breaker import CircuitOpenError
+from octo_bots_python.operations.github.checkmarx_scans_tracker_operation import \
+    CheckmarxScansTrackerOperation
+from octo_bots_python.stores.checkmarx_scans_store import (CheckmarxScansStore,
+                                                           PendingScan)
+
+
+class FakeGithubClient:
+    def __init__(self):
+        self.rest_impl = Github()._Github__requester
+        self.completed = []
+        self.updated = []
+
+    def complete_check_run(self, check_run, conclusion, output):
+        self.completed.append((check_run.url, conclusion, output['summary']))
+
+    def update_check_run(self, check_run, output):
+        self.updated.append((check_run.url, output['summary']))
+
+
+class CxError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def cx_error_module(monkeypatch):
+    # The sdk authenticates when imported, so the tracker imports a fake exceptions module instead
+    module = ModuleType("CxError")
+    module.CxError = CxError
+    monkeypatch.setitem(sys.modules, "CheckmarxPythonSDK.CxRestAPISDK.exceptions.CxError", module)
+
+
+class FakeCheckmarxClient:
+    def __init__(self, scans_client, cancel_error=None):
+        self.scans_client = scans_client
+        self.__cancel_error = cancel_error
+        self.canceled = []
+
+    def cancel_scan(self, scan_id):
+        self.canceled.append(scan_id)
+        if self.__cancel_error:
+            raise self.__cancel_error
+
+
+class FakeScansClient:
+    def __init__(self, error=None, status=None):
+        self.__error = error
+        self.__status = status
+
+    def get_sast_scan_details_by_scan_id(self, scan_id):
+        if self.__error:
+            raise self.__error
+        return SimpleNamespace(id=scan_id, status=SimpleNamespace(name=self.__status), partial_scan_reasons="")
+
+
+def track(tmp_path, scans, checkmarx_client):
+    store = CheckmarxScansStore(str(tmp_path / "tracker.db"))
+    for scan in scans:
+        store.add_project_scan(scan.project_id, scan.head_sha, scan.scan_id, scan.started_at)
+        store.add_scan(scan)
+    git_client = FakeGithubClient()
+    clients = {GithubAppClient.client_type(): git_client, CheckmarxClient.client_type(): checkmarx_client}
+    CheckmarxScansTrackerOperation(str(tmp_path / "tracker.db"), 30).execute_operation(clients, {}, {})
+    return store, git_client
+
+
+def pending_scan(scan_id: int, check_run_url: str, timeout_in: float) -> PendingScan:
+    return PendingScan(scan_id, 1, "project", f"sha-{scan_id}", check_run_url, {}, time.time() - 60, time.time() + timeout_in)
+
+
+def test_scans_without_details_time_out(tmp_path):
+    scans = [pending_scan(10, "run-a", -1), pending_scan(10, "run-b", 600), pending_scan(11, "run-c", -1)]
+    checkmarx_client = FakeCheckmarxClient(FakeScansClient(error=Exception("404 Not Found")))
+    store, git_client = track(tmp_path, scans, checkmarx_client)
+    assert sorted(git_client.completed) == [("run-a", "failure", "Timeout on Scan"), ("run-c", "failure", "Timeout on Scan")]
+    assert [scan.check_run_url for scan in store.pending_scans()] == ["run-b"]
+    assert store.find_project_scan(1, "sha-10") == (10, False)
+    assert store.find_project_scan(1, "sha-11") is None
+    # Only the scan no check run waits on anymore is canceled
+    assert checkmarx_client.canceled == [11]
+
+
+def test_scans_time_out_while_checkmarx_is_unavailable(tmp_path):
+    scans = [pending_scan(10, "run-a", -1), pending_scan(11, "run-b", -1), pending_scan(12, "run-c", 600)]
+    checkmarx_client = FakeCheckmarxClient(FakeScansClient(error=CircuitOpenError("checkmarx", 60)), cancel_error=CxError("Unavailable"))
+    store, git_client = track(tmp_path, scans, checkmarx_client)
+    assert sorted(git_client.completed) == [("run-a", "failure", "Timeout on Scan"), ("run-b", "failure", "Timeout on Scan")]
+    assert [scan.check_run_url for scan in store.pending_scans()] == ["run-c"]
+    # A failed cancel does not keep the timed out scans around
+    assert sorted(checkmarx_client.canceled) == [10, 11]
+    assert store.find_project_scan(1, "sha-10") is None
+
+
+def test_running_scans_are_updated_until_their_timeout(tmp_path):
+    scans = [pending_scan(10, "run-a", -1), pending_scan(10, "run-b", 600)]
+    store, git_client = track(tmp_path, scans, FakeCheckmarxClient(FakeScansClient(status="Scanning")))
+    assert git_client.completed == [("run-a", "failure", "Timeout on Scan")]
+    assert git_client.updated == [("run-b", "Scan Scanning")]
+    assert [scan.check_run_url for scan in store.pending_scans()] == ["run-b"]
+
+
+def test_ended_scans_complete_every_check_run(tmp_path):
+    scans = [pending_scan(10, "run-a", -1), pending_scan(10, "run-b", 600)]
+    store, git_client = track(tmp_path, scans, FakeCheckmarxClient(FakeScansClient(status="Canceled")))
+    assert sorted(git_client.completed) == [("run-a", "cancelled", "Scan Canceled"), ("run-b", "cancelled", "Scan Canceled")]
+    assert store.pending_scans() == []
+    assert store.find_project_scan(1, "sha-10") is None
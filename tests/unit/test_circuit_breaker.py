@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from github import Github, GithubException
+
+from octo_bots_python.clients.github_client import GithubAppClient
+from octo_bots_python.common.circuit_breaker import (CIRCUIT_CLOSED,
+                                                     CIRCUIT_HALF_OPEN,
+                                                     CIRCUIT_OPEN,
+                                                     CircuitBreaker,
+                                                     CircuitBreakerProxy,
+                                                     CircuitOpenError)
+
+
+def fail():
+    raise ValueError()
+
+
+def call_failing(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        with pytest.raises(ValueError):
+            breaker.call(fail)
+
+
+def test_opens_once_failure_rate_reached():
+    breaker = CircuitBreaker("service", failure_rate_threshold=0.5, window_size=4, min_calls=4, open_seconds=60)
+    breaker.call(lambda: None)
+    breaker.call(lambda: None)
+    call_failing(breaker, 1)
+    assert breaker.state == CIRCUIT_CLOSED
+    call_failing(breaker, 1)
+    assert breaker.state == CIRCUIT_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: None)
+    assert not breaker.is_available()
+
+
+def test_ignored_errors_do_not_open():
+    breaker = CircuitBreaker("service", is_failure=lambda e: not isinstance(e, ValueError), min_calls=1)
+    call_failing(breaker, 10)
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("service", min_calls=1, open_seconds=0.05)
+    call_failing(breaker, 1)
+    assert breaker.state == CIRCUIT_OPEN
+    time.sleep(0.1)
+    assert breaker.is_available()
+    # A failed probe opens the circuit again
+    call_failing(breaker, 1)
+    assert breaker.state == CIRCUIT_OPEN
+    time.sleep(0.1)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_single_probe_while_half_open():
+    breaker = CircuitBreaker("service", min_calls=1, open_seconds=0.05)
+    call_failing(breaker, 1)
+    time.sleep(0.1)
+
+    def probe():
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        # Any other call fails fast while the probe runs
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: None)
+        return "probed"
+
+    assert breaker.call(probe) == "probed"
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_proxy_guards_methods_only():
+    class Target:
+        value = 3
+
+        def method(self, x):
+            return x * 2
+
+    breaker = CircuitBreaker("service", min_calls=1)
+    proxy = CircuitBreakerProxy(Target(), breaker)
+    assert proxy.value == 3
+    assert proxy.method(2) == 4
+    call_failing(breaker, 1)
+    assert proxy.value == 3
+    with pytest.raises(CircuitOpenError):
+        proxy.method(2)
+
+
+def test_github_client_counts_server_errors_only():
+    def github_failing_with(status: int) -> GithubAppClient:
+        github = Github()
+
+        def request_json_and_check(*args, **kwargs):
+            raise GithubException(status, {}, {})
+
+        github._Github__requester.requestJsonAndCheck = request_json_and_check
+        return GithubAppClient(github, None, None, api_url=f"http://github-{status}.test")
+
+    client = github_failing_with(404)
+    for _ in range(10):
+        with pytest.raises(GithubException):
+            client.rest_impl.requestJsonAndCheck("GET", "/repos/o/r")
+    assert client.circuit_breaker.state == CIRCUIT_CLOSED
+
+    client = github_failing_with(502)
+    with pytest.raises(CircuitOpenError):
+        for _ in range(10):
+            with pytest.raises(GithubException):
+                client.rest_impl.requestJsonAndCheck("GET", "/repos/o/r")
+    assert client.circuit_breaker.state == CIRCUIT_OPEN
@@ -0,0 +1,31 @@
+from octo_bots_python.operations.github.clang_format_validator_operation import \
+    added_line_ranges
+
+
+def test_only_added_lines_are_ranged():
+    patch = "\n".join([
+        "@@ -10,7 +10,8 @@ void f()",
+        " context",
+        " context",
+        "-removed",
+        "+added",
+        "+added",
+        " context",
+        "+added",
+        " context",
+        " context",
+        "@@ -40,3 +41,2 @@ void g()",
+        " context",
+        "-removed",
+        " context",
+        "@@ -50 +50,2 @@",
+        "+added",
+        "+added",
+        "\\ No newline at end of file",
+    ])
+    assert added_line_ranges(patch) == [(12, 13), (15, 15), (50, 51)]
+
+
+def test_missing_patch_validates_the_whole_file():
+    assert added_line_ranges(None) is None
+    assert added_line_ranges("") is None
@@ -0,0 +1,20 @@
+from octo_bots_python.operations.github.clang_format_validator_operation import \
+    effective_style_files
+
+
+def test_style_files_of_the_file_directory_and_its_parents():
+    blob_shas = {
+        ".clang-format": "sha-root",
+        "lib/.clang-format": "sha-lib",
+        "lib/sub/.clang-format-ignore": "sha-ignore",
+        "other/_clang-format": "sha-other",
+        "lib/subdir/.clang-format": "sha-subdir",
+        "lib/a.cpp": "sha-a",
+    }
+    assert effective_style_files(blob_shas, "lib/sub/a.cpp") == [
+        (".clang-format", "sha-root"), ("lib/.clang-format", "sha-lib"), ("lib/sub/.clang-format-ignore", "sha-ignore")]
+    assert effective_style_files(blob_shas, "a.cpp") == [(".clang-format", "sha-root")]
+
+    # A style file of another directory does not change the key of the file
+    changed = dict(blob_shas, **{"other/_clang-format": "sha-other-2"})
+    assert effective_style_files(changed, "lib/a.cpp") == effective_style_files(blob_shas, "lib/a.cpp")
@@ -0,0 +1,34 @@
+from octo_bots_python.stores.contributors_ranking_store import \
+    ContributorsRankingStore
+
+
+def test_ranking_is_replaced_as_a_whole(tmp_path):
+    store = ContributorsRankingStore(str(tmp_path / "ranking.db"))
+    assert store.get_ranking("org/repo", 10) is None
+    store.set_ranking("org/repo", [("alice", 30), ("bob", 20), ("carol", 10)], 30)
+    assert store.get_ranking("org/repo", 2) == ["alice", "bob"]
+    store.set_ranking("org/repo", [("bob", 40)], 30)
+    assert store.get_ranking("org/repo", 10) == ["bob"]
+    # A repo ranked without any contributor is known, unlike a repo which was never ranked
+    store.set_ranking("org/empty", [], 30)
+    assert store.get_ranking("org/empty", 10) == []
+
+
+def test_repos_out_of_the_installation_are_removed(tmp_path):
+    store = ContributorsRankingStore(str(tmp_path / "ranking.db"))
+    store.set_ranking("org/kept", [("alice", 1)], 30)
+    store.set_ranking("org/removed", [("bob", 1)], 30)
+    store.remove_repos_not_in(["org/kept", "org/new"])
+    assert store.get_ranking("org/kept", 10) == ["alice"]
+    assert store.get_ranking("org/removed", 10) is None
+
+
+def test_rankings_smaller_than_the_top_are_not_used(tmp_path):
+    store = ContributorsRankingStore(str(tmp_path / "ranking.db"))
+    store.set_ranking("org/repo", [("alice", 30), ("bob", 20)], 2)
+    assert store.get_ranking("org/repo", 2) == ["alice", "bob"]
+    # The ranking may miss contributors past its size, so it is as good as no ranking
+    assert store.get_ranking("org/repo", 3) is None
+    # A repo with less contributors than the ranking size is still used
+    store.set_ranking("org/repo", [("alice", 30), ("bob", 20)], 5)
+    assert store.get_ranking("org/repo", 3) == ["alice", "bob"]
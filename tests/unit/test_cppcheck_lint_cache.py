@@ -0,0 +1,90 @@
+import os
+
+from octo_bots_python.operations.github.pull_request_cppcheck_operation import (
+    content_keys, run_cached_cppcheck, split_diagnostics)
+from octo_bots_python.stores.lint_results_store import LintResultsStore
+
+
+def test_content_keys_change_with_included_headers():
+    includes = {"a.cpp": {"a.h"}, "a.h": {"b.h"}, "b.h": set(), "c.cpp": set()}
+    source_files = {"a.cpp": "sha-a", "a.h": "sha-ah", "b.h": "sha-bh", "c.cpp": "sha-c"}
+    keys = content_keys(source_files, source_files, includes)
+    # A file including nothing is keyed by its blob only
+    assert keys["c.cpp"] == "sha-c"
+    assert keys["b.h"] == "sha-bh"
+    assert keys["a.cpp"] not in source_files.values()
+
+    # Changing a header included through another one changes the key of the includers only
+    changed = dict(source_files, **{"b.h": "sha-bh-2"})
+    changed_keys = content_keys(changed, changed, includes)
+    assert changed_keys["a.cpp"] != keys["a.cpp"]
+    assert changed_keys["a.h"] != keys["a.h"]
+    assert changed_keys["c.cpp"] == keys["c.cpp"]
+
+    # Only the analyzed files are keyed, with the shas of every source file
+    assert content_keys({"a.cpp": "sha-a"}, source_files, includes) == {"a.cpp": keys["a.cpp"]}
+
+
+def test_split_diagnostics_by_named_file(tmp_path):
+    working_dir = str(tmp_path)
+    lines = [
+        f"{os.path.join(working_dir, 'src/a.cpp')}:3:1: error: Null pointer [nullPointer]",
+        f"{os.path.join(working_dir, 'src/a.h')}:1:1: style: Unused [unusedFunction]",
+        "nofile:0:0: information: Too many configurations [toomanyconfigs]",
+    ]
+    diagnostics, other_lines = split_diagnostics(lines, working_dir, ["src/a.cpp", "src/b.cpp"])
+    assert diagnostics == {"src/a.cpp": [":3:1: error: Null pointer [nullPointer]"], "src/b.cpp": []}
+    assert other_lines == lines[1:]
+
+
+class FakeCppcheck:
+    def __init__(self, working_dir, diagnostics):
+        self.__working_dir = working_dir
+        self.__diagnostics = diagnostics
+        self.analyzed = []
+
+    def __call__(self, files):
+        # Every analyzed file reports its own diagnostics and the ones of the headers it includes, as cppcheck does
+        self.analyzed.append(sorted(files))
+        lines = ["nofile:0:0: information: Global [toomanyconfigs]"]
+        for path in files:
+            for named_file, message in self.__diagnostics.get(path, []):
+                lines.append(f"{os.path.join(self.__working_dir, named_file)}:1:1: error: {message} [id]")
+        return 0, lines
+
+
+def test_header_diagnostics_are_cached_under_the_header(tmp_path):
+    working_dir = str(tmp_path / "work")
+    lint_cache = LintResultsStore(str(tmp_path / "lint.db"))
+    includes = {"a.cpp": {"a.h"}, "a.h": set(), "z.cpp": set()}
+    source_files = {"a.cpp": "sha-a", "a.h": "sha-ah", "z.cpp": "sha-z"}
+    files = {"a.cpp": "sha-a", "z.cpp": "sha-z"}
+    cppcheck = FakeCppcheck(working_dir, {"a.cpp": [("a.h", "Header bug")], "z.cpp": [("z.cpp", "Z bug")]})
+    _, lines = run_cached_cppcheck(lint_cache, "cppcheck", working_dir, files, source_files, includes, cppcheck)
+    assert cppcheck.analyzed == [["a.cpp", "z.cpp"]]
+    assert lines == [f"{os.path.join(working_dir, 'a.h')}:1:1: error: Header bug [id]",
+                     f"{os.path.join(working_dir, 'z.cpp')}:1:1: error: Z bug [id]",
+                     "nofile:0:0: information: Global [toomanyconfigs]"]
+
+    # Nothing changed, both files are cache hits and global lines are not replayed
+    _, cached_lines = run_cached_cppcheck(lint_cache, "cppcheck", working_dir, files, source_files, includes, cppcheck)
+    assert cppcheck.analyzed == [["a.cpp", "z.cpp"]]
+    assert cached_lines == lines[:2]
+
+    # Once the header is fixed only its includer is analyzed again, and z.cpp no longer reports the header diagnostic
+    fixed_source_files = dict(source_files, **{"a.h": "sha-ah-fixed"})
+    cppcheck = FakeCppcheck(working_dir, {"z.cpp": [("z.cpp", "Z bug")]})
+    _, fixed_lines = run_cached_cppcheck(lint_cache, "cppcheck", working_dir, files, fixed_source_files, includes, cppcheck)
+    assert cppcheck.analyzed == [["a.cpp"]]
+    assert fixed_lines == [f"{os.path.join(working_dir, 'z.cpp')}:1:1: error: Z bug [id]",
+                           "nofile:0:0: information: Global [toomanyconfigs]"]
+
+
+def test_lint_results_are_found_by_key_and_config(tmp_path):
+    store = LintResultsStore(str(tmp_path / "lint.db"))
+    config_hash = LintResultsStore.config_hash(["--quiet"], 3)
+    store.put_results("cppcheck 2.13", {("key-a", config_hash): {"analyzed": True, "diagnostics": [":1:1: error"]}})
+    assert store.get_results("cppcheck 2.13", [("key-a", config_hash), ("key-b", config_hash)]) == \
+        {("key-a", config_hash): {"analyzed": True, "diagnostics": [":1:1: error"]}}
+    assert store.get_results("cppcheck 2.14", [("key-a", config_hash)]) == {}
+    assert store.get_results("cppcheck 2.13", [("key-a", LintResultsStore.config_hash(["--quiet"]))]) == {}
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from octo_bots_python.common.fan_out import bounded_map, fan_out
+
+
+def test_bounded_map_submits_a_window_ahead_of_the_consumer():
+    submitted = []
+
+    def worker(item):
+        submitted.append(item)
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = bounded_map(pool, worker, range(10), 3)
+        assert next(results) == 0
+        # Only the window was submitted before the first result was consumed
+        assert len(submitted) <= 3
+        assert list(results) == [i * 2 for i in range(1, 10)]
+
+
+def test_fan_out_reports_every_item():
+    lock = Lock()
+    done = {}
+
+    def on_done(item, result, error):
+        with lock:
+            done[item] = (result, type(error) if error else None)
+
+    def worker(item):
+        if item == 3:
+            raise ValueError()
+        return item + 1
+
+    fan_out(range(6), worker, 2, on_done)
+    assert done == {0: (1, None), 1: (2, None), 2: (3, None), 3: (None, ValueError), 4: (5, None), 5: (6, None)}
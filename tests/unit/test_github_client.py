@@ -0,0 +1,65 @@
+from threading import Event, Thread
+from types import SimpleNamespace
+
+from github import Github
+
+from octo_bots_python.clients.github_client import GithubAppClient
+
+
+class FakeRequester:
+    def __init__(self):
+        self.requests = []
+        self.post_started = Event()
+        self.release_post = Event()
+
+    def __call__(self, verb, url, input=None, headers=None, **kwargs):
+        self.requests.append((verb, url, input.get('status') if input else None))
+        number = len(self.requests)
+        if verb == "POST" and input['status'] == "queued":
+            self.post_started.set()
+            self.release_post.wait(5)
+        return {}, {'url': f"{url}/{number}", 'id': number}
+
+
+def client_with(requester: FakeRequester, api_url: str) -> GithubAppClient:
+    github = Github()
+    github._Github__requester.requestJsonAndCheck = requester
+    return GithubAppClient(github, None, None, api_url=api_url)
+
+
+def pull_request(sha: str):
+    return SimpleNamespace(base=SimpleNamespace(repo=SimpleNamespace(url="/repos/org/repo")), head=SimpleNamespace(sha=sha))
+
+
+def test_concurrent_events_queue_a_single_check_run():
+    requester = FakeRequester()
+    client = client_with(requester, "http://github-queue.test")
+    queued = []
+    thread = Thread(target=lambda: queued.append(client.queue_check_run("lint", pull_request("sha-concurrent"))))
+    thread.start()
+    assert requester.post_started.wait(5)
+    # The other event finds the check run being created, and does not create another one
+    assert client.queue_check_run("lint", pull_request("sha-concurrent")) is None
+    requester.release_post.set()
+    thread.join()
+    assert queued[0] is not None
+    assert [request for request in requester.requests if request[0] == "POST"] == [("POST", "/repos/org/repo/check-runs", "queued")]
+    # The operation starts on the queued check run
+    client.create_check_run("lint", pull_request("sha-concurrent"))
+    assert requester.requests[-1] == ("PATCH", queued[0].url, "in_progress")
+
+
+def test_check_run_queued_after_the_operation_started_is_skipped():
+    requester = FakeRequester()
+    client = client_with(requester, "http://github-takeover.test")
+    queued = []
+    thread = Thread(target=lambda: queued.append(client.queue_check_run("lint", pull_request("sha-takeover"))))
+    thread.start()
+    assert requester.post_started.wait(5)
+    # The operation starts while the queued check run is still being created, so it creates a check run of its own
+    client.create_check_run("lint", pull_request("sha-takeover"))
+    requester.release_post.set()
+    thread.join()
+    assert queued == [None]
+    assert [request[0::2] for request in requester.requests] == [("POST", "queued"), ("POST", "in_progress"), ("PATCH", "completed")]
+    assert requester.requests[-1][1] == "/repos/org/repo/check-runs/1"
@@ -0,0 +1,41 @@
+import os
+
+from octo_bots_python.workspaces.include_graph import (read_includes,
+                                                       transitive_includes,
+                                                       with_includers)
+
+
+def write_files(root, files):
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        with open(os.path.join(root, path), 'w') as f:
+            f.write(content)
+    return sorted(files.keys())
+
+
+def test_includes_are_resolved_by_path_suffix(tmp_path):
+    source_files = write_files(str(tmp_path), {
+        "src/main.cpp": '#include "util/strings.h"\n#include <vector>\n#  include "local.h"\n',
+        "src/local.h": "",
+        "lib/util/strings.h": '#include "base.h"\n',
+        "lib/base.h": "",
+        "other/strings.h": "",
+    })
+    includes = read_includes(str(tmp_path), source_files)
+    assert includes["src/main.cpp"] == {"lib/util/strings.h", "src/local.h"}
+    assert includes["lib/util/strings.h"] == {"lib/base.h"}
+    assert includes["lib/base.h"] == set()
+
+
+def test_transitive_includes_and_includers():
+    includes = {
+        "a.cpp": {"a.h"},
+        "a.h": {"b.h"},
+        "b.h": {"a.h"},
+        "c.cpp": {"b.h"},
+        "d.cpp": set(),
+    }
+    assert transitive_includes(includes, "a.cpp") == {"a.h", "b.h"}
+    assert transitive_includes(includes, "d.cpp") == set()
+    assert with_includers(includes, ["b.h"]) == {"a.cpp", "a.h", "b.h", "c.cpp"}
+    assert with_includers(includes, ["d.cpp"]) == {"d.cpp"}
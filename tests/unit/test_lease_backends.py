@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+import pytest
+
+from octo_bots_python.leases.file_lease_backend import FileLeaseBackend
+from octo_bots_python.leases.sqlite_lease_backend import SqliteLeaseBackend
+
+
+@pytest.fixture(params=[FileLeaseBackend, SqliteLeaseBackend])
+def lease_backend(request, tmp_path):
+    path = str(tmp_path / "leases") if request.param == FileLeaseBackend else str(tmp_path / "leases.db")
+    return request.param, path
+
+
+def test_lease_is_held_by_a_single_owner(lease_backend):
+    backend_class, path = lease_backend
+    # Each replica opens its own backend on the shared path
+    replica_a, replica_b = backend_class(path), backend_class(path)
+    assert replica_a.acquire_lease("jobs", "a", 60)
+    assert not replica_b.acquire_lease("jobs", "b", 60)
+    # The holder renews its lease
+    assert replica_a.acquire_lease("jobs", "a", 60)
+    # Only the holder releases the lease
+    replica_b.release_lease("jobs", "b")
+    assert not replica_b.acquire_lease("jobs", "b", 60)
+    replica_a.release_lease("jobs", "a")
+    assert replica_b.acquire_lease("jobs", "b", 60)
+
+
+def test_expired_lease_is_taken_over(lease_backend):
+    backend_class, path = lease_backend
+    replica_a, replica_b = backend_class(path), backend_class(path)
+    assert replica_a.acquire_lease("jobs", "a", 0.05)
+    assert replica_a.acquire_lease("other", "a", 60)
+    time.sleep(0.1)
+    assert replica_b.acquire_lease("jobs", "b", 60)
+    assert not replica_b.acquire_lease("other", "b", 60)
+    assert not replica_a.acquire_lease("jobs", "a", 60)
+
+
+def test_sqlite_lease_does_not_use_wal(tmp_path):
+    SqliteLeaseBackend(str(tmp_path / "leases.db"))
+    connection = sqlite3.connect(str(tmp_path / "leases.db"))
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    connection.close()
@@ -0,0 +1,53 @@
+from octo_bots_python.operations.github.stale_index_update_operation import \
+    StaleIndexUpdateOperation
+from octo_bots_python.stores.stale_items_store import StaleItemsStore
+
+
+def index_event(index_path: str, event: dict):
+    StaleIndexUpdateOperation(index_path).execute_operation({}, {}, dict(event, repository={'full_name': "org/repo"}))
+
+
+def issue(number: int, updated_at: str, state: str = 'open', **extra) -> dict:
+    return dict({'number': number, 'title': f"Item {number}", 'state': state, 'updated_at': updated_at,
+                 'labels': [{'name': "bug"}]}, **extra)
+
+
+def test_items_are_upserted_from_issue_and_pull_request_events(tmp_path):
+    index_path = str(tmp_path / "stale.db")
+    store = StaleItemsStore.get_store(index_path)
+    # Only repos which passed a full sync are queried
+    store.replace_repo_items("org/repo", "https://api.github.com/repos/org/repo", [])
+    index_event(index_path, {'action': 'opened', 'issue': issue(1, "2024-01-01T00:00:00Z")})
+    index_event(index_path, {'action': 'opened', 'pull_request': issue(2, "2024-01-02T00:00:00Z")})
+    index_event(index_path, {'action': 'created', 'issue': issue(3, "2024-01-03T00:00:00Z", pull_request={}),
+                             'comment': {'updated_at': "2024-02-01T00:00:00Z"}})
+    items = store.query_stale_items(StaleItemsStore.to_timestamp("2024-03-01T00:00:00Z"))
+    assert [(item.number, item.is_pull_request, item.labels) for item in items] == \
+        [(1, False, ["bug"]), (2, True, ["bug"]), (3, True, ["bug"])]
+    # A comment makes the item active as of the comment
+    assert items[2].updated_at == StaleItemsStore.to_timestamp("2024-02-01T00:00:00Z")
+
+    # An older event does not move the item back in time
+    index_event(index_path, {'action': 'edited', 'issue': issue(3, "2024-01-04T00:00:00Z", pull_request={})})
+    items = store.query_stale_items(StaleItemsStore.to_timestamp("2024-03-01T00:00:00Z"))
+    assert items[2].updated_at == StaleItemsStore.to_timestamp("2024-02-01T00:00:00Z")
+
+
+def test_closed_items_are_removed(tmp_path):
+    index_path = str(tmp_path / "stale.db")
+    store = StaleItemsStore.get_store(index_path)
+    store.replace_repo_items("org/repo", "https://api.github.com/repos/org/repo", [])
+    index_event(index_path, {'action': 'opened', 'issue': issue(1, "2024-01-01T00:00:00Z")})
+    index_event(index_path, {'action': 'opened', 'pull_request': issue(2, "2024-01-01T00:00:00Z")})
+    index_event(index_path, {'action': 'closed', 'issue': issue(1, "2024-01-05T00:00:00Z", state='closed')})
+    index_event(index_path, {'action': 'closed', 'pull_request': issue(2, "2024-01-05T00:00:00Z", state='closed')})
+    assert store.query_stale_items(StaleItemsStore.to_timestamp("2024-03-01T00:00:00Z")) == []
+
+
+def test_last_full_sync_is_kept(tmp_path):
+    store = StaleItemsStore(str(tmp_path / "stale.db"))
+    assert store.last_full_sync() is None
+    store.set_last_full_sync(1700000000.5)
+    assert store.last_full_sync() == 1700000000.5
+    store.set_last_full_sync(1700000100.0)
+    assert store.last_full_sync() == 1700000100.0
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from octo_bots_python.common.tool_runner import (PRIORITY_BACKGROUND,
+                                                 PRIORITY_BOT, ToolRunner)
+
+# The limits are applied once the tool started, so the tool waits a bit before reading them
+READ_LIMITS = "import os, resource, time; time.sleep(0.5); print(os.nice(0), resource.getrlimit(resource.RLIMIT_CPU)[0])"
+
+
+@pytest.fixture
+def configured_runner():
+    yield ToolRunner
+    ToolRunner.configure()
+
+
+def test_run_returns_the_tool_output():
+    result = ToolRunner.run([sys.executable, "-c", "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"])
+    assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+
+
+def test_tools_are_limited_when_configured(configured_runner):
+    base_nice = os.nice(0)
+    result = ToolRunner.run([sys.executable, "-c", READ_LIMITS], priority=PRIORITY_BOT)
+    nice, cpu_limit = result.stdout.split()
+    assert int(nice) == base_nice
+
+    configured_runner.configure(cpu_time_limit_seconds=100, background_nice=5)
+    result = ToolRunner.run([sys.executable, "-c", READ_LIMITS], priority=PRIORITY_BACKGROUND)
+    nice, cpu_limit = result.stdout.split()
+    assert (int(nice), int(cpu_limit)) == (min(base_nice + 5, 19), 100)
+
+
+def test_timed_out_tool_is_killed():
+    with pytest.raises(subprocess.TimeoutExpired):
+        ToolRunner.run([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2)
@@ -0,0 +1,60 @@
+import os
+
+from octo_bots_python.workspaces.workspace_indexer import (GlobMatcher,
+                                                           WorkspaceIndexer)
+
+
+class FakeRequester:
+    def __init__(self, tree):
+        self.__tree = tree
+        self.requests = 0
+
+    def requestJsonAndCheck(self, verb, url, parameters=None):
+        self.requests += 1
+        return {}, {'tree': self.__tree, 'truncated': False}
+
+
+class FakeGithubClient:
+    def __init__(self, tree):
+        self.rest_impl = FakeRequester(tree)
+
+
+def test_glob_matcher_with_separator():
+    matcher = GlobMatcher(["*.cpp", "third_party"])
+    assert matcher.matches("main.cpp")
+    assert matcher.matches("src/main.cpp")
+    assert not matcher.matches("main.h")
+    assert not matcher.matches("src/third_party")
+    assert matcher.matches_path_or_parent("third_party/lib/a.cpp")
+    assert not GlobMatcher([]).matches("main.cpp")
+
+
+def test_glob_matcher_without_separator():
+    matcher = GlobMatcher(["*.key", "config/**/secret.yml", "build", "[!a]?.txt"], match_separator=False)
+    assert matcher.matches("server.key")
+    assert not matcher.matches("keys/server.key")
+    assert matcher.matches("config/secret.yml")
+    assert matcher.matches("config/prod/eu/secret.yml")
+    assert matcher.matches("build")
+    assert not matcher.matches("src/build")
+    assert matcher.matches("b1.txt")
+    assert not matcher.matches("a1.txt")
+
+
+def test_index_workspace_prunes_excluded_dirs(tmp_path):
+    for path in ["src/main.cpp", "src/main.h", "third_party/lib.cpp", ".git/objects.cpp"]:
+        os.makedirs(os.path.dirname(str(tmp_path / path)), exist_ok=True)
+        (tmp_path / path).write_text("")
+    files = WorkspaceIndexer.index_workspace(str(tmp_path), "org/repo", "sha-workspace", ["*.cpp"], ["third_party"])
+    assert files == ["src/main.cpp"]
+
+
+def test_index_tree_lists_dirs_on_demand():
+    tree = [{'path': "build", 'type': 'tree'}, {'path': "build/out.o", 'type': 'blob'},
+            {'path': "vendor", 'type': 'commit'}, {'path': "main.c", 'type': 'blob'}]
+    git_client = FakeGithubClient(tree)
+    assert WorkspaceIndexer.index_tree(git_client, "/repos/org/repo", "sha-tree") == ["build/out.o", "main.c"]
+    assert WorkspaceIndexer.index_tree(git_client, "/repos/org/repo", "sha-tree", include_dirs=True) == ["build", "build/out.o", "main.c", "vendor"]
+    # Both listings are cached per commit
+    assert WorkspaceIndexer.index_tree(git_client, "/repos/org/repo", "sha-tree", include_dirs=True) == ["build", "build/out.o", "main.c", "vendor"]
+    assert git_client.rest_impl.requests == 2